@@ -0,0 +1,159 @@
+from __future__ import annotations
+"""
+Bridge – Batch Requests
+Several GET API calls resolved in-process and concurrently, answered as one response
+
+Each path is dispatched straight to the app's router with the caller's
+headers, so auth, validation, exception handlers and every data cache and
+coalescer behave exactly as for a direct request; only the outer
+middleware (compression, metrics, rate limiting) is skipped per part and
+applied once to the batch. Bodies of CACHEABLE_ROUTES depend only on the
+URL, data version and day, so they are kept and spliced into the combined
+response as raw bytes without re-serialising.
+"""
+
+import asyncio
+import json
+import time
+from urllib.parse import unquote, urlsplit
+
+from starlette.exceptions import HTTPException
+
+from cache import LRUCache
+from compression import CACHEABLE_ROUTES
+from metrics import register_collector
+from mps_data import get_data_version
+
+MAX_PATHS = 20
+PART_TIMEOUT = 15.0          # seconds
+# Streams never finish and batches don't nest.
+EXCLUDED_PATHS = {"/api/batch", "/api/bootstrap", "/api/events"}
+# What the SPA needs on first load.
+BOOTSTRAP_PATHS = ["/api/dashboard", "/api/selection/filters", "/api/providers", "/api/insights", "/api/auth/me"]
+
+PARTS = LRUCache("batch_parts", maxsize=256)
+STATS = {"batches": 0, "parts": 0, "part_cache_hits": 0, "timeouts": 0}
+
+_PASSED_HEADERS = {b"cookie", b"x-session-token", b"x-forwarded-for", b"user-agent", b"accept-language"}
+
+
+class BatchError(ValueError):
+    pass
+
+
+def validate(paths) -> list[str]:
+    """The requested paths, checked. Raises BatchError."""
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        raise BatchError("'paths' must be a list of API paths")
+    if len(paths) > MAX_PATHS:
+        raise BatchError(f"At most {MAX_PATHS} paths per batch")
+    for p in paths:
+        parts = urlsplit(p)
+        if parts.scheme or parts.netloc or not parts.path.startswith("/api/"):
+            raise BatchError(f"Not an API path: {p!r}")
+        if parts.path in EXCLUDED_PATHS:
+            raise BatchError(f"{parts.path} cannot be batched")
+    return paths
+
+
+# ─── Dispatch ────────────────────────────────────────────────────────────
+
+async def _dispatch(app, parent: dict, path: str) -> tuple[int, str, bytes]:
+    """Run one GET through the router. Returns (status, content type, body)."""
+    parts = urlsplit(path)
+    scope = {
+        **{k: v for k, v in parent.items() if k not in ("route", "endpoint", "path_params")},
+        "method": "GET",
+        "path": unquote(parts.path),
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "headers": [(k, v) for k, v in parent.get("headers", []) if k in _PASSED_HEADERS],
+        "state": dict(parent.get("state") or {}),
+    }
+    STATS["parts"] += 1
+    key = (scope["path"], scope["query_string"], get_data_version(), time.strftime("%Y-%m-%d"))
+    hit = PARTS.get(key)
+    if hit is not None:
+        STATS["part_cache_hits"] += 1
+        return hit
+
+    start, chunks = {}, []
+    sent_request, done = False, asyncio.Event()
+
+    async def receive():
+        # Streaming responses listen for a disconnect: hold them until the part is done.
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app.router(scope, receive, send)
+    except HTTPException as e:
+        # Raised by the router itself (no route, wrong method), outside the handlers.
+        return e.status_code, "application/json", json.dumps({"detail": e.detail}).encode()
+    except Exception as e:
+        print(f"Batch part {path} failed: {e!r}")
+        return 500, "application/json", b'{"detail":"Internal Server Error"}'
+    finally:
+        done.set()
+    content_type = ""
+    for k, v in start.get("headers", []):
+        if k == b"content-type":
+            content_type = v.decode("latin-1")
+    result = (start.get("status", 500), content_type, b"".join(chunks))
+    route = getattr(scope.get("route"), "path", None)
+    if result[0] == 200 and route in CACHEABLE_ROUTES:
+        PARTS.set(key, result)
+    return result
+
+
+async def _part(app, parent: dict, path: str) -> tuple[int, str, bytes]:
+    try:
+        return await asyncio.wait_for(_dispatch(app, parent, path), PART_TIMEOUT)
+    except asyncio.TimeoutError:
+        STATS["timeouts"] += 1
+        return 504, "application/json", b'{"detail":"Timed out"}'
+
+
+async def resolve(app, parent: dict, paths: list[str]) -> bytes:
+    """{"results": [{"path", "status", "body"}, ...]} for every path, in order, as
+    JSON bytes. Repeated paths are fetched once."""
+    STATS["batches"] += 1
+    unique = list(dict.fromkeys(paths))
+    responses = dict(zip(unique, await asyncio.gather(*(_part(app, parent, p) for p in unique))))
+    items = []
+    for path in paths:
+        status, content_type, body = responses[path]
+        if not content_type.startswith("application/json"):
+            body = json.dumps(body.decode("utf-8", "replace")).encode()
+        items.append(b'{"path":' + json.dumps(path).encode() + b',"status":' + str(status).encode() +
+                     b',"body":' + (body or b"null") + b"}")
+    return b'{"results":[' + b",".join(items) + b"]}"
+
+
+def script_safe(data: bytes) -> bytes:
+    """JSON bytes made safe to embed in an inline <script>."""
+    return data.replace(b"</", b"<\\/").replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+def _collect() -> list[str]:
+    return [
+        "# TYPE bridge_batch_requests_total counter",
+        f"bridge_batch_requests_total {STATS['batches']}",
+        "# TYPE bridge_batch_parts_total counter",
+        f'bridge_batch_parts_total{{result="dispatched"}} {STATS["parts"] - STATS["part_cache_hits"]}',
+        f'bridge_batch_parts_total{{result="cached"}} {STATS["part_cache_hits"]}',
+        f'bridge_batch_parts_total{{result="timeout"}} {STATS["timeouts"]}',
+    ]
+
+
+register_collector(_collect)
@@ -0,0 +1,4 @@
+"""
+Bridge – Benchmark Suite
+Micro-benchmarks of the data layer and an in-process ASGI load driver
+"""
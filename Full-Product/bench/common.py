@@ -0,0 +1,64 @@
+from __future__ import annotations
+"""
+Bridge – Benchmark Helpers
+Result files, run metadata and regression comparison
+"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "bench_results")
+
+
+def run_metadata() -> dict:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        rev = ""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_rev": rev,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def write_results(kind: str, results: list[dict], path: str | None = None) -> str:
+    if not path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{kind}-{stamp}.json")
+    with open(path, "w") as f:
+        json.dump({"kind": kind, "meta": run_metadata(), "results": results}, f, indent=2)
+    return path
+
+
+def compare_results(current: list[dict], baseline_path: str, metric: str, threshold: float) -> list[dict]:
+    """Entries whose metric grew by more than `threshold` (fraction) against a baseline file."""
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for r in current:
+        old = baseline.get(r["name"])
+        if not old or not old.get(metric) or r.get(metric) is None:
+            continue
+        change = r[metric] / old[metric] - 1
+        if change > threshold:
+            regressions.append({"name": r["name"], "metric": metric, "baseline": old[metric],
+                                "current": r[metric], "change_pct": round(100 * change, 1)})
+    return regressions
@@ -0,0 +1,108 @@
+from __future__ import annotations
+"""
+Bridge – Concurrency Check
+Probes /api/health while slow exports run, to show heavy work no longer stalls the loop
+
+Usage (from Full-Product/):
+    python -m bench.concurrency [--size 2000] [--exports 4] [--duration 5] [--out FILE] [--baseline FILE]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+# All driver traffic comes from one client IP; measure handlers, not the rate limiter.
+os.environ.setdefault("BRIDGE_RATE_LIMIT", "0")
+
+from bench.common import compare_results, percentile, write_results
+from bench.synthetic import make_universe, use_universe
+
+SLOW_REQUESTS = [
+    "/api/selection/mps/export?format=csv&include_history=true&months=60",
+    "/api/selection/mps/export?format=xlsx&months=60",
+]
+PROBE_INTERVAL = 0.01
+
+
+async def _probe(client, deadline: float) -> list[float]:
+    """Health latency measured from when the probe was due, so time the loop spent
+    blocked before it could even send the request is counted."""
+    latencies = []
+    due = time.perf_counter()
+    while due < deadline:
+        await client.get("/api/health")
+        done = time.perf_counter()
+        latencies.append((done - due) * 1000)
+        due = done + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+async def _exporter(client, path: str, deadline: float, counts: dict) -> None:
+    while time.perf_counter() < deadline:
+        resp = await client.get(path)
+        counts[resp.status_code] = counts.get(resp.status_code, 0) + 1
+
+
+def _summarise(name: str, latencies: list[float], extra: dict) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "name": name,
+        "probes": len(ordered),
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+        **extra,
+    }
+
+
+async def run(exports: int, duration: float) -> list[dict]:
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        idle = await _probe(client, time.perf_counter() + duration)
+
+        counts: dict = {}
+        deadline = time.perf_counter() + duration
+        loaded, *_ = await asyncio.gather(
+            _probe(client, deadline),
+            *[_exporter(client, SLOW_REQUESTS[i % len(SLOW_REQUESTS)], deadline, counts) for i in range(exports)],
+        )
+    return [
+        _summarise("health_idle", idle, {}),
+        _summarise("health_during_exports", loaded, {"export_statuses": {str(k): v for k, v in counts.items()}}),
+    ]
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bridge health-probe latency under concurrent exports")
+    parser.add_argument("--size", type=int, default=2000, help="synthetic universe size")
+    parser.add_argument("--exports", type=int, default=4, help="concurrent export loops")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per phase")
+    parser.add_argument("--out", help="results JSON path (default bench_results/concurrency-<timestamp>.json)")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regression threshold (fraction)")
+    args = parser.parse_args(argv)
+
+    with use_universe(make_universe(args.size)):
+        results = asyncio.run(run(args.exports, args.duration))
+
+    for r in results:
+        print(f"{r['name']:<24} {r['probes']:>6} probes  p50 {r['p50_ms']:>8.2f}  "
+              f"p99 {r['p99_ms']:>8.2f}  max {r['max_ms']:>8.2f} ms  {r.get('export_statuses', '')}")
+    print(f"Results written to {write_results('concurrency', results, args.out)}")
+    if args.baseline:
+        regressions = compare_results(results, args.baseline, "p99_ms", args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']}: p99 {r['baseline']} -> {r['current']} ms (+{r['change_pct']}%)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,136 @@
+from __future__ import annotations
+"""
+Bridge – In-Process Load Driver
+Replays an adviser session mix against main.app over ASGI and reports latency
+
+Usage (from Full-Product/):
+    python -m bench.load --users 20 --duration 15 [--size 1000] [--out FILE] [--baseline FILE]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import httpx
+
+# All driver traffic comes from one client IP; measure handlers, not the rate limiter.
+os.environ.setdefault("BRIDGE_RATE_LIMIT", "0")
+
+import mps_data
+from bench.common import compare_results, percentile, write_results
+from bench.synthetic import make_universe, use_universe
+
+# (weight, label, path builder) – roughly what an adviser does in one sitting.
+SESSION_MIX = [
+    (10, "dashboard", lambda r, ids, provs: "/api/dashboard"),
+    (6, "selection_filters", lambda r, ids, provs: "/api/selection/filters"),
+    (14, "selection_search", lambda r, ids, provs: (
+        f"/api/selection/mps?risk_min={r.randint(1, 5)}&risk_max={r.randint(5, 10)}"
+        f"&platforms={r.choice(mps_data.PLATFORMS)}")),
+    (6, "providers", lambda r, ids, provs: "/api/providers"),
+    (6, "provider_detail", lambda r, ids, provs: f"/api/providers/{r.choice(provs)}"),
+    (16, "mps_detail", lambda r, ids, provs: f"/api/mps/{r.choice(ids)}"),
+    (10, "mps_performance", lambda r, ids, provs: f"/api/mps/{r.choice(ids)}/performance?months={r.choice([12, 36, 60])}"),
+    (6, "compare", lambda r, ids, provs: "/api/compare?ids=" + ",".join(r.sample(ids, min(4, len(ids))))),
+    (8, "insights", lambda r, ids, provs: "/api/insights"),
+    (4, "insights_search", lambda r, ids, provs: f"/api/insights?search={r.choice(['rebalancing', 'esg', 'cost'])}"),
+    (4, "costs", lambda r, ids, provs: f"/api/costs?pot_size={r.choice([50000, 250000, 1000000])}"),
+    (10, "health", lambda r, ids, provs: "/api/health"),
+]
+
+
+async def _adviser(client, rng, deadline, ids, provs, samples, think_ms):
+    weights = [w for w, _, _ in SESSION_MIX]
+    while time.perf_counter() < deadline:
+        _, label, build = rng.choices(SESSION_MIX, weights=weights)[0]
+        path = build(rng, ids, provs)
+        start = time.perf_counter()
+        try:
+            resp = await client.get(path)
+            status = resp.status_code
+        except Exception as e:
+            print(f"{label}: {e}")
+            status = 0
+        samples.append((label, (time.perf_counter() - start) * 1000, status))
+        if think_ms:
+            await asyncio.sleep(rng.uniform(0, think_ms) / 1000)
+
+
+def _failed(status: int) -> bool:
+    # A 429 is a rejected request, not a fast one.
+    return not status or status == 429 or status >= 500
+
+
+def _summarise(name: str, latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "name": name,
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+async def run(users: int, duration: float, think_ms: float, seed: int) -> list[dict]:
+    import main
+
+    ids = [m["id"] for m in mps_data.get_all_mps()]
+    provs = [p["id"] for p in mps_data.get_providers().values()]
+    transport = httpx.ASGITransport(app=main.app)
+    samples: list[tuple] = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*[
+            _adviser(client, random.Random(seed + i), deadline, ids, provs, samples, think_ms)
+            for i in range(users)
+        ])
+        elapsed = time.perf_counter() - start
+
+    results = [_summarise("all", [s[1] for s in samples], sum(1 for s in samples if _failed(s[2])), elapsed)]
+    for _, label, _ in SESSION_MIX:
+        mine = [s for s in samples if s[0] == label]
+        if mine:
+            results.append(_summarise(label, [s[1] for s in mine], sum(1 for s in mine if _failed(s[2])), elapsed))
+    return results
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bridge in-process load driver")
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated advisers")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="max think time between requests")
+    parser.add_argument("--size", type=int, default=0, help="synthetic universe size (0 = real data)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="results JSON path (default bench_results/load-<timestamp>.json)")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regression threshold (fraction)")
+    args = parser.parse_args(argv)
+
+    if args.size:
+        with use_universe(make_universe(args.size)):
+            results = asyncio.run(run(args.users, args.duration, args.think_ms, args.seed))
+    else:
+        results = asyncio.run(run(args.users, args.duration, args.think_ms, args.seed))
+
+    for r in results:
+        print(f"{r['name']:<20} {r['requests']:>7} req  {r['rps']:>8} rps  "
+              f"p50 {r['p50_ms']:>8.2f}  p95 {r['p95_ms']:>8.2f}  p99 {r['p99_ms']:>8.2f} ms  errors {r['errors']}")
+    print(f"Results written to {write_results('load', results, args.out)}")
+    if args.baseline:
+        regressions = compare_results(results, args.baseline, "p95_ms", args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']}: p95 {r['baseline']} -> {r['current']} ms (+{r['change_pct']}%)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
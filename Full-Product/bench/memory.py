@@ -0,0 +1,106 @@
+from __future__ import annotations
+"""
+Bridge – Memory Benchmark
+Heap size of the dict universe against the compact one (compact.py), plus the
+access cost the compact views add
+
+Each universe is pickled and loaded back under tracemalloc, so strings and
+nested objects are counted as a freshly started worker would allocate them.
+
+Usage (from Full-Product/):
+    python -m bench.memory --sizes 1000,10000,100000 [--out FILE] [--baseline FILE]
+"""
+
+import argparse
+import gc
+import pickle
+import sys
+import time
+import tracemalloc
+
+import mps_data
+from bench.common import compare_results, write_results
+from bench.synthetic import make_universe, use_universe
+from compact import CompactUniverse
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def loaded_size(obj) -> tuple[int, float]:
+    """Bytes held by a fresh copy of obj, and seconds to unpickle it."""
+    blob = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        copy = pickle.loads(blob)
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del copy
+    return size, elapsed
+
+
+def _timed(fn, rounds: int = 3) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 2)
+
+
+def run(size: int) -> list[dict]:
+    universe = make_universe(size)
+    compact = CompactUniverse(universe)
+    results = []
+    for layout, records in (("dict", universe), ("compact", compact)):
+        nbytes, load_s = loaded_size(records)
+        with use_universe(records):
+            # The scan itself: through filter_mps, rounds after the first would be FILTER_CACHE hits.
+            filter_ms = _timed(lambda: mps_data._scan(risk_min=3, risk_max=7, platforms=["Transact"], ocf_max=0.6))
+            detail_ms = _timed(lambda: [dict(m) for m in records[:1000]])
+        results.append({
+            "name": f"{layout}[{size}]",
+            "layout": layout,
+            "size": size,
+            "heap_mb": round(nbytes / 2**20, 2),
+            "bytes_per_mps": round(nbytes / size),
+            "unpickle_ms": round(load_s * 1000, 1),
+            "filter_mps_ms": filter_ms,
+            "materialise_1000_ms": detail_ms,
+        })
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bridge universe memory benchmark")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--out")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="regression threshold (fraction)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        rows = run(size)
+        results += rows
+        d, c = rows
+        print(f"{size:>7} MPS  dict {d['heap_mb']:>8.2f} MB ({d['bytes_per_mps']} B/MPS)   "
+              f"compact {c['heap_mb']:>7.2f} MB ({c['bytes_per_mps']} B/MPS)   "
+              f"x{d['heap_mb'] / c['heap_mb']:.1f} smaller   "
+              f"filter {d['filter_mps_ms']} -> {c['filter_mps_ms']} ms")
+    path = write_results("memory", results, args.out)
+    print(f"Results written to {path}")
+    if args.baseline:
+        regressions = compare_results(results, args.baseline, "heap_mb", args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']}: {r['baseline']} -> {r['current']} MB (+{r['change_pct']}%)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+from __future__ import annotations
+"""
+Bridge – Micro-Benchmarks
+Timings of data-layer functions against synthetic universes
+
+Usage (from Full-Product/):
+    python -m bench.micro --sizes 100,1000,10000,100000 [--out FILE] [--baseline FILE]
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib.util
+import statistics
+import sys
+import time
+
+import drift
+import facets
+import factors
+import insights
+import mps_data
+from bench.common import compare_results, write_results
+from bench.synthetic import make_insights, make_universe, perturb_allocations, use_universe
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+def bench(name: str, fn, size: int, min_rounds: int = 5, max_time: float = 2.0) -> dict:
+    """Run fn repeatedly (after one warm-up) and summarise per-call timings in ms."""
+    fn()
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + max_time
+        while len(timings) < min_rounds or time.perf_counter() < deadline:
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+            if len(timings) >= 1000:
+                break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    mean = statistics.fmean(timings)
+    return {
+        "name": f"{name}[{size}]",
+        "function": name,
+        "size": size,
+        "rounds": len(timings),
+        "min_ms": round(min(timings), 4),
+        "mean_ms": round(mean, 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "stddev_ms": round(statistics.stdev(timings), 4) if len(timings) > 1 else 0.0,
+        "ops_per_sec": round(1000 / mean, 1) if mean else None,
+    }
+
+
+def _cases(main) -> list[tuple]:
+    sample = mps_data.MPS_UNIVERSE[0]
+    distinct = perturb_allocations(mps_data.MPS_UNIVERSE)
+    cases = [
+        # The scan itself; filter_mps would answer every round after the first from FILTER_CACHE.
+        ("filter_mps", lambda: mps_data._scan(risk_min=3, risk_max=7, platforms=["Transact", "Aegon"], ocf_max=0.6)),
+        ("filter_mps_cached", lambda: mps_data.filter_mps(risk_min=3, risk_max=7, platforms=["Transact", "Aegon"],
+                                                          ocf_max=0.6)),
+        ("facets_search", lambda: facets.search(risk_min=3, risk_max=7, platforms=["Transact", "Aegon"], ocf_max=0.6)),
+        # Clones share the base records' allocations; perturb them so groups are realistic.
+        ("drift_simulation", lambda: drift._run(distinct, drift.DEFAULT_BAND, drift.DEFAULT_YEARS,
+                                                drift.DEFAULT_PATHS)),
+        ("factor_exposures", lambda: factors._exposures(mps_data.MPS_UNIVERSE, factors.DEFAULT_MONTHS)),
+        ("generate_performance_history", lambda: mps_data._generate_performance_history(sample, 36)),
+        ("search_insights", lambda: insights.search_insights("rebalancing")),
+    ]
+    if main is not None:
+        cases.append(("dashboard", lambda: asyncio.run(main.get_dashboard())))
+        if importlib.util.find_spec("docx") is not None:
+            payload = {
+                "details": {"Firm": "Example Advisers", "Date": "2026-01-01"},
+                "sections": [{"title": m["name"], "content": m["benchmark"]} for m in mps_data.MPS_UNIVERSE[:20]],
+            }
+            cases.append(("export_consumer_duty", lambda: asyncio.run(_drain(main.export_consumer_duty(payload)))))
+    return cases
+
+
+async def _drain(coro):
+    resp = await coro
+    async for _ in resp.body_iterator:
+        pass
+
+
+def run(sizes: list[int], max_time: float) -> list[dict]:
+    try:
+        import main
+    except ImportError as e:
+        print(f"main not importable ({e}); skipping handler benchmarks")
+        main = None
+
+    results = []
+    for size in sizes:
+        universe = make_universe(size)
+        with use_universe(universe, make_insights(max(size // 10, 1))):
+            for name, fn in _cases(main):
+                r = bench(name, fn, size, max_time=max_time)
+                results.append(r)
+                print(f"{r['name']:<45} median {r['median_ms']:>10.3f} ms  ({r['rounds']} rounds)")
+    return results
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bridge micro-benchmarks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--max-time", type=float, default=2.0, help="seconds per benchmark")
+    parser.add_argument("--out", help="results JSON path (default bench_results/micro-<timestamp>.json)")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regression threshold (fraction)")
+    args = parser.parse_args(argv)
+
+    results = run([int(s) for s in args.sizes.split(",")], args.max_time)
+    print(f"Results written to {write_results('micro', results, args.out)}")
+    if args.baseline:
+        regressions = compare_results(results, args.baseline, "median_ms", args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']}: {r['baseline']} -> {r['current']} ms (+{r['change_pct']}%)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,75 @@
+from __future__ import annotations
+"""
+Bridge – Synthetic Universes
+Scaled copies of the MPS universe and insights built from the real record schema
+"""
+
+import contextlib
+import copy
+import random
+
+import insights
+import mps_data
+
+
+def make_universe(size: int, seed: int = 7) -> list[dict]:
+    """`size` portfolios cloned from real records with perturbed figures."""
+    rng = random.Random(seed)
+    base = mps_data.MPS_UNIVERSE
+    out = []
+    for i in range(size):
+        m = copy.deepcopy(base[i % len(base)])
+        m["id"] = f"{m['id']}-syn{i}"
+        m["name"] = f"{m['name']} #{i}"
+        m["risk_rating"] = min(10, max(1, m["risk_rating"] + rng.choice([-1, 0, 0, 1])))
+        m["ocf"] = round(max(0.05, m["ocf"] + rng.uniform(-0.1, 0.1)), 2)
+        for field in ("return_1yr", "return_3yr", "return_5yr", "return_ytd"):
+            if m.get(field) is not None:
+                m[field] = round(m[field] * rng.uniform(0.8, 1.2), 1)
+        m["platforms"] = rng.sample(mps_data.PLATFORMS, rng.randint(1, len(mps_data.PLATFORMS)))
+        out.append(m)
+    return out
+
+
+def perturb_allocations(universe: list[dict], seed: int = 7, spread: int = 10) -> list[dict]:
+    """Shallow copies with each asset allocation moved up to `spread` points per class
+    (whole percents, still summing to 100), so clones no longer share targets."""
+    rng = random.Random(seed)
+    out = []
+    for m in universe:
+        allocation = m.get("asset_allocation") or {}
+        weights = {a: max(0, w + rng.randint(-spread, spread)) for a, w in allocation.items()}
+        total = sum(weights.values())
+        if total:
+            weights = {a: round(w * 100 / total) for a, w in weights.items()}
+            first = next(iter(weights))
+            weights[first] += 100 - sum(weights.values())
+        out.append({**m, "asset_allocation": weights})
+    return out
+
+
+def make_insights(size: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    base = insights.INSIGHTS
+    out = []
+    for i in range(size):
+        item = dict(base[i % len(base)])
+        item["id"] = f"{item['id']}-syn{i}"
+        item["date"] = f"20{rng.randint(20, 26)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        out.append(item)
+    return out
+
+
+@contextlib.contextmanager
+def use_universe(universe: list[dict], insight_list: list[dict] | None = None):
+    """Temporarily swap the module-level data and bump the data version."""
+    saved = (mps_data.MPS_UNIVERSE, insights.INSIGHTS, mps_data.DATA_VERSION)
+    mps_data.MPS_UNIVERSE = universe
+    mps_data.DATA_VERSION += 1
+    if insight_list is not None:
+        insights.INSIGHTS = insight_list
+    try:
+        yield
+    finally:
+        mps_data.MPS_UNIVERSE, insights.INSIGHTS = saved[0], saved[1]
+        mps_data.DATA_VERSION += 1
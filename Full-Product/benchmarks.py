@@ -0,0 +1,174 @@
+from __future__ import annotations
+"""
+Bridge – Benchmark Analytics
+Composite benchmarks parsed from each portfolio's benchmark text, and performance relative to them
+
+A benchmark such as "20% FTSE All-Share / 80% Bloomberg Barclays Global
+Aggregate" parses to weights over indices in the historical store; a single
+name such as "ARC Equity Risk PCI" is 100% that index. Parses are cached by
+string. The universe only holds a few dozen distinct benchmark strings, so
+composite series are one (benchmarks × indices) by (indices × months)
+product per data version, and each portfolio uses its benchmark's row.
+"""
+
+import math
+import operator
+import re
+
+from cache import LRUCache
+from historical import INDICES, index_returns
+from mps_data import get_all_mps, get_data_version, get_mps_by_id, monthly_returns
+
+PARSES = LRUCache("benchmark_parses", maxsize=4096)
+RELATIVE_CACHE = LRUCache("relative_metrics", maxsize=8)
+
+_PART_SEPARATOR = re.compile(r"\s*[/+;,]\s*")
+_WEIGHTED = re.compile(r"^(\d+(?:\.\d+)?)\s*%\s*(.+)$")
+
+
+class BenchmarkError(ValueError):
+    pass
+
+
+def _normal(name: str) -> str:
+    return re.sub(r"\s+", " ", name.replace("–", "-")).strip().lower()
+
+
+_NAMES = {}
+for _key, (_name, _, _, _aliases) in INDICES.items():
+    for _n in (_key, _name, *_aliases):
+        _NAMES[_normal(_n)] = _key
+
+
+# ─── Parsing ─────────────────────────────────────────────────────────────
+
+def _parse(text: str) -> tuple[tuple[str, float], ...]:
+    weighted, unweighted = {}, []
+    for part in filter(None, _PART_SEPARATOR.split(text.strip())):
+        match = _WEIGHTED.match(part)
+        name, weight = (match.group(2), float(match.group(1))) if match else (part, None)
+        key = _NAMES.get(_normal(name))
+        if key is None:
+            raise BenchmarkError(f"Unknown benchmark index {name!r}")
+        if weight is None:
+            unweighted.append(key)
+        else:
+            weighted[key] = weighted.get(key, 0.0) + weight
+    if not weighted and not unweighted:
+        raise BenchmarkError("Empty benchmark")
+    total = sum(weighted.values())
+    if total > 100.5 or (unweighted and total >= 100):
+        raise BenchmarkError(f"Benchmark weights add up to {total:g}%")
+    # Unweighted parts share whatever the weighted ones leave.
+    for key in unweighted:
+        weighted[key] = weighted.get(key, 0.0) + (100 - total) / len(unweighted)
+    total = sum(weighted.values())
+    return tuple((key, w / total) for key, w in weighted.items())
+
+
+def parse_benchmark(text: str) -> tuple[tuple[str, float], ...]:
+    """(index key, weight) pairs summing to 1. Raises BenchmarkError."""
+    parsed = PARSES.get(text)
+    if parsed is None:
+        try:
+            parsed = _parse(text)
+        except BenchmarkError as e:
+            parsed = e
+        PARSES.set(text, parsed)
+    if isinstance(parsed, BenchmarkError):
+        raise parsed
+    return parsed
+
+
+# ─── Composites ──────────────────────────────────────────────────────────
+
+def composite_series(texts, months: int = 36) -> tuple[dict, dict]:
+    """Composite monthly returns per distinct benchmark text, plus parse errors."""
+    weights, errors = {}, {}
+    for text in set(texts):
+        try:
+            weights[text] = dict(parse_benchmark(text))
+        except BenchmarkError as e:
+            errors[text] = str(e)
+    keys = sorted({k for w in weights.values() for k in w})
+    returns = [index_returns(k, months) for k in keys]
+    # W (benchmarks × indices) @ R (indices × months); rows of W are sparse.
+    series = {}
+    for text, w in weights.items():
+        row = [(w[k], returns[j]) for j, k in enumerate(keys) if k in w]
+        series[text] = [sum(wk * r[t] for wk, r in row) for t in range(months)]
+    return series, errors
+
+
+_one_plus = (1.0).__add__
+
+
+def _growth(returns) -> float:
+    return math.prod(map(_one_plus, returns))
+
+
+class _BenchmarkStats:
+    """What the relative metrics need from a composite, computed once per benchmark."""
+
+    def __init__(self, series: list[float]):
+        n = len(series)
+        self.series = series
+        self.annualised = _growth(series) ** (12 / n) - 1
+        self.up = [t for t, r in enumerate(series) if r > 0]
+        self.down = [t for t, r in enumerate(series) if r < 0]
+        self.up_mean = _growth(map(series.__getitem__, self.up)) ** (1 / len(self.up)) - 1 if self.up else None
+        self.down_mean = _growth(map(series.__getitem__, self.down)) ** (1 / len(self.down)) - 1 if self.down else None
+
+
+def _capture(returns, months: list[int], bench_mean: float | None) -> float | None:
+    if not bench_mean:
+        return None
+    mean = _growth(map(returns.__getitem__, months)) ** (1 / len(months)) - 1
+    return round(mean / bench_mean * 100, 1)
+
+
+def relative_metrics(returns, bench: _BenchmarkStats) -> dict:
+    """Excess return, tracking error and information ratio (annualised, %), and
+    up/down capture (%) of one return series against its benchmark."""
+    n = len(bench.series)
+    active = list(map(operator.sub, returns, bench.series))
+    mean = sum(active) / n
+    tracking_error = math.sqrt(sum((a - mean) ** 2 for a in active) / (n - 1)) * math.sqrt(12)
+    return {
+        "benchmark_return": round(bench.annualised * 100, 2),
+        "excess_return": round((_growth(returns) ** (12 / n) - 1 - bench.annualised) * 100, 2),
+        "tracking_error": round(tracking_error * 100, 2),
+        "information_ratio": round(mean * 12 / tracking_error, 2) if tracking_error else None,
+        "up_capture": _capture(returns, bench.up, bench.up_mean),
+        "down_capture": _capture(returns, bench.down, bench.down_mean),
+    }
+
+
+def _relative(portfolios: list[dict], months: int) -> list[dict]:
+    series, errors = composite_series((m.get("benchmark") or "" for m in portfolios), months)
+    stats = {text: _BenchmarkStats(s) for text, s in series.items()}
+    weights = {text: {k: round(w, 4) for k, w in parse_benchmark(text)} for text in series}
+    rows = []
+    for m in portfolios:
+        text = m.get("benchmark") or ""
+        row = {"id": m["id"], "name": m["name"], "provider": m["provider"], "benchmark": text or None}
+        if text in stats:
+            row["benchmark_weights"] = weights[text]
+            row.update(relative_metrics(monthly_returns(m, months), stats[text]))
+        else:
+            row["benchmark_error"] = errors.get(text) or "No benchmark"
+        rows.append(row)
+    return rows
+
+
+def relative_performance(ids: list[str] | None = None, months: int = 36) -> list[dict]:
+    """Relative metrics for the given MPS ids (unknown ids are skipped), or for the
+    whole universe, cached per data version."""
+    if ids is not None:
+        return _relative([m for m in map(get_mps_by_id, ids) if m], months)
+    key = (get_data_version(), months)
+    rows = RELATIVE_CACHE.get(key)
+    if rows is None:
+        rows = _relative(get_all_mps(), months)
+        RELATIVE_CACHE.set(key, rows)
+    return rows
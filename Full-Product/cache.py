@@ -0,0 +1,81 @@
+from __future__ import annotations
+"""
+Bridge – In-Process Caches
+Small LRU caches keyed by data version, with hit/miss counters
+
+Caches are shared by the event loop and the CPU/IO pool threads, so every
+operation takes the cache's own lock.
+"""
+
+import threading
+from collections import OrderedDict
+
+CACHES: dict[str, "LRUCache"] = {}
+
+
+class LRUCache:
+    """Bounded least-recently-used mapping with hit/miss counters. With maxbytes
+    set, entries are also evicted once their total sizeof(value) exceeds it."""
+
+    def __init__(self, name: str, maxsize: int = 128, maxbytes: int | None = None, sizeof=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._sizes: dict = {}
+        self._lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value) -> None:
+        size = self.sizeof(value) if self.sizeof is not None else 0   # outside the lock: may be slow
+        with self._lock:
+            if self.sizeof is not None:
+                self.bytes += size - self._sizes.get(key, 0)
+                self._sizes[key] = size
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes
+                                                     and len(self._data) > 1):
+                evicted, _ = self._data.popitem(last=False)
+                self.bytes -= self._sizes.pop(evicted, 0)
+
+    def items(self) -> list[tuple]:
+        """Snapshot of (key, value) pairs, least recently used first; not counted as hits."""
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {"name": self.name, "size": len(self._data), "maxsize": self.maxsize,
+                     "hits": self.hits, "misses": self.misses}
+            if self.sizeof is not None:
+                stats.update(bytes=self.bytes, maxbytes=self.maxbytes)
+        return stats
+
+
+def get_cache_stats() -> list[dict]:
+    return [c.stats() for c in CACHES.values()]
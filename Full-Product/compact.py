@@ -0,0 +1,357 @@
+from __future__ import annotations
+"""
+Bridge – Compact MPS Records
+Struct-of-arrays storage for the MPS universe, with read-only dict-like record views
+
+Numbers live in typed arrays, allocations in fixed-width rows of one array,
+underlying funds in flat arrays indexed by offset, and every repeated string
+or list (providers, labels, platform and horizon lists, fund names) is stored
+once and referenced. A record is a two-slot view that decodes fields on
+access, so existing code that reads `mps["ocf"]`, `mps.get(...)`, `{**mps}`
+or serialises records keeps working.
+
+Enable with BRIDGE_COMPACT=1. Fields the layout does not cover are kept per
+record as-is, so the round trip is lossless apart from ints stored in a
+float column coming back as floats.
+"""
+
+import math
+import os
+from array import array
+from collections.abc import Mapping, Sequence
+
+COMPACT_RECORDS = os.environ.get("BRIDGE_COMPACT") == "1"
+
+STRING_FIELDS = ("id", "name", "provider", "risk_label", "rebalancing", "inception_date", "benchmark")
+NUMBER_FIELDS = (
+    "risk_rating", "ocf", "return_1yr", "return_3yr", "return_5yr", "return_ytd",
+    "return_since_inception", "volatility", "max_drawdown", "sharpe_ratio", "income_yield", "min_investment",
+)
+FLAG_FIELDS = ("ethical", "decumulation_suitable")
+LIST_FIELDS = ("platforms", "time_horizons")
+ALLOCATION_FIELDS = ("asset_allocation", "geographic_allocation")
+FUND_FIELDS = ("name", "weight", "type")
+
+_INT_NONE = -(2 ** 63)     # None in an int64 column
+_FLAG_NONE = 2             # None in a flag column
+
+
+def _is_number(v) -> bool:
+    return v is None or (isinstance(v, (int, float)) and not isinstance(v, bool))
+
+
+def _numbers(values: list) -> array:
+    """int64 when every value is an int (or None), float64 otherwise."""
+    if all(v is None or type(v) is int for v in values):
+        return array("q", (_INT_NONE if v is None else v for v in values))
+    return array("d", (math.nan if v is None else float(v) for v in values))
+
+
+def _typecode(col) -> str:
+    # Columns are arrays, or memoryviews over shared memory (see shared.py).
+    return col.typecode if isinstance(col, array) else col.format
+
+
+def _number(col, i: int):
+    v = col[i]
+    if _typecode(col) == "q":
+        return None if v == _INT_NONE else v
+    return None if v != v else v
+
+
+class _Interner(dict):
+    def __call__(self, value):
+        return self.setdefault(value, value)
+
+
+# ─── Universe ────────────────────────────────────────────────────────────
+
+class CompactUniverse(Sequence):
+    """The universe as columns. Indexing yields MPSRecord views."""
+
+    def __init__(self, records):
+        records = list(records)
+        n = len(records)
+        intern = _Interner()
+        self._extras: dict[int, dict] = {}
+
+        def extra(i, key, value):
+            self._extras.setdefault(i, {})[key] = value
+
+        # Key order per record, shared between records with the same layout.
+        self._layouts: list[tuple] = []
+        layout_ids: dict[tuple, int] = {}
+        self._layout = array("H")
+        for r in records:
+            keys = tuple(r)
+            if keys not in layout_ids:
+                layout_ids[keys] = len(self._layouts)
+                self._layouts.append(tuple(intern(k) for k in keys))
+            self._layout.append(layout_ids[keys])
+
+        self._strings = {}
+        for f in STRING_FIELDS:
+            col = []
+            for i, r in enumerate(records):
+                v = r.get(f)
+                if v is not None and not isinstance(v, str):
+                    extra(i, f, v)
+                    v = None
+                col.append(intern(v))
+            self._strings[f] = col
+
+        self._numbers = {}
+        for f in NUMBER_FIELDS:
+            values = []
+            for i, r in enumerate(records):
+                v = r.get(f)
+                if not _is_number(v):
+                    extra(i, f, v)
+                    v = None
+                values.append(v)
+            self._numbers[f] = _numbers(values)
+
+        self._flags = {}
+        for f in FLAG_FIELDS:
+            col = bytearray(n)
+            for i, r in enumerate(records):
+                v = r.get(f)
+                if v is None:
+                    col[i] = _FLAG_NONE
+                elif isinstance(v, bool):
+                    col[i] = v
+                else:
+                    extra(i, f, v)
+                    col[i] = _FLAG_NONE
+            self._flags[f] = col
+
+        # Repeated lists (platform sets, horizons) become one shared tuple each.
+        self._lists = {}
+        for f in LIST_FIELDS:
+            col = []
+            for i, r in enumerate(records):
+                v = r.get(f)
+                if v is not None and not (isinstance(v, list) and all(isinstance(s, str) for s in v)):
+                    extra(i, f, v)
+                    v = None
+                col.append(None if v is None else intern(tuple(intern(s) for s in v)))
+            self._lists[f] = col
+
+        # Allocations: one fixed-width row per record over the keys seen in the column.
+        self._allocations = {}
+        for f in ALLOCATION_FIELDS:
+            keys: dict[str, int] = {}
+            for r in records:
+                v = r.get(f)
+                if isinstance(v, dict):
+                    for k in v:
+                        keys.setdefault(intern(k), len(keys))
+            width = len(keys)
+            values, present = [], []
+            for i, r in enumerate(records):
+                v = r.get(f)
+                if isinstance(v, dict) and all(_is_number(x) and x is not None for x in v.values()):
+                    row = [0] * width
+                    for k, x in v.items():
+                        row[keys[k]] = x
+                    values.extend(row)
+                    present.append(intern(tuple(v)))
+                else:
+                    if v is not None:
+                        extra(i, f, v)
+                    values.extend([0] * width)
+                    present.append(None)
+            self._allocations[f] = (tuple(keys), _numbers(values), present)
+
+        # Underlying funds: flat arrays, record i owns [offsets[i], offsets[i + 1]).
+        offsets, names, weights, types = array("I", [0]), array("I"), [], array("H")
+        name_ids: dict[str, int] = {}
+        self._fund_names: list[str] = []
+        self._fund_types: list[str] = []
+        type_ids: dict[str, int] = {}
+        has_funds = bytearray(n)
+        for i, r in enumerate(records):
+            funds = r.get("underlying_funds")
+            ok = isinstance(funds, list) and all(
+                isinstance(fd, dict) and tuple(fd) == FUND_FIELDS and isinstance(fd["name"], str)
+                and isinstance(fd["type"], str) and _is_number(fd["weight"]) and fd["weight"] is not None
+                for fd in funds)
+            if ok:
+                has_funds[i] = 1
+                for fd in funds:
+                    if fd["name"] not in name_ids:
+                        name_ids[fd["name"]] = len(self._fund_names)
+                        self._fund_names.append(intern(fd["name"]))
+                    if fd["type"] not in type_ids:
+                        type_ids[fd["type"]] = len(self._fund_types)
+                        self._fund_types.append(intern(fd["type"]))
+                    names.append(name_ids[fd["name"]])
+                    types.append(type_ids[fd["type"]])
+                    weights.append(fd["weight"])
+            elif funds is not None:
+                extra(i, "underlying_funds", funds)
+            offsets.append(len(names))
+        self._funds = (offsets, names, _numbers(weights), types, has_funds)
+
+        # Anything else the layout does not know about is kept as-is.
+        known = set(STRING_FIELDS + NUMBER_FIELDS + FLAG_FIELDS + LIST_FIELDS + ALLOCATION_FIELDS)
+        known.add("underlying_funds")
+        for i, r in enumerate(records):
+            for k, v in r.items():
+                if k not in known:
+                    extra(i, k, v)
+        self._n = n
+        self._build_decoders()
+
+    # Sequence protocol
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [MPSRecord(self, j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("MPS index out of range")
+        return MPSRecord(self, i)
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield MPSRecord(self, i)
+
+    def __reduce__(self):
+        state = {k: v for k, v in self.__dict__.items() if k not in ("_decoders", "_layout_sets")}
+        return _restore, (state,)
+
+    # Field decoding
+
+    def _build_decoders(self) -> None:
+        """One closure per field, so a lookup is a dict hit and a call."""
+        decoders = {}
+        for f, col in self._strings.items():
+            decoders[f] = col.__getitem__
+        for f, col in self._numbers.items():
+            if _typecode(col) == "q":
+                decoders[f] = (lambda c: lambda i: None if c[i] == _INT_NONE else c[i])(col)
+            else:
+                decoders[f] = (lambda c: lambda i: None if c[i] != c[i] else c[i])(col)
+        for f, col in self._flags.items():
+            decoders[f] = (lambda c: lambda i: None if c[i] == _FLAG_NONE else c[i] == 1)(col)
+        for f, col in self._lists.items():
+            decoders[f] = (lambda c: lambda i: None if c[i] is None else list(c[i]))(col)
+        for f, (keys, values, present) in self._allocations.items():
+            def allocation(i, keys=keys, values=values, present=present, width=len(keys)):
+                if present[i] is None:
+                    return None
+                row = dict(zip(keys, (_number(values, j) for j in range(i * width, (i + 1) * width))))
+                return {k: row[k] for k in present[i]}
+            decoders[f] = allocation
+        offsets, names, weights, types, has_funds = self._funds
+        fund_names, fund_types = self._fund_names, self._fund_types
+
+        def funds(i):
+            if not has_funds[i]:
+                return None
+            return [{"name": fund_names[names[j]], "weight": _number(weights, j), "type": fund_types[types[j]]}
+                    for j in range(offsets[i], offsets[i + 1])]
+        decoders["underlying_funds"] = funds
+        self._decoders = decoders
+        self._layout_sets = [frozenset(keys) for keys in self._layouts]
+
+    def value(self, i: int, key: str):
+        if self._extras:
+            extras = self._extras.get(i)
+            if extras is not None and key in extras:
+                return extras[key]
+        return self._decoders[key](i)
+
+
+def _map_columns(state: dict, fn) -> dict:
+    """state with fn applied to every flat numeric column (arrays and flag bytes)."""
+    state = dict(state)
+    state["_layout"] = fn(state["_layout"])
+    state["_numbers"] = {f: fn(col) for f, col in state["_numbers"].items()}
+    state["_flags"] = {f: fn(col) for f, col in state["_flags"].items()}
+    state["_allocations"] = {f: (keys, fn(values), present)
+                             for f, (keys, values, present) in state["_allocations"].items()}
+    state["_funds"] = tuple(fn(col) for col in state["_funds"])
+    return state
+
+
+def export_columns(universe: CompactUniverse) -> tuple[dict, list]:
+    """Split a universe into a picklable state and its numeric columns.
+
+    The state holds the string, list and layout tables with each column replaced
+    by its index into the returned list of arrays / bytearrays."""
+    columns = []
+
+    def take(col):
+        columns.append(col)
+        return len(columns) - 1
+    return _map_columns(universe.__reduce__()[1][0], take), columns
+
+
+def attach_columns(state: dict, columns: list) -> CompactUniverse:
+    """Rebuild an exported universe over columns – typically memoryviews cast to
+    each column's typecode – without copying them."""
+    return _restore(_map_columns(state, columns.__getitem__))
+
+
+def _restore(state: dict) -> CompactUniverse:
+    universe = CompactUniverse.__new__(CompactUniverse)
+    universe.__dict__.update(state)
+    universe._build_decoders()
+    return universe
+
+
+class MPSRecord(Mapping):
+    """Read-only view of one portfolio. Nested values are decoded fresh on each
+    access, so mutating them never touches the universe."""
+
+    __slots__ = ("_u", "_i")
+
+    def __init__(self, universe: CompactUniverse, index: int):
+        self._u = universe
+        self._i = index
+
+    def _keys(self) -> tuple:
+        return self._u._layouts[self._u._layout[self._i]]
+
+    def __getitem__(self, key):
+        u, i = self._u, self._i
+        if key not in u._layout_sets[u._layout[i]]:
+            raise KeyError(key)
+        return u.value(i, key)
+
+    def __contains__(self, key) -> bool:
+        u = self._u
+        return key in u._layout_sets[u._layout[self._i]]
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def to_dict(self) -> dict:
+        return {k: self._u.value(self._i, k) for k in self._keys()}
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    # Copies and pickles are plain dicts, detached from the universe.
+    def __copy__(self) -> dict:
+        return self.to_dict()
+
+    def __deepcopy__(self, memo) -> dict:
+        return self.to_dict()
+
+    def __reduce__(self):
+        return dict, (self.to_dict(),)
+
+
+def compact(records):
+    """The universe in compact form; already-compact universes pass through."""
+    return records if isinstance(records, CompactUniverse) else CompactUniverse(records)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+"""
+Bridge – Multi-Portfolio Comparison Engine
+Time-aligned, rebased performance series and pairwise difference metrics
+"""
+
+import math
+
+from mps_data import ASSET_CLASSES, REGIONS, get_mps_by_id, get_performance_history
+
+MAX_COMPARE = 50
+DIFF_FIELDS = ["period_return", "volatility", "ocf", "return_1yr", "return_3yr"]
+
+
+def _outer_diff(values: list) -> list[list]:
+    """Matrix of row-minus-column differences; None where either side is missing."""
+    return [
+        [round(a - b, 2) if a is not None and b is not None else None for b in values]
+        for a in values
+    ]
+
+
+def _aligned_series(portfolios: list[dict], months: int) -> tuple[list[str], dict]:
+    """Histories on the shared month grid, trimmed to a common start and rebased to 100."""
+    histories = {m["id"]: get_performance_history(m["id"], months) for m in portfolios}
+    grid = [h["date"] for h in next(iter(histories.values()))]
+    # A portfolio has no history before its inception date.
+    start = max(
+        [grid[0]] + [m["inception_date"] for m in portfolios if m.get("inception_date")]
+    )
+    first = next((i for i, d in enumerate(grid) if d >= start), len(grid))
+    dates = grid[first:]
+    series = {}
+    for pid, hist in histories.items():
+        points = hist[first:]
+        if not points:
+            series[pid] = {"values": [], "monthly_returns": []}
+            continue
+        base = points[0]["value"]
+        series[pid] = {
+            "values": [round(100 * p["value"] / base, 2) for p in points],
+            "monthly_returns": [p["monthly_return"] for p in points],
+        }
+    return dates, series
+
+
+def _metrics(mps: dict, s: dict) -> dict:
+    rets = s["monthly_returns"][1:]    # returns after the rebasing point
+    vol = None
+    if len(rets) > 1:
+        mean = sum(rets) / len(rets)
+        vol = round(math.sqrt(sum((r - mean) ** 2 for r in rets) / (len(rets) - 1)) * math.sqrt(12), 2)
+    return {
+        "id": mps["id"],
+        "name": mps["name"],
+        "provider": mps["provider"],
+        "risk_rating": mps["risk_rating"],
+        "period_return": round(s["values"][-1] - 100, 2) if s["values"] else None,
+        "volatility": vol,
+        "ocf": mps["ocf"],
+        "return_1yr": mps.get("return_1yr"),
+        "return_3yr": mps.get("return_3yr"),
+    }
+
+
+def _allocation_diffs(portfolios: list[dict]) -> dict:
+    out = {}
+    for field, keys in (("asset_allocation", ASSET_CLASSES), ("geographic_allocation", REGIONS)):
+        vectors = [[m.get(field, {}).get(k, 0) for k in keys] for m in portfolios]
+        out[field] = {
+            k: _outer_diff([v[i] for v in vectors]) for i, k in enumerate(keys)
+        }
+        # Half the L1 distance: the share of the portfolio that would need to move.
+        out[field]["distance"] = [
+            [round(sum(abs(x - y) for x, y in zip(a, b)) / 2, 2) for b in vectors]
+            for a in vectors
+        ]
+    return out
+
+
+def _fund_overlap(portfolios: list[dict]) -> list[list[float]]:
+    """Pairwise overlap of underlying fund weights (sum of common minimum weights)."""
+    holdings = [{f["name"]: f["weight"] for f in m.get("underlying_funds", [])} for m in portfolios]
+    return [
+        [round(sum(min(w, b[name]) for name, w in a.items() if name in b), 2) for b in holdings]
+        for a in holdings
+    ]
+
+
+def compare_portfolios(mps_ids: list[str], months: int = 36) -> dict:
+    """Aligned series, per-portfolio metrics and pairwise differences in one pass."""
+    portfolios, missing, seen = [], [], set()
+    for pid in mps_ids:
+        if pid in seen:
+            continue
+        seen.add(pid)
+        mps = get_mps_by_id(pid)
+        if mps:
+            portfolios.append(mps)
+        else:
+            missing.append(pid)
+    if not portfolios:
+        return {"count": 0, "missing": missing}
+
+    dates, series = _aligned_series(portfolios, months)
+    metrics = [_metrics(m, series[m["id"]]) for m in portfolios]
+
+    return {
+        "count": len(portfolios),
+        "ids": [m["id"] for m in portfolios],
+        "missing": missing,
+        "mps": portfolios,
+        "series": {
+            "start": dates[0] if dates else None,
+            "dates": dates,
+            "values": {pid: s["values"] for pid, s in series.items()},
+        },
+        "metrics": metrics,
+        "differences": {f: _outer_diff([m[f] for m in metrics]) for f in DIFF_FIELDS},
+        "allocation_differences": _allocation_diffs(portfolios),
+        "fund_overlap": _fund_overlap(portfolios),
+    }
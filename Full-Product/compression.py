@@ -0,0 +1,173 @@
+from __future__ import annotations
+"""
+Bridge – Response Compression
+Brotli/gzip negotiation with a size threshold, and cached compressed bodies for
+responses that only change with the data version
+"""
+
+import hashlib
+import importlib.util
+import time
+import zlib
+
+from cache import LRUCache
+from mps_data import get_data_version
+
+MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/x-ndjson", "application/javascript", "image/svg+xml")
+
+# GET routes whose body is a pure function of the URL, the data version and
+# the date (histories are dated from today) – never of the caller.
+CACHEABLE_ROUTES = {
+    "/api/selection/filters", "/api/selection/mps", "/api/selection/frontier",
+    "/api/providers", "/api/providers/{provider_id}",
+    "/api/mps/{mps_id}", "/api/mps/{mps_id}/performance", "/api/compare",
+    "/api/insights", "/api/insights/{insight_id}", "/api/dashboard", "/api/costs",
+}
+
+COMPRESSED_CACHE = LRUCache("compressed_responses", maxsize=256)
+
+_HAS_BROTLI = importlib.util.find_spec("brotli") is not None
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0."""
+    offered = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        offered.add(name.strip())
+    if _HAS_BROTLI and ("br" in offered or "*" in offered):
+        return "br"
+    if "gzip" in offered or "*" in offered:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        import brotli
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return zlib.compress(body, GZIP_LEVEL, wbits=31)
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            import brotli
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.flush = self._c.process, self._c.finish
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, wbits=31)
+            self.compress, self.flush = self._c.compress, self._c.flush
+
+
+def _compressible(headers: list) -> bool:
+    content_type = ""
+    for k, v in headers:
+        if k == b"content-encoding":
+            return False
+        if k == b"content-type":
+            content_type = v.decode("latin-1")
+    # Event streams must reach the client unbuffered.
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith("text/event-stream")
+
+
+def _with_encoding(headers: list, encoding: str, length: int | None) -> list:
+    out = [(k, v) for k, v in headers if k not in (b"content-length", b"vary")]
+    out.append((b"content-encoding", encoding.encode()))
+    out.append((b"vary", b"Accept-Encoding"))
+    if length is not None:
+        out.append((b"content-length", str(length).encode()))
+    return out
+
+
+# ─── Middleware ──────────────────────────────────────────────────────────
+
+class CompressionMiddleware:
+    """Compress responses of at least `minimum_size` bytes, streaming ones included.
+    Compressed bodies of CACHEABLE_ROUTES are kept per (URL, encoding, data version,
+    day) and served with an ETag, without running the handler again."""
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept, if_none_match = "", None
+        for k, v in scope.get("headers", []):
+            if k == b"accept-encoding":
+                accept = v.decode("latin-1")
+            elif k == b"if-none-match":
+                if_none_match = v
+        encoding = negotiate(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        key = None
+        if scope["method"] == "GET":
+            key = (scope["path"], scope.get("query_string", b""), encoding,
+                   get_data_version(), time.strftime("%Y-%m-%d"))
+            hit = COMPRESSED_CACHE.get(key)
+            if hit is not None:
+                return await self._send_cached(scope, send, hit, if_none_match)
+
+        start_message: dict = {}
+        mode = None               # "identity" or "stream" once the first body chunk is seen
+        compressor = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, mode, compressor
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if mode is None:
+                headers = start_message.get("headers", [])
+                if not _compressible(headers) or (not more and len(body) < self.minimum_size):
+                    mode = "identity"
+                    await send(start_message)
+                elif not more:
+                    # Whole body in one message: compress in one go and cache if allowed.
+                    data = compress(body, encoding)
+                    headers = _with_encoding(headers, encoding, len(data))
+                    route = getattr(scope.get("route"), "path", None)
+                    if key is not None and start_message["status"] == 200 and route in CACHEABLE_ROUTES:
+                        etag = ('W/"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"').encode()
+                        headers.append((b"etag", etag))
+                        COMPRESSED_CACHE.set(key, (scope["route"], headers, data, etag))
+                    await send({**start_message, "headers": headers})
+                    return await send({"type": "http.response.body", "body": data})
+                else:
+                    mode = "stream"
+                    compressor = _StreamCompressor(encoding)
+                    await send({**start_message, "headers": _with_encoding(headers, encoding, None)})
+
+            if mode == "identity":
+                return await send(message)
+            out = compressor.compress(body)
+            if not more:
+                out += compressor.flush()
+            if out or not more:
+                await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_cached(self, scope, send, hit, if_none_match) -> None:
+        route, headers, data, etag = hit
+        scope["route"] = route   # so metrics still label the route template
+        if if_none_match == etag:
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": [(b"etag", etag), (b"vary", b"Accept-Encoding")]})
+            return await send({"type": "http.response.body", "body": b""})
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": data})
@@ -0,0 +1,84 @@
+from __future__ import annotations
+"""
+Bridge – Total Cost of Ownership
+All-in annual cost per (portfolio, platform) pair for a given pot size
+"""
+
+from bisect import bisect_right
+from itertools import accumulate
+
+from cache import LRUCache
+from mps_data import get_all_mps, get_data_version, get_platform_fees, get_platforms
+
+COST_CACHE = LRUCache("costs", maxsize=256)
+
+POT_BUCKET_GBP = 1000            # platform rates are cached per £1,000 of pot size
+DEFAULT_ADVISER_FEE_BPS = 50
+
+
+def pot_bucket(pot_size: float) -> int:
+    """Round a pot size to its cache bucket (never below one bucket)."""
+    return max(POT_BUCKET_GBP, int(round(pot_size / POT_BUCKET_GBP)) * POT_BUCKET_GBP)
+
+
+def _tier_table(fees: dict) -> tuple[list[float], list[float], list[float]]:
+    """Breakpoints, marginal rates and the cumulative charge (£) at each breakpoint."""
+    bps, rates = fees["breakpoints"], fees["rates"]
+    band_charges = [(hi - lo) * r / 100 for lo, hi, r in zip(bps, bps[1:], rates)]
+    return bps, rates, [0.0, *accumulate(band_charges)]
+
+
+def platform_charge(fees: dict, pot_size: float) -> float:
+    """Annual tiered platform charge in pounds."""
+    bps, rates, cum = _tier_table(fees)
+    i = bisect_right(bps, pot_size) - 1
+    if i < 0:
+        return 0.0
+    return cum[i] + (pot_size - bps[i]) * rates[i] / 100
+
+
+def _build_pairs(bucket: int, adviser_fee_bps: float) -> list[tuple]:
+    """Every (portfolio, platform) pair priced at the bucket's platform rates and
+    ranked: (min_investment, total_bps, row) with the pot-dependent fields left out."""
+    fees = get_platform_fees()
+    # One tier lookup per platform, then a single pass over every pair.
+    platform_bps = {
+        name: 10000 * platform_charge(fees[name], bucket) / bucket
+        for name in get_platforms() if name in fees
+    }
+    pairs = []
+    for mps in get_all_mps():
+        ocf_bps = mps["ocf"] * 100
+        for platform in mps["platforms"]:
+            p_bps = platform_bps.get(platform)
+            if p_bps is None:
+                continue
+            total_bps = ocf_bps + p_bps + adviser_fee_bps
+            pairs.append((mps["min_investment"], total_bps, {
+                "mps_id": mps["id"],
+                "mps_name": mps["name"],
+                "provider": mps["provider"],
+                "platform": platform,
+                "risk_rating": mps["risk_rating"],
+                "ocf_bps": round(ocf_bps, 1),
+                "platform_bps": round(p_bps, 1),
+                "adviser_bps": round(adviser_fee_bps, 1),
+                "total_bps": round(total_bps, 1),
+            }))
+    pairs.sort(key=lambda p: (p[2]["total_bps"], p[2]["mps_id"], p[2]["platform"]))
+    return pairs
+
+
+def get_cost_table(pot_size: float = 100000, adviser_fee_bps: float = DEFAULT_ADVISER_FEE_BPS) -> dict:
+    """Ranked all-in annual costs for every (portfolio, platform) pair open to `pot_size`.
+    Platform rates are taken at the pot's £1,000 bucket; pounds and eligibility at the pot itself."""
+    key = (get_data_version(), pot_bucket(pot_size), adviser_fee_bps)
+    pairs = COST_CACHE.get(key)
+    if pairs is None:
+        pairs = _build_pairs(key[1], adviser_fee_bps)
+        COST_CACHE.set(key, pairs)
+    rows = [{**row, "total_gbp": round(pot_size * total_bps / 10000, 2)}
+            for min_investment, total_bps, row in pairs if min_investment <= pot_size]
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    return {"pot_size": pot_size, "adviser_fee_bps": adviser_fee_bps, "count": len(rows), "rows": rows}
@@ -0,0 +1,39 @@
+from __future__ import annotations
+"""
+Bridge – Outbound Email
+Notifications to the Bridge team via Resend, with delivery counters
+"""
+
+import os
+
+FEEDBACK_EMAIL = os.environ.get("FEEDBACK_EMAIL", "feedback@bridge.example.com")
+RESEND_API_KEY = os.environ.get("RESEND_API_KEY", "")
+
+EMAIL_STATS = {"sent": 0, "failed": 0}
+
+
+async def send_email(sender: str, subject: str, text: str) -> bool:
+    """Send a plain-text email to the Bridge team. Returns False on any failure."""
+    import httpx
+    try:
+        async with httpx.AsyncClient() as client:
+            r = await client.post(
+                "https://api.resend.com/emails",
+                headers={"Authorization": f"Bearer {RESEND_API_KEY}"},
+                json={
+                    "from": sender,
+                    "to": [FEEDBACK_EMAIL],
+                    "subject": subject,
+                    "text": text,
+                },
+            )
+        if r.status_code not in (200, 201):
+            print(f"Resend error: {r.text}")
+            EMAIL_STATS["failed"] += 1
+            return False
+    except Exception as e:
+        print(f"Resend error: {e}")
+        EMAIL_STATS["failed"] += 1
+        return False
+    EMAIL_STATS["sent"] += 1
+    return True
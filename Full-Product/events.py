@@ -0,0 +1,254 @@
+from __future__ import annotations
+"""
+Bridge – Live Events
+Server-Sent Events hub for data-version changes, new insights and provider alerts
+
+Each worker keeps one asyncio hub. Clients get a bounded buffer; a client that
+falls behind loses its oldest events and is told to resync. With
+BRIDGE_EVENTS_DIR set, every worker binds a unix datagram socket there and
+events published on one worker are forwarded to the others.
+"""
+
+import asyncio
+import atexit
+import glob
+import itertools
+import json
+import logging
+import os
+import socket
+import time
+import zlib
+
+import insights
+import mps_data
+from executors import CPU
+from metrics import register_collector
+
+EVENTS_DIR = os.environ.get("BRIDGE_EVENTS_DIR", "")
+MAX_CLIENTS = int(os.environ.get("BRIDGE_SSE_MAX_CLIENTS", "10000"))
+CLIENT_BUFFER = 64
+KEEPALIVE = 15.0
+VERSION_POLL = 1.0
+
+log = logging.getLogger("bridge.events")
+
+
+class Client:
+    __slots__ = ("id", "user_id", "providers", "queue", "dropped")
+
+    def __init__(self, client_id: int, user_id: str | None, providers: set[str]):
+        self.id = client_id
+        self.user_id = user_id
+        self.providers = providers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_BUFFER)
+        self.dropped = 0
+
+    def offer(self, item: tuple) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+
+def _format(event_id: int, event_type: str, data: dict) -> bytes:
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+# ─── Hub ─────────────────────────────────────────────────────────────────
+
+class Hub:
+    def __init__(self):
+        self.clients: dict[int, Client] = {}
+        self._ids = itertools.count(1)
+        self._event_ids = itertools.count(1)
+        self._loop = None
+        self._sock = None
+        self._sock_path = None
+        self.published = 0
+        self.forwarded = 0
+        self.dropped = 0
+
+    # Connections
+
+    def connect(self, user_id: str | None, providers: set[str]) -> Client | None:
+        """A client for stream(), or None at MAX_CLIENTS. It is only registered once
+        its stream starts, so a response that is never sent holds no slot."""
+        self._ensure_started()
+        if len(self.clients) >= MAX_CLIENTS:
+            return None
+        return Client(next(self._ids), user_id, providers)
+
+    async def stream(self, client: Client):
+        """SSE body for one client; registers it, and unregisters it when the client
+        disconnects."""
+        self.clients[client.id] = client
+        try:
+            yield b"retry: 5000\n\n"
+            yield _format(next(self._event_ids), "hello", {"data_version": mps_data.get_data_version()})
+            while True:
+                try:
+                    event_type, data = await asyncio.wait_for(client.queue.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if client.dropped:
+                    self.dropped += client.dropped
+                    client.dropped = 0
+                    yield _format(next(self._event_ids), "resync", {"reason": "buffer overflow"})
+                yield _format(next(self._event_ids), event_type, data)
+        finally:
+            self.clients.pop(client.id, None)
+
+    # Publishing
+
+    def publish(self, event_type: str, data: dict, provider_id: str | None = None,
+                user_id: str | None = None, forward: bool = True) -> None:
+        """Deliver to matching local clients and, unless forward=False, to other workers.
+        provider_id limits delivery to subscribers of that provider; user_id to one user."""
+        self._ensure_started()
+        self.published += 1
+        self._deliver({"type": event_type, "data": data, "provider_id": provider_id, "user_id": user_id})
+        if forward and self._sock is not None:
+            self._forward({"type": event_type, "data": data, "provider_id": provider_id, "user_id": user_id})
+
+    def _deliver(self, event: dict) -> None:
+        if event["type"] == "subscriptions_changed":
+            for c in self.clients.values():
+                if c.user_id == event["user_id"]:
+                    c.providers = set(event["data"]["provider_ids"])
+            return
+        item = (event["type"], event["data"])
+        for c in self.clients.values():
+            if event["user_id"] is not None and c.user_id != event["user_id"]:
+                continue
+            if event["provider_id"] is not None and event["provider_id"] not in c.providers:
+                continue
+            c.offer(item)
+
+    def subscriptions_changed(self, user_id: str, provider_ids: list[str]) -> None:
+        """Refresh the alert filter of a user's open streams on every worker."""
+        self.publish("subscriptions_changed", {"provider_ids": provider_ids}, user_id=user_id)
+
+    # Background work
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._watch(loop)
+        if EVENTS_DIR:
+            self._bind(loop)
+
+    def _watch(self, loop) -> None:
+        loop.create_task(_watch_data()).add_done_callback(self._watch_stopped)
+
+    def _watch_stopped(self, task: asyncio.Task) -> None:
+        # The watcher only ends by failing (or on shutdown); restart it after a pause
+        # rather than leave the worker without data-change events.
+        loop = task.get_loop()
+        if task.cancelled() or loop is not self._loop or loop.is_closed():
+            return
+        log.error("Data-change watcher failed; restarting", exc_info=task.exception())
+        loop.call_later(VERSION_POLL, self._watch, loop)
+
+    def _bind(self, loop) -> None:
+        os.makedirs(EVENTS_DIR, exist_ok=True)
+        path = os.path.join(EVENTS_DIR, f"worker-{os.getpid()}.sock")
+        if os.path.exists(path):
+            os.remove(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        sock.setblocking(False)
+        self._sock, self._sock_path = sock, path
+        loop.add_reader(sock.fileno(), self._receive)
+        atexit.register(lambda: os.path.exists(path) and os.remove(path))
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                payload = self._sock.recv(65536)
+            except BlockingIOError:
+                return
+            try:
+                self._deliver(json.loads(payload))
+            except ValueError:
+                continue
+
+    def _forward(self, event: dict) -> None:
+        payload = json.dumps(event, default=str).encode()
+        for path in glob.glob(os.path.join(EVENTS_DIR, "worker-*.sock")):
+            if path == self._sock_path:
+                continue
+            try:
+                self._sock.sendto(payload, path)
+                self.forwarded += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker is gone; clear its socket so later publishes skip it.
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            except (BlockingIOError, OSError) as e:
+                print(f"Event forward to {path} failed: {e}")
+
+    def stats(self) -> dict:
+        return {"clients": len(self.clients), "published": self.published,
+                "forwarded": self.forwarded, "dropped": self.dropped}
+
+
+HUB = Hub()
+
+
+def _provider_fingerprints() -> dict[str, int]:
+    """A checksum of each provider's record and portfolios. Serialises the whole
+    universe, so it runs on the CPU pool."""
+    by_provider: dict[str, list] = {}
+    for m in mps_data.get_all_mps():
+        by_provider.setdefault(m["provider"], []).append(m)
+    return {
+        data["id"]: zlib.crc32(repr((data, by_provider.get(name, []))).encode())
+        for name, data in mps_data.get_providers().items()
+    }
+
+
+async def _watch_data() -> None:
+    """Every worker sees its own data-version bumps, so these events are not forwarded."""
+    version = mps_data.get_data_version()
+    fingerprints = await CPU.run_background(_provider_fingerprints)
+    insight_ids = {i["id"] for i in insights.INSIGHTS}
+    while True:
+        await asyncio.sleep(VERSION_POLL)
+        current = mps_data.get_data_version()
+        if current == version:
+            continue
+        version = current
+        HUB.publish("data_version", {"data_version": current, "at": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                    forward=False)
+
+        new_fingerprints = await CPU.run_background(_provider_fingerprints)
+        for provider_id, fp in new_fingerprints.items():
+            if fingerprints.get(provider_id) != fp:
+                HUB.publish("provider_update", {"provider_id": provider_id, "reason": "data changed"},
+                            provider_id=provider_id, forward=False)
+        fingerprints = new_fingerprints
+
+        for insight in insights.INSIGHTS:
+            if insight["id"] not in insight_ids:
+                HUB.publish("insight", {k: insight.get(k) for k in ("id", "title", "category", "date", "summary")},
+                            forward=False)
+        insight_ids = {i["id"] for i in insights.INSIGHTS}
+
+
+def _collect() -> list[str]:
+    s = HUB.stats()
+    return [
+        "# TYPE bridge_sse_clients gauge", f"bridge_sse_clients {s['clients']}",
+        "# TYPE bridge_sse_events_published_total counter", f"bridge_sse_events_published_total {s['published']}",
+        "# TYPE bridge_sse_events_forwarded_total counter", f"bridge_sse_events_forwarded_total {s['forwarded']}",
+        "# TYPE bridge_sse_events_dropped_total counter", f"bridge_sse_events_dropped_total {s['dropped']}",
+    ]
+
+
+register_collector(_collect)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+"""
+Bridge – Execution Model
+Sized executors for CPU-bound and blocking-I/O work, with backpressure
+
+Handlers stay `async def` and classify what they call:
+  inline    O(1) lookups and small dict builds – cheaper than a thread hop
+  run_cpu   scans, filters, optimisation, document building
+  run_io    auth / messaging / subscription / preference storage calls
+  await     httpx and other natively async clients
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import register_collector
+from profiling import run_profiled
+
+CPU_WORKERS = int(os.environ.get("BRIDGE_CPU_WORKERS", "0") or 0) or min(4, os.cpu_count() or 1)
+IO_WORKERS = int(os.environ.get("BRIDGE_IO_WORKERS", "16"))
+MAX_QUEUE = int(os.environ.get("BRIDGE_EXECUTOR_QUEUE", "64"))   # waiting tasks per pool before 503
+
+
+class ExecutorBusy(Exception):
+    """Raised instead of queueing when a pool already has MAX_QUEUE tasks waiting."""
+
+    def __init__(self, pool: str):
+        super().__init__(f"{pool} executor queue is full")
+        self.pool = pool
+
+
+class Pool:
+    """Thread pool that tracks queued/running tasks and refuses work past its queue limit.
+
+    The CPU pool runs threads rather than processes: the universe lives in this
+    process's memory, so the pool keeps the event loop responsive (the interpreter
+    switches threads every few ms) rather than adding parallelism."""
+
+    def __init__(self, name: str, workers: int, max_queue: int = MAX_QUEUE):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"bridge-{name}")
+        self.pending = 0          # submitted and not yet finished
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.pending - self.running)
+
+    def _call(self, ctx: contextvars.Context, fn, args, kwargs):
+        with self._lock:
+            self.running += 1
+        try:
+            # Run inside the caller's context so profiling spans and profiles still attach to the request.
+            return ctx.run(run_profiled, fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.pending -= 1
+                self.completed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn in the pool, raising ExecutorBusy if the queue is full."""
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorBusy(self.name)
+        return await self.run_background(fn, *args, **kwargs)
+
+    async def run_background(self, fn, *args, **kwargs):
+        """Run fn in the pool without the queue limit – for background jobs that can wait."""
+        call = functools.partial(self._call, contextvars.copy_context(), fn, args, kwargs)
+        with self._lock:
+            self.pending += 1
+        try:
+            future = self.executor.submit(call)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        # Cancelling the await (timeouts, disconnects) cancels the queued future too.
+        return await asyncio.wrap_future(future)
+
+    def _done(self, future) -> None:
+        # A task cancelled while still queued never reaches _call, which would release it.
+        if future.cancelled():
+            with self._lock:
+                self.pending -= 1
+
+    async def iterate(self, iterator):
+        """Drive a blocking iterator from the pool, one item per hop."""
+        iterator = iter(iterator)
+        sentinel = object()
+        while True:
+            item = await self.run_background(next, iterator, sentinel)
+            if item is sentinel:
+                return
+            yield item
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name, "workers": self.workers, "max_queue": self.max_queue,
+            "queued": self.queued, "running": self.running,
+            "completed": self.completed, "rejected": self.rejected,
+        }
+
+
+CPU = Pool("cpu", CPU_WORKERS)
+IO = Pool("io", IO_WORKERS)
+POOLS = (CPU, IO)
+
+
+async def run_cpu(fn, *args, **kwargs):
+    return await CPU.run(fn, *args, **kwargs)
+
+
+async def run_io(fn, *args, **kwargs):
+    return await IO.run(fn, *args, **kwargs)
+
+
+def get_executor_stats() -> list[dict]:
+    return [p.stats() for p in POOLS]
+
+
+def _collect() -> list[str]:
+    lines = []
+    for metric, field, kind in (("bridge_executor_queue_depth", "queued", "gauge"),
+                                ("bridge_executor_running", "running", "gauge"),
+                                ("bridge_executor_workers", "workers", "gauge"),
+                                ("bridge_executor_completed_total", "completed", "counter"),
+                                ("bridge_executor_rejected_total", "rejected", "counter")):
+        lines.append(f"# TYPE {metric} {kind}")
+        for p in POOLS:
+            lines.append(f'{metric}{{pool="{p.name}"}} {getattr(p, field)}')
+    return lines
+
+
+register_collector(_collect)
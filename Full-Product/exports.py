@@ -0,0 +1,152 @@
+from __future__ import annotations
+"""
+Bridge – Selection Exports
+Flattened CSV / XLSX / Parquet exports of the filtered MPS universe
+"""
+
+import csv
+import io
+import tempfile
+
+from mps_data import ASSET_CLASSES, REGIONS, get_performance_history
+
+BATCH_ROWS = 500
+READ_BYTES = 64 * 1024
+
+SCALAR_FIELDS = [
+    "id", "name", "provider", "risk_rating", "risk_label", "ocf",
+    "return_1yr", "return_3yr", "return_5yr", "return_ytd", "return_since_inception",
+    "volatility", "max_drawdown", "sharpe_ratio", "income_yield",
+    "rebalancing", "min_investment", "ethical", "decumulation_suitable",
+    "inception_date", "benchmark",
+]
+LIST_FIELDS = ["platforms", "time_horizons"]
+HISTORY_FIELDS = ["date", "value", "monthly_return"]
+
+INT_FIELDS = {"risk_rating", "min_investment"}
+BOOL_FIELDS = {"ethical", "decumulation_suitable"}
+TEXT_FIELDS = {
+    "id", "name", "provider", "risk_label", "rebalancing", "inception_date", "benchmark",
+    "underlying_funds", "date", *LIST_FIELDS,
+}
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", None),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "openpyxl"),
+    "parquet": ("application/vnd.apache.parquet", "pyarrow"),
+}
+
+
+def export_columns(include_history: bool = False) -> list[str]:
+    columns = (
+        SCALAR_FIELDS
+        + [f"asset_{k}" for k in ASSET_CLASSES]
+        + [f"geo_{k}" for k in REGIONS]
+        + LIST_FIELDS
+        + ["underlying_funds"]
+    )
+    return columns + HISTORY_FIELDS if include_history else columns
+
+
+def flatten_mps(mps: dict) -> dict:
+    """One flat row per portfolio; nested allocations become prefixed columns."""
+    row = {k: mps.get(k) for k in SCALAR_FIELDS}
+    assets, geo = mps.get("asset_allocation", {}), mps.get("geographic_allocation", {})
+    row.update({f"asset_{k}": assets.get(k, 0) for k in ASSET_CLASSES})
+    row.update({f"geo_{k}": geo.get(k, 0) for k in REGIONS})
+    row.update({k: "; ".join(mps.get(k, [])) for k in LIST_FIELDS})
+    row["underlying_funds"] = "; ".join(f"{f['name']} ({f['weight']}%)" for f in mps.get("underlying_funds", []))
+    return row
+
+
+def iter_rows(records, include_history: bool = False, months: int = 36):
+    """Lazily flatten records; with history, one row per portfolio-month (long format)."""
+    for mps in records:
+        row = flatten_mps(mps)
+        if not include_history:
+            yield row
+            continue
+        for point in get_performance_history(mps["id"], months):
+            yield {**row, **point}
+
+
+def _batches(rows, size: int = BATCH_ROWS):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ─── Writers ─────────────────────────────────────────────────────────────
+
+def stream_csv(rows, columns: list[str]):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for batch in _batches(rows):
+        writer.writerows(batch)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def _stream_file(f):
+    f.seek(0)
+    while True:
+        chunk = f.read(READ_BYTES)
+        if not chunk:
+            break
+        yield chunk
+    f.close()
+
+
+def stream_xlsx(rows, columns: list[str]):
+    """Write-only workbook spooled to a temp file, then streamed."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("MPS")
+    ws.append(columns)
+    for row in rows:
+        ws.append([row.get(c) for c in columns])
+    f = tempfile.TemporaryFile()
+    wb.save(f)
+    yield from _stream_file(f)
+
+
+def stream_parquet(rows, columns: list[str]):
+    """Row groups of BATCH_ROWS written incrementally to a temp file, then streamed."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def column_type(c):
+        if c in TEXT_FIELDS:
+            return pa.string()
+        if c in INT_FIELDS:
+            return pa.int64()
+        if c in BOOL_FIELDS:
+            return pa.bool_()
+        return pa.float64()
+
+    schema = pa.schema([(c, column_type(c)) for c in columns])
+    f = tempfile.TemporaryFile()
+    writer = pq.ParquetWriter(f, schema)
+    for batch in _batches(rows):
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    writer.close()
+    yield from _stream_file(f)
+
+
+def stream_export(records, fmt: str = "csv", include_history: bool = False, months: int = 36):
+    columns = export_columns(include_history)
+    rows = iter_rows(records, include_history, months)
+    if fmt == "xlsx":
+        return stream_xlsx(rows, columns)
+    if fmt == "parquet":
+        return stream_parquet(rows, columns)
+    return stream_csv(rows, columns)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+"""
+Bridge – Selection Facets
+Live counts per platform, provider, risk rating and time horizon for the selection screen
+
+The universe is indexed once per data version into bitsets – Python ints
+where bit i stands for the i-th portfolio – one per facet value, plus
+threshold indexes for the OCF and minimum investment sliders. A filter is
+then a handful of ANDs and ORs, and a facet count a popcount. Each facet is
+counted under every constraint except its own, so an adviser sees how many
+portfolios ticking another platform or provider would add.
+"""
+
+import threading
+from bisect import bisect_right
+
+from mps_data import get_all_mps, get_data_version
+from profiling import span
+
+FACETS = ("platforms", "providers", "risk_ratings", "time_horizons")
+_THRESHOLD_STEP = 256       # records between precomputed threshold masks
+
+
+def _bits(positions, nbytes: int) -> int:
+    buf = bytearray(nbytes)
+    for i in positions:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _positions(mask: int) -> list[int]:
+    """Set bit indexes in ascending order."""
+    out = []
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        base = byte_index << 3
+        while byte:
+            low = byte & -byte
+            out.append(base + low.bit_length() - 1)
+            byte ^= low
+    return out
+
+
+class _Threshold:
+    """Masks of records whose value is <= x, from masks precomputed every
+    _THRESHOLD_STEP records in value order plus the partial step."""
+
+    def __init__(self, values: list, nbytes: int):
+        ranked = sorted((v, i) for i, v in enumerate(values) if v is not None)
+        self._values = [v for v, _ in ranked]
+        self._order = [i for _, i in ranked]
+        self._nbytes = nbytes
+        self._steps = [0]
+        mask = 0
+        for start in range(0, len(ranked), _THRESHOLD_STEP):
+            mask |= _bits(self._order[start:start + _THRESHOLD_STEP], nbytes)
+            self._steps.append(mask)
+
+    def at_most(self, x: float) -> int:
+        k = bisect_right(self._values, x)
+        step = k // _THRESHOLD_STEP
+        start = step * _THRESHOLD_STEP
+        return self._steps[step] | _bits(self._order[start:k], self._nbytes)
+
+
+class FacetIndex:
+    """Bitsets over one version of the universe."""
+
+    def __init__(self, records):
+        self.records = records
+        n = len(records)
+        nbytes = (n + 7) // 8
+        self.all = (1 << n) - 1
+        positions: dict[str, dict] = {facet: {} for facet in FACETS}
+        ethical, decumulation = [], []
+        for i, m in enumerate(records):
+            for p in m["platforms"]:
+                positions["platforms"].setdefault(p, []).append(i)
+            positions["providers"].setdefault(m["provider"], []).append(i)
+            positions["risk_ratings"].setdefault(m["risk_rating"], []).append(i)
+            for h in m.get("time_horizons") or ():
+                positions["time_horizons"].setdefault(h, []).append(i)
+            if m["ethical"]:
+                ethical.append(i)
+            if m["decumulation_suitable"]:
+                decumulation.append(i)
+        self.values = {facet: {v: _bits(idx, nbytes) for v, idx in sorted(by_value.items())}
+                       for facet, by_value in positions.items()}
+        self.ethical = _bits(ethical, nbytes)
+        self.decumulation = _bits(decumulation, nbytes)
+        self.ocf = _Threshold([m["ocf"] for m in records], nbytes)
+        self.min_investment = _Threshold([m["min_investment"] for m in records], nbytes)
+
+    def _any_of(self, facet: str, selected) -> int:
+        masks = self.values[facet]
+        mask = 0
+        for v in selected:
+            mask |= masks.get(v, 0)
+        return mask
+
+    def constraints(self, risk_min: int = 1, risk_max: int = 10,
+                    platforms: list[str] | None = None,
+                    providers: list[str] | None = None,
+                    ethical_only: bool = False,
+                    decumulation: bool = False,
+                    time_horizon: str | None = None,
+                    min_investment_limit: float | None = None,
+                    ocf_max: float | None = None,
+                    **_) -> dict[str, int]:
+        """One mask per active constraint, keyed by the facet it narrows."""
+        masks = {}
+        if risk_min > 1 or risk_max < 10 or any(not 1 <= r <= 10 for r in self.values["risk_ratings"]):
+            masks["risk_ratings"] = self._any_of(
+                "risk_ratings", [r for r in self.values["risk_ratings"] if risk_min <= r <= risk_max])
+        if platforms:
+            masks["platforms"] = self._any_of("platforms", platforms)
+        if providers:
+            masks["providers"] = self._any_of("providers", providers)
+        if time_horizon:
+            masks["time_horizons"] = self.values["time_horizons"].get(time_horizon, 0)
+        if ethical_only:
+            masks["ethical"] = self.ethical
+        if decumulation:
+            masks["decumulation"] = self.decumulation
+        if min_investment_limit is not None:
+            masks["min_investment"] = self.min_investment.at_most(min_investment_limit)
+        if ocf_max is not None:
+            masks["ocf"] = self.ocf.at_most(ocf_max)
+        return masks
+
+    def search(self, **filters) -> dict:
+        """Matching records plus, per facet, the count for each value under
+        every constraint but that facet's own."""
+        masks = self.constraints(**filters)
+        matched = self.all
+        for mask in masks.values():
+            matched &= mask
+        facets = {}
+        for facet in FACETS:
+            base = self.all
+            for name, mask in masks.items():
+                if name != facet:
+                    base &= mask
+            facets[facet] = [{"value": v, "count": (base & mask).bit_count()}
+                             for v, mask in self.values[facet].items()]
+        facets["ethical"] = (matched & self.ethical).bit_count()
+        facets["decumulation"] = (matched & self.decumulation).bit_count()
+        records = self.records
+        return {"count": matched.bit_count(), "mps": [records[i] for i in _positions(matched)],
+                "facets": facets}
+
+
+_index: dict = {"version": None, "index": None}
+_build_lock = threading.Lock()
+
+
+def get_index() -> FacetIndex:
+    version = get_data_version()
+    if _index["version"] != version:
+        with _build_lock:
+            if _index["version"] != version:
+                _index.update(index=_build(get_all_mps()), version=version)
+    return _index["index"]
+
+
+@span("facets.build_index")
+def _build(records) -> FacetIndex:
+    return FacetIndex(records)
+
+
+@span("facets.search")
+def search(**filters) -> dict:
+    return get_index().search(**filters)
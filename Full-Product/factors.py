@@ -0,0 +1,226 @@
+from __future__ import annotations
+"""
+Bridge – Factor Exposures
+Least-squares decomposition of every portfolio's monthly returns into factor exposures
+
+Every portfolio is regressed on the same factor returns over the same
+months, so the design matrix X – an intercept plus one column per factor –
+is shared: (XᵀX)⁻¹ is computed once and each portfolio's betas are
+(XᵀX)⁻¹ Xᵀy, a handful of dot products. Rolling-window exposures reuse
+this too: the window Gram matrix and each portfolio's Xᵀy are updated as
+the window slides (add the month entering, remove the one leaving) rather
+than recomputed.
+
+Stated risk ratings are checked against the equity exposure the returns
+imply: each rating's median stated equity allocation in the universe is
+the yardstick, and a portfolio whose estimated equity beta sits nearest
+a rating RISK_MISMATCH_STEPS or more away from its own is flagged – but
+only when the fit explains at least MIN_R_SQUARED of its returns;
+otherwise the implied rating and the flag are null.
+"""
+
+import operator
+import threading
+
+from cache import LRUCache
+from historical import index_returns, month_dates
+from mps_data import get_all_mps, get_data_version, get_mps_by_id, monthly_returns
+
+# name -> index in the historical store
+FACTORS = {
+    "uk_equity": "ftse-all-share",
+    "global_equity": "msci-world",
+    "gilts": "gilts-all-stocks",
+    "credit": "iboxx-gbp-corporates",
+    "gbp": "gbp-twi",
+}
+EQUITY_FACTORS = ("uk_equity", "global_equity")
+DEFAULT_MONTHS = 36
+DEFAULT_WINDOW = 24
+RISK_MISMATCH_STEPS = 2
+# Below this the betas are mostly noise and say nothing about the stated rating.
+MIN_R_SQUARED = 0.5
+
+MODELS = LRUCache("factor_models", maxsize=8)
+RESULTS = LRUCache("factor_exposures", maxsize=8)
+DETAILS = LRUCache("factor_exposures_detail", maxsize=512)
+
+_yardstick: dict = {"version": None}
+_yardstick_lock = threading.Lock()
+
+
+def _dot(a, b) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+def _invert(matrix: list[list[float]]) -> list[list[float]]:
+    """Gauss-Jordan inverse with partial pivoting; the matrices here are tiny."""
+    n = len(matrix)
+    aug = [row[:] + [1.0 if i == j else 0.0 for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(aug[r][col]))
+        if abs(aug[pivot][col]) < 1e-14:
+            raise ValueError("Factor returns are collinear over this window")
+        aug[col], aug[pivot] = aug[pivot], aug[col]
+        p = aug[col][col]
+        aug[col] = [v / p for v in aug[col]]
+        for r in range(n):
+            if r != col and aug[r][col]:
+                f = aug[r][col]
+                aug[r] = [v - f * w for v, w in zip(aug[r], aug[col])]
+    return [row[n:] for row in aug]
+
+
+def _matvec(matrix, vector) -> list[float]:
+    return [_dot(row, vector) for row in matrix]
+
+
+class FactorModel:
+    """Shared design matrix and inverses for one history length and rolling window."""
+
+    def __init__(self, months: int = DEFAULT_MONTHS, window: int = DEFAULT_WINDOW):
+        if not len(FACTORS) + 2 <= window <= months:
+            raise ValueError(f"window must be between {len(FACTORS) + 2} and {months} months")
+        self.months = months
+        self.window = window
+        self.names = list(FACTORS)
+        self.dates = month_dates(months)
+        # Columns of X: intercept then factors; rows x_t for the rolling updates.
+        self.columns = [[1.0] * months] + [index_returns(key, months) for key in FACTORS.values()]
+        self.rows = [list(r) for r in zip(*self.columns)]
+        self.inverse = _invert([[_dot(a, b) for b in self.columns] for a in self.columns])
+
+        # Window Gram matrices, each from the previous by a rank-one add and remove.
+        p = len(self.columns)
+        gram = [[sum(self.rows[t][i] * self.rows[t][j] for t in range(window)) for j in range(p)]
+                for i in range(p)]
+        self.rolling_inverses = [_invert(gram)]
+        for end in range(window, months):
+            new, old = self.rows[end], self.rows[end - window]
+            gram = [[gram[i][j] + new[i] * new[j] - old[i] * old[j] for j in range(p)] for i in range(p)]
+            self.rolling_inverses.append(_invert(gram))
+
+    def fit(self, y) -> dict:
+        """Annualised alpha (%), factor betas and R² for one return series."""
+        xty = [_dot(col, y) for col in self.columns]
+        beta = _matvec(self.inverse, xty)
+        yty = _dot(y, y)
+        sst = yty - xty[0] * xty[0] / self.months
+        ssr = yty - _dot(beta, xty)
+        return {
+            "alpha": round(beta[0] * 12 * 100, 2),
+            "betas": {name: round(b, 3) for name, b in zip(self.names, beta[1:])},
+            "r_squared": round(max(0.0, 1 - ssr / sst), 3) if sst > 0 else None,
+        }
+
+    def rolling(self, y) -> list[dict]:
+        """Betas over each trailing window, dated by the window's last month."""
+        y = list(y)
+        w = self.window
+        xty = [_dot(col[:w], y[:w]) for col in self.columns]
+        out = []
+        for k, inverse in enumerate(self.rolling_inverses):
+            end = w - 1 + k
+            if k:
+                new, old = self.rows[end], self.rows[end - w]
+                y_new, y_old = y[end], y[end - w]
+                xty = [v + a * y_new - b * y_old for v, a, b in zip(xty, new, old)]
+            beta = _matvec(inverse, xty)
+            out.append({"date": self.dates[end], **{n: round(b, 3) for n, b in zip(self.names, beta[1:])}})
+        return out
+
+
+def get_model(months: int = DEFAULT_MONTHS, window: int = DEFAULT_WINDOW) -> FactorModel:
+    model = MODELS.get((months, window))
+    if model is None:
+        model = FactorModel(months, window)
+        MODELS.set((months, window), model)
+    return model
+
+
+# ─── Risk Check ──────────────────────────────────────────────────────────
+
+def equity_yardstick(records) -> dict[int, float]:
+    """Median stated equity allocation (as a fraction) per risk rating."""
+    by_rating: dict[int, list] = {}
+    for m in records:
+        equity = (m.get("asset_allocation") or {}).get("equity")
+        if equity is not None:
+            by_rating.setdefault(m["risk_rating"], []).append(equity / 100)
+    medians = {}
+    for rating, values in by_rating.items():
+        values.sort()
+        mid = len(values) // 2
+        medians[rating] = values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+    return medians
+
+
+def _live_yardstick() -> dict[int, float]:
+    version = get_data_version()
+    if _yardstick["version"] != version:
+        with _yardstick_lock:
+            if _yardstick["version"] != version:
+                _yardstick.update(medians=equity_yardstick(get_all_mps()), version=version)
+    return _yardstick["medians"]
+
+
+def risk_check(mps: dict, fit: dict, yardstick: dict[int, float]) -> dict:
+    """Equity exposure implied by the fit, the rating it points to and whether that
+    is RISK_MISMATCH_STEPS or more from the stated one. The last two are None when
+    the factors explain less than MIN_R_SQUARED of the returns."""
+    equity = sum(fit["betas"][f] for f in EQUITY_FACTORS)
+    meaningful = fit["r_squared"] is not None and fit["r_squared"] >= MIN_R_SQUARED
+    implied = min(yardstick, key=lambda r: (abs(yardstick[r] - equity), r)) if yardstick and meaningful else None
+    return {
+        "equity_exposure": round(equity, 3),
+        "implied_risk_rating": implied,
+        "risk_rating_mismatch": None if implied is None else abs(implied - mps["risk_rating"]) >= RISK_MISMATCH_STEPS,
+    }
+
+
+# ─── Public ──────────────────────────────────────────────────────────────
+
+def exposures_for(mps: dict, months: int = DEFAULT_MONTHS, window: int = DEFAULT_WINDOW,
+                  universe=None, rolling: bool = False) -> dict:
+    """Full-period fit and risk check for one portfolio, plus rolling betas if asked.
+    Pass the recorded `universe` for point-in-time records; the live one is used
+    otherwise, and its results are cached per data version."""
+    key = None if universe is not None else (get_data_version(), mps["id"], months, window, rolling)
+    if key is not None:
+        hit = DETAILS.get(key)
+        if hit is not None:
+            return hit
+    model = get_model(months, window)
+    returns = monthly_returns(mps, months, universe is None)
+    fit = model.fit(returns)
+    yardstick = _live_yardstick() if universe is None else equity_yardstick(universe)
+    result = {"months": months, "window": window, **fit, **risk_check(mps, fit, yardstick)}
+    if rolling:
+        result["rolling"] = model.rolling(returns)
+    if key is not None:
+        DETAILS.set(key, result)
+    return result
+
+
+def _exposures(portfolios, months: int) -> list[dict]:
+    model = get_model(months, min(DEFAULT_WINDOW, months))
+    yardstick = _live_yardstick()
+    rows = []
+    for m in portfolios:
+        fit = model.fit(monthly_returns(m, months))
+        rows.append({"id": m["id"], "name": m["name"], "provider": m["provider"],
+                     "risk_rating": m["risk_rating"], **fit, **risk_check(m, fit, yardstick)})
+    return rows
+
+
+def factor_exposures(ids: list[str] | None = None, months: int = DEFAULT_MONTHS) -> list[dict]:
+    """Full-period fit and risk check for the given MPS ids (unknown ids are skipped),
+    or for the whole universe, cached per data version."""
+    if ids is not None:
+        return _exposures([m for m in map(get_mps_by_id, ids) if m], months)
+    key = (get_data_version(), months)
+    rows = RESULTS.get(key)
+    if rows is None:
+        rows = _exposures(get_all_mps(), months)
+        RESULTS.set(key, rows)
+    return rows
@@ -0,0 +1,188 @@
+from __future__ import annotations
+"""
+Bridge – Selection Result Cache
+filter_mps results by normalised filter signature, stored as MPS id lists
+
+Equivalent queries share an entry: list parameters are de-duplicated and
+sorted, and max_ocf is rounded up to an OCF_BUCKET grid point so nearby
+slider positions share the broader result, with the exact limit applied on
+the way out. A query with no entry of its own is answered by narrowing the
+smallest cached result of a query that covers it, before falling back to a
+full scan. Only a query with the same or looser ethical, decumulation and
+time-horizon settings can cover another, so candidates are indexed by those
+and the BROADER_CANDIDATES most recent per setting are considered. Entries
+are keyed by data version and evicted least recently used once their id
+lists exceed BRIDGE_FILTER_CACHE_MB.
+"""
+
+import math
+import os
+import sys
+import threading
+from typing import NamedTuple
+
+from cache import LRUCache
+from metrics import register_collector
+
+OCF_BUCKET = 0.05
+BROADER_CANDIDATES = 64      # per (ethical_only, decumulation, time_horizon)
+MAX_BYTES = int(float(os.environ.get("BRIDGE_FILTER_CACHE_MB", "16")) * 2**20)
+
+STATS = {"exact": 0, "narrowed": 0, "computed": 0}
+
+
+class Signature(NamedTuple):
+    risk_min: int
+    risk_max: int
+    platforms: tuple | None
+    providers: tuple | None
+    styles: tuple | None
+    ethical_only: bool
+    decumulation: bool
+    time_horizon: str | None
+    min_investment_limit: float | None
+    ocf_bucket: float | None
+
+    def filters(self) -> dict:
+        """filter_mps keyword arguments for this signature (at the bucketed OCF)."""
+        return {"risk_min": self.risk_min, "risk_max": self.risk_max,
+                "platforms": list(self.platforms) if self.platforms else None,
+                "providers": list(self.providers) if self.providers else None,
+                "styles": list(self.styles) if self.styles else None,
+                "ethical_only": self.ethical_only, "decumulation": self.decumulation,
+                "time_horizon": self.time_horizon, "min_investment_limit": self.min_investment_limit,
+                "ocf_max": self.ocf_bucket}
+
+
+def _values(values) -> tuple | None:
+    return tuple(sorted(set(values))) if values else None
+
+
+def ocf_bucket(ocf_max: float | None) -> float | None:
+    """The OCF_BUCKET grid point at or above ocf_max."""
+    if ocf_max is None or not math.isfinite(ocf_max):
+        return ocf_max
+    bucket = round(math.ceil(round(ocf_max / OCF_BUCKET, 9)) * OCF_BUCKET, 6)
+    return bucket if bucket >= ocf_max else round(bucket + OCF_BUCKET, 6)
+
+
+def signature(risk_min: int = 1, risk_max: int = 10, platforms=None, providers=None, styles=None,
+              ethical_only: bool = False, decumulation: bool = False, time_horizon: str | None = None,
+              min_investment_limit: float | None = None, ocf_max: float | None = None) -> Signature:
+    return Signature(
+        int(risk_min), int(risk_max), _values(platforms), _values(providers), _values(styles),
+        bool(ethical_only), bool(decumulation), time_horizon or None,
+        None if min_investment_limit is None else float(min_investment_limit), ocf_bucket(ocf_max),
+    )
+
+
+def _within(narrow: tuple | None, broad: tuple | None) -> bool:
+    # Lists match any of their values, so fewer values can only narrow.
+    return broad is None or (narrow is not None and set(narrow) <= set(broad))
+
+
+def _at_most(narrow: float | None, broad: float | None) -> bool:
+    return broad is None or (narrow is not None and narrow <= broad)
+
+
+def covers(broad: Signature, narrow: Signature) -> bool:
+    """True when every portfolio matching `narrow` also matches `broad`."""
+    return (broad.risk_min <= narrow.risk_min and narrow.risk_max <= broad.risk_max
+            and _within(narrow.platforms, broad.platforms)
+            and _within(narrow.providers, broad.providers)
+            and _within(narrow.styles, broad.styles)
+            and (narrow.ethical_only or not broad.ethical_only)
+            and (narrow.decumulation or not broad.decumulation)
+            and (broad.time_horizon is None or narrow.time_horizon == broad.time_horizon)
+            and _at_most(narrow.min_investment_limit, broad.min_investment_limit)
+            and _at_most(narrow.ocf_bucket, broad.ocf_bucket))
+
+
+def _id_list_bytes(ids: tuple) -> int:
+    # The id strings themselves belong to the records; only the tuple is ours.
+    return sys.getsizeof(ids) + 200
+
+
+class FilterCache:
+    """Id lists per (data version, Signature); thread-safe."""
+
+    def __init__(self, name: str = "filter_mps_results", max_bytes: int = MAX_BYTES):
+        self._lru = LRUCache(name, maxsize=100_000, maxbytes=max_bytes, sizeof=_id_list_bytes)
+        # (ethical_only, decumulation, time_horizon) -> {Signature: result size}, newest last
+        self._candidates: dict[tuple, dict] = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _remember(self, version, sig: Signature, size: int) -> None:
+        with self._lock:
+            if version != self._version:
+                self._candidates.clear()
+                self._version = version
+            group = self._candidates.setdefault((sig.ethical_only, sig.decumulation, sig.time_horizon), {})
+            group.pop(sig, None)
+            group[sig] = size
+            if len(group) > BROADER_CANDIDATES:
+                del group[next(iter(group))]
+
+    def _broader(self, version, sig: Signature) -> tuple | None:
+        """The smallest cached id list of a query covering `sig`."""
+        found = []
+        with self._lock:
+            if version != self._version:
+                return None
+            for ethical in {False, sig.ethical_only}:
+                for decumulation in {False, sig.decumulation}:
+                    for horizon in {None, sig.time_horizon}:
+                        group = self._candidates.get((ethical, decumulation, horizon), {})
+                        found += [(size, broad) for broad, size in group.items() if covers(broad, sig)]
+        for _, broad in sorted(found, key=lambda c: c[0]):
+            ids = self._lru.get((version, broad))
+            if ids is not None:
+                return ids
+        return None
+
+    def filter(self, version, filters: dict, scan, records_for, refine) -> list:
+        """filter_mps through the cache.
+
+        scan(**filters) runs a full filter, records_for(ids) loads records by id,
+        and refine(records, **filters) filters an already loaded list."""
+        sig = signature(**filters)
+        key = (version, sig)
+        ids = self._lru.get(key)
+        if ids is not None:
+            STATS["exact"] += 1
+            self._remember(version, sig, len(ids))
+            records = records_for(ids)
+        else:
+            broader = self._broader(version, sig)
+            if broader is not None:
+                STATS["narrowed"] += 1
+                records = refine(records_for(broader), **sig.filters())
+            else:
+                STATS["computed"] += 1
+                records = scan(**sig.filters())
+            self._lru.set(key, tuple(m["id"] for m in records))
+            self._remember(version, sig, len(records))
+        ocf_max = filters.get("ocf_max")
+        if ocf_max is not None and ocf_max != sig.ocf_bucket:
+            records = [m for m in records if m["ocf"] <= ocf_max]
+        return records
+
+    def clear(self) -> None:
+        self._lru.clear()
+        with self._lock:
+            self._candidates.clear()
+
+
+FILTER_CACHE = FilterCache()
+
+
+def _collect() -> list[str]:
+    lines = ["# TYPE bridge_filter_cache_lookups_total counter"]
+    for result in ("exact", "narrowed", "computed"):
+        lines.append(f'bridge_filter_cache_lookups_total{{result="{result}"}} {STATS[result]}')
+    lines += ["# TYPE bridge_filter_cache_bytes gauge", f"bridge_filter_cache_bytes {FILTER_CACHE._lru.bytes}"]
+    return lines
+
+
+register_collector(_collect)
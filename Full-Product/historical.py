@@ -0,0 +1,94 @@
+from __future__ import annotations
+"""
+Bridge – Historical Index Store
+Monthly return series for the market indices and peer-group averages portfolios are benchmarked against
+
+Like portfolio histories, series are drawn from each index's long-run
+return and volatility with an RNG seeded from a CRC of its key, so every
+process serves the same path. Months line up with the portfolio history
+grid: the last point is the current month.
+"""
+
+import math
+import random
+import zlib
+from datetime import datetime, timedelta
+
+HISTORY_MONTHS = 120
+
+# key -> (name, annual return %, annual volatility %, aliases)
+INDICES = {
+    "ftse-all-share": ("FTSE All-Share", 6.8, 14.0, ["FTSE All Share", "FTSE All-Share TR"]),
+    "ftse-world": ("FTSE World", 8.5, 14.5, ["FTSE All-World"]),
+    "msci-world": ("MSCI World", 8.8, 14.5, ["MSCI World TR"]),
+    "msci-acwi": ("MSCI ACWI", 8.2, 14.8, ["MSCI All Country World"]),
+    "global-aggregate": ("Bloomberg Barclays Global Aggregate", 1.6, 6.0,
+                         ["Bloomberg Global Aggregate", "Barclays Global Aggregate"]),
+    "gilts-all-stocks": ("FTSE Actuaries UK Gilts All Stocks", 1.2, 8.0, ["FTSE Gilts All Stocks"]),
+    "iboxx-gbp-corporates": ("iBoxx £ Corporates", 2.8, 7.0, ["iBoxx GBP Corporates", "Markit iBoxx GBP Corporates"]),
+    "gbp-twi": ("Sterling Effective Exchange Rate", 0.0, 7.0, ["GBP TWI", "Sterling ERI"]),
+    "sonia": ("SONIA", 2.4, 0.4, ["Cash", "Bank of England Base Rate", "UK Cash"]),
+    # IA sectors have no ethical sub-sectors; ethical MPS are compared against the parent sector.
+    "ia-mixed-20-60": ("IA Mixed Investment 20-60% Shares", 3.6, 7.5,
+                       ["IA Mixed Investment 20-60% Shares (Ethical)"]),
+    "ia-mixed-40-85": ("IA Mixed Investment 40-85% Shares", 5.4, 10.0,
+                       ["IA Mixed Investment 40-85% Shares (Ethical)"]),
+    "ia-flexible": ("IA Flexible Investment", 6.0, 11.0, ["IA Flexible Investment (Ethical)"]),
+    "arc-cautious": ("ARC Cautious PCI", 2.9, 5.5, []),
+    "arc-balanced": ("ARC Balanced Asset PCI", 4.3, 8.0, []),
+    "arc-steady-growth": ("ARC Steady Growth PCI", 5.3, 10.0, []),
+    "arc-equity-risk": ("ARC Equity Risk PCI", 6.2, 12.0, []),
+}
+
+
+def _draws(key: str, months: int) -> list[float]:
+    _, annual_return, annual_vol, _ = INDICES[key]
+    rng = random.Random(zlib.crc32(key.encode()))
+    base_monthly = (1 + annual_return / 100) ** (1 / 12) - 1
+    vol_monthly = annual_vol / 100 / math.sqrt(12)
+    return [rng.gauss(base_monthly, vol_monthly) for _ in range(months)]
+
+
+_RETURNS = {key: _draws(key, HISTORY_MONTHS) for key in INDICES}
+
+
+def index_returns(key: str, months: int = 36) -> list[float]:
+    """Monthly returns (decimal) for the most recent `months` months."""
+    if months > HISTORY_MONTHS:
+        raise ValueError(f"At most {HISTORY_MONTHS} months of index history")
+    return _RETURNS[key][HISTORY_MONTHS - months:]
+
+
+def month_dates(months: int) -> list[str]:
+    """Dates of the last `months` points on the history grid, oldest first."""
+    now = datetime.now()
+    return [(now - timedelta(days=i * 30)).strftime("%Y-%m-%d") for i in range(months, 0, -1)]
+
+
+def _annualised(returns: list[float]) -> tuple[float, float]:
+    growth = math.prod(1 + r for r in returns)
+    mean = sum(returns) / len(returns)
+    vol = math.sqrt(sum((r - mean) ** 2 for r in returns) / (len(returns) - 1)) * math.sqrt(12)
+    return (growth ** (12 / len(returns)) - 1) * 100, vol * 100
+
+
+def get_historical(key: str, months: int = 36) -> dict | None:
+    """Value and monthly return series for one index, or None for an unknown key."""
+    if key not in INDICES:
+        return None
+    returns = index_returns(key, min(months, HISTORY_MONTHS))
+    series, cumulative = [], 100.0
+    for date, r in zip(month_dates(len(returns)), returns):
+        cumulative *= 1 + r
+        series.append({"date": date, "value": round(cumulative, 2), "monthly_return": round(r * 100, 2)})
+    return {"key": key, "name": INDICES[key][0], "months": len(series), "series": series}
+
+
+def get_benchmarks() -> dict:
+    """Every index in the store with its 3-year annualised return and volatility."""
+    indices = []
+    for key, (name, _, _, aliases) in INDICES.items():
+        ret, vol = _annualised(index_returns(key, 36))
+        indices.append({"key": key, "name": name, "aliases": aliases,
+                        "return_3yr_annualised": round(ret, 2), "volatility_3yr": round(vol, 2)})
+    return {"count": len(indices), "benchmarks": indices}
@@ -4,6 +4,7 @@ Bridge – API Server
 B2B SaaS platform for UK financial adviser firms
 """
 
+from startup import lazy_module, mark, startup_report
 from fastapi import FastAPI, HTTPException, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
@@ -16,29 +17,55 @@ from mps_data import (
     get_all_mps, get_providers, get_provider, get_mps_by_provider,
     get_mps_by_id, get_platforms, get_investment_styles,
     get_performance_history, filter_mps, get_historical, get_benchmarks,
-    get_cost_table,
+    get_data_version, get_peers, get_history_for, filter_records,
 )
 from insights import (
     get_all_insights, get_insight_by_id, get_insights_by_category,
     get_insight_categories, search_insights,
 )
+from emails import send_email, RESEND_API_KEY
+from metrics import MetricsMiddleware, render_metrics
+from compression import CompressionMiddleware
+from ratelimit import RateLimitMiddleware, charge as charge_rate_limit
+from events import HUB
+import versions
+import facets
+import drift
+import batch
+from profiling import ProfilingMiddleware, is_admin, profile_path, RECENT as RECENT_PROFILES
+from executors import ExecutorBusy, CPU, run_cpu, run_io, get_executor_stats
+from singleflight import coalesce
 from auth import authenticate, create_session, get_session, destroy_session
 from messaging import send_message, get_messages, get_message_by_id
 from subscriptions import subscribe, unsubscribe, get_subscriptions, is_subscribed
 from preferences import get_preferences, update_preferences, set_subscription_alert
 
+# Heavier subsystems load on first use rather than at cold start.
+optimiser = lazy_module("optimiser")
+costs = lazy_module("costs")
+exports = lazy_module("exports")
+compare = lazy_module("compare")
+oversight = lazy_module("oversight")
+benchmarks = lazy_module("benchmarks")
+stress = lazy_module("stress")
+factors = lazy_module("factors")
+mark("imports")
+
 app = FastAPI(
     title="Bridge",
     description="Independent MPS research & oversight platform for UK financial advisers",
     version="1.0.0",
 )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Innermost first: compression runs inside metrics, so cache hits are still counted.
+# Rate limiting is added after get_current_user is defined, between the two.
+app.add_middleware(CompressionMiddleware)
+
+
+@app.exception_handler(ExecutorBusy)
+async def executor_busy(request: Request, exc: ExecutorBusy):
+    from fastapi.responses import JSONResponse
+    return JSONResponse({"detail": "Server busy, please retry"}, status_code=503, headers={"Retry-After": "1"})
 
 
 def safe_avg(values):
@@ -47,22 +74,70 @@ def safe_avg(values):
     return round(sum(clean) / len(clean), 2) if clean else 0
 
 
+FIELDS_QUERY = Query(None, description="Comma-separated fields to keep, e.g. id,name,ocf,risk_rating")
+AS_OF_QUERY = Query(None, description="ISO date or datetime: answer from the data as recorded at that time")
+
+
+def project(records: list[dict], fields: Optional[str]) -> list[dict]:
+    """Trim records to the requested fields before serialization."""
+    if not fields:
+        return records
+    keep = [f.strip() for f in fields.split(",") if f.strip()]
+    return [{k: r[k] for k in keep if k in r} for r in records]
+
+
+async def state_as_of(as_of: str) -> "versions.State":
+    """The recorded data in force at `as_of`, for point-in-time queries."""
+    if not versions.PERSISTENT:
+        raise HTTPException(503, "Point-in-time queries need a persistent history: set BRIDGE_VERSIONS_DB to a file")
+    try:
+        when = versions.parse_as_of(as_of)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    state = await run_cpu(versions.state_as_of, when)
+    if state is None:
+        raise HTTPException(404, f"No data recorded on or before {as_of}")
+    return state
+
+
 def get_current_user(request: Request) -> Optional[dict]:
     """Extract user from session token in cookie or header."""
+    state = request.scope.get("state", {})
+    if "user" in state:          # already resolved by the rate limiter
+        return state["user"]
     token = request.cookies.get("bridge_session") or request.headers.get("X-Session-Token")
     if not token:
         return None
     return get_session(token)
 
 
-def require_auth(request: Request) -> dict:
+async def require_auth(request: Request) -> dict:
     """Dependency: require authenticated user."""
-    user = get_current_user(request)
+    user = await run_io(get_current_user, request)
     if not user:
         raise HTTPException(401, "Not authenticated")
     return user
 
 
+async def require_admin(request: Request) -> dict:
+    """Dependency: require an admin session."""
+    user = await require_auth(request)
+    if not is_admin(user):
+        raise HTTPException(403, "Admin access required")
+    return user
+
+
+app.add_middleware(RateLimitMiddleware, get_user=get_current_user)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.add_middleware(ProfilingMiddleware, get_user=get_current_user)
+
+
 # ─── Auth ──────────────────────────────────────────────────────────────
 
 @app.post("/api/auth/login")
@@ -71,10 +146,10 @@ async def login(body: dict):
     password = body.get("password", "")
     if not email or not password:
         raise HTTPException(400, "Email and password required")
-    user = authenticate(email, password)
+    user = await run_io(authenticate, email, password)
     if not user:
         raise HTTPException(401, "Invalid credentials")
-    token = create_session(user)
+    token = await run_io(create_session, user)
     from fastapi.responses import JSONResponse
     resp = JSONResponse({"status": "ok", "user": user})
     resp.set_cookie("bridge_session", token, httponly=True, samesite="lax", max_age=86400)
@@ -85,7 +160,7 @@ async def login(body: dict):
 async def logout(request: Request):
     token = request.cookies.get("bridge_session") or request.headers.get("X-Session-Token")
     if token:
-        destroy_session(token)
+        await run_io(destroy_session, token)
     from fastapi.responses import JSONResponse
     resp = JSONResponse({"status": "ok"})
     resp.delete_cookie("bridge_session")
@@ -94,10 +169,10 @@ async def logout(request: Request):
 
 @app.get("/api/auth/me")
 async def get_me(request: Request):
-    user = get_current_user(request)
+    user = await run_io(get_current_user, request)
     if not user:
         return {"authenticated": False}
-    subs = get_subscriptions(user["id"])
+    subs = await run_io(get_subscriptions, user["id"])
     return {"authenticated": True, "user": user, "subscriptions": subs}
 
 
@@ -111,7 +186,8 @@ async def create_message(body: dict, user: dict = Depends(require_auth)):
     provider_name = body.get("provider_name")
     if not subject or not message_body:
         raise HTTPException(400, "Subject and message are required")
-    msg = send_message(
+    msg = await run_io(
+        send_message,
         user_id=user["id"],
         user_name=user["name"],
         user_firm=user["firm"],
@@ -133,23 +209,7 @@ async def create_message(body: dict, user: dict = Depends(require_auth)):
     )
 
     if RESEND_API_KEY:
-        import httpx
-        try:
-            async with httpx.AsyncClient() as client:
-                r = await client.post(
-                    "https://api.resend.com/emails",
-                    headers={"Authorization": f"Bearer {RESEND_API_KEY}"},
-                    json={
-                        "from": "Bridge Messages <onboarding@resend.dev>",
-                        "to": [FEEDBACK_EMAIL],
-                        "subject": email_subject,
-                        "text": email_body,
-                    },
-                )
-                if r.status_code not in (200, 201):
-                    print(f"Resend error: {r.text}")
-        except Exception as e:
-            print(f"Resend error: {e}")
+        await send_email("Bridge Messages <onboarding@resend.dev>", email_subject, email_body)
     else:
         print(f"\n--- MESSAGE ---")
         print(f"Subject: {email_subject}")
@@ -162,13 +222,13 @@ async def create_message(body: dict, user: dict = Depends(require_auth)):
 
 @app.get("/api/messages")
 async def list_messages(user: dict = Depends(require_auth)):
-    msgs = get_messages(user["id"])
+    msgs = await run_io(get_messages, user["id"])
     return {"count": len(msgs), "messages": msgs}
 
 
 @app.get("/api/messages/{message_id}")
 async def get_message_detail(message_id: str, user: dict = Depends(require_auth)):
-    msg = get_message_by_id(message_id, user["id"])
+    msg = await run_io(get_message_by_id, message_id, user["id"])
     if not msg:
         raise HTTPException(404, "Message not found")
     return {"message": msg}
@@ -182,40 +242,76 @@ async def create_subscription(body: dict, user: dict = Depends(require_auth)):
     provider_name = body.get("provider_name", "").strip()
     if not provider_id:
         raise HTTPException(400, "Provider ID required")
-    sub = subscribe(user["id"], provider_id, provider_name, user_email=user.get("email", ""))
+    sub = await run_io(subscribe, user["id"], provider_id, provider_name, user_email=user.get("email", ""))
+    await _refresh_alerts(user["id"])
     return {"status": "ok", "subscription": sub}
 
 
 @app.delete("/api/subscriptions/{provider_id}")
 async def remove_subscription(provider_id: str, user: dict = Depends(require_auth)):
-    success = unsubscribe(user["id"], provider_id)
+    success = await run_io(unsubscribe, user["id"], provider_id)
     if not success:
         raise HTTPException(404, "Subscription not found")
+    await _refresh_alerts(user["id"])
     return {"status": "ok"}
 
 
 @app.get("/api/subscriptions")
 async def list_subscriptions(user: dict = Depends(require_auth)):
-    subs = get_subscriptions(user["id"])
+    subs = await run_io(get_subscriptions, user["id"])
     return {"count": len(subs), "subscriptions": subs}
 
 
+async def _refresh_alerts(user_id: str) -> None:
+    subs = await run_io(get_subscriptions, user_id)
+    HUB.subscriptions_changed(user_id, [s["provider_id"] for s in subs])
+
+
 @app.get("/api/subscriptions/check/{provider_id}")
 async def check_subscription(provider_id: str, user: dict = Depends(require_auth)):
-    return {"subscribed": is_subscribed(user["id"], provider_id)}
+    return {"subscribed": await run_io(is_subscribed, user["id"], provider_id)}
+
+
+# ─── Live Events ───────────────────────────────────────────────────────
+
+@app.get("/api/events")
+async def event_stream(request: Request):
+    """Server-Sent Events: data_version, insight, and provider_update for subscribed providers."""
+    user = await run_io(get_current_user, request)
+    subs = await run_io(get_subscriptions, user["id"]) if user else []
+    client = HUB.connect(user["id"] if user else None, {s["provider_id"] for s in subs})
+    if client is None:
+        raise HTTPException(503, "Too many live connections")
+    from fastapi.responses import StreamingResponse
+    return StreamingResponse(
+        HUB.stream(client),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/admin/events/provider-update")
+async def publish_provider_update(body: dict, user: dict = Depends(require_admin)):
+    """Alert every subscriber of a provider, on all workers."""
+    provider_id = body.get("provider_id", "").strip()
+    if not provider_id:
+        raise HTTPException(400, "Provider ID required")
+    HUB.publish("provider_update", {"provider_id": provider_id, "reason": body.get("message", "")},
+                provider_id=provider_id)
+    return {"status": "ok"}
 
 
 # ─── Preferences ───────────────────────────────────────────────────────
 
 @app.get("/api/preferences")
 async def get_user_preferences(user: dict = Depends(require_auth)):
-    prefs = get_preferences(user["id"])
+    prefs = await run_io(get_preferences, user["id"])
     return {"preferences": prefs}
 
 
 @app.put("/api/preferences")
 async def update_user_preferences(body: dict, user: dict = Depends(require_auth)):
-    prefs = update_preferences(user["id"], body)
+    prefs = await run_io(update_preferences, user["id"], body)
     return {"status": "ok", "preferences": prefs}
 
 
@@ -225,7 +321,7 @@ async def toggle_subscription_alert(body: dict, user: dict = Depends(require_aut
     enabled = body.get("enabled", True)
     if not provider_id:
         raise HTTPException(400, "Provider ID required")
-    prefs = set_subscription_alert(user["id"], provider_id, enabled)
+    prefs = await run_io(set_subscription_alert, user["id"], provider_id, enabled)
     return {"status": "ok", "preferences": prefs}
 
 
@@ -233,6 +329,10 @@ async def toggle_subscription_alert(body: dict, user: dict = Depends(require_aut
 
 @app.get("/api/selection/filters")
 async def get_filter_options():
+    return await run_cpu(_filter_options)
+
+
+def _filter_options() -> dict:
     all_mps = get_all_mps()
     risk_ratings = sorted(set(m["risk_rating"] for m in all_mps))
     providers = sorted(set(m["provider"] for m in all_mps))
@@ -254,8 +354,7 @@ async def get_filter_options():
     }
 
 
-@app.get("/api/selection/mps")
-async def search_mps(
+async def selection_filters(
     risk_min: int = Query(1, ge=1, le=10),
     risk_max: int = Query(10, ge=1, le=10),
     platforms: Optional[str] = None,
@@ -264,27 +363,99 @@ async def search_mps(
     decumulation: bool = False,
     time_horizon: Optional[str] = None,
     max_ocf: Optional[float] = None,
+    min_investment: Optional[float] = None,
+) -> dict:
+    """Dependency: selection query parameters as filter_mps keyword arguments."""
+    return {
+        "risk_min": risk_min, "risk_max": risk_max,
+        "platforms": platforms.split(",") if platforms else None,
+        "providers": providers.split(",") if providers else None,
+        "ethical_only": ethical_only, "decumulation": decumulation,
+        "time_horizon": time_horizon, "ocf_max": max_ocf,
+        "min_investment_limit": min_investment,
+    }
+
+
+@app.get("/api/selection/mps")
+async def search_mps(filters: dict = Depends(selection_filters), fields: Optional[str] = FIELDS_QUERY,
+                     as_of: Optional[str] = AS_OF_QUERY):
+    if as_of:
+        state = await state_as_of(as_of)
+        results = await run_cpu(filter_records, state.universe(), **filters)
+        return {"count": len(results), "mps": project(results, fields), "as_of": state.info()}
+    results = await run_cpu(filter_mps, **filters)
+    return {"count": len(results), "mps": project(results, fields)}
+
+
+@app.get("/api/selection/facets")
+async def search_mps_facets(filters: dict = Depends(selection_filters), fields: Optional[str] = FIELDS_QUERY):
+    """Selection results with live counts per platform, provider, risk rating and
+    time horizon; each facet is counted without its own constraint."""
+    result = await run_cpu(facets.search, **filters)
+    return {**result, "mps": project(result["mps"], fields)}
+
+
+@app.get("/api/selection/mps/export")
+async def export_mps(
+    format: str = Query("csv", pattern="^(csv|xlsx|parquet)$"),
+    include_history: bool = False,
+    months: int = Query(36, ge=6, le=60),
+    filters: dict = Depends(selection_filters),
 ):
-    platform_list = platforms.split(",") if platforms else None
-    provider_list = providers.split(",") if providers else None
-
-    results = filter_mps(
-        risk_min=risk_min, risk_max=risk_max,
-        platforms=platform_list, providers=provider_list,
-        ethical_only=ethical_only, decumulation=decumulation,
-        time_horizon=time_horizon, ocf_max=max_ocf,
+    media_type, module = exports.EXPORT_FORMATS[format]
+    if module:
+        import importlib.util
+        if importlib.util.find_spec(module) is None:
+            raise HTTPException(501, f"{format.upper()} export requires {module}")
+
+    results = await run_cpu(filter_mps, **filters)
+    from fastapi.responses import StreamingResponse
+    return StreamingResponse(
+        CPU.iterate(exports.stream_export(results, format, include_history, months)),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=bridge_mps_selection.{format}"},
     )
-    return {"count": len(results), "mps": results}
+
+
+@app.get("/api/selection/frontier")
+async def get_selection_frontier(
+    target_volatility: Optional[float] = Query(None, gt=0, le=40),
+    risk_target: Optional[int] = Query(None, ge=1, le=10),
+    max_weight: float = Query(1.0, gt=0, le=1),
+    points: int = Query(12, ge=2, le=50),
+    filters: dict = Depends(selection_filters),
+):
+    """Efficient frontier over the filtered candidates and the best blend within a
+    volatility target. Figures are in-sample over simulated history and overstate
+    what any blend would deliver; `converged` is false when the time budget ran out."""
+    if target_volatility is None:
+        if risk_target is None:
+            raise HTTPException(400, "target_volatility or risk_target required")
+        target_volatility = await run_cpu(optimiser.risk_rating_volatility, risk_target)
+        if target_volatility is None:
+            raise HTTPException(404, "No portfolios at that risk rating")
+
+    result = await run_cpu(optimiser.optimise_panel, filters, target_volatility, points=points, max_weight=max_weight)
+    if not result["candidate_count"]:
+        raise HTTPException(404, "No MPS match the selection filters")
+    return result
 
 
 # ─── Analysis Module ───────────────────────────────────────────────────
 
 @app.get("/api/providers")
-async def list_providers():
-    providers = get_providers()
+async def list_providers(as_of: Optional[str] = AS_OF_QUERY):
+    if as_of:
+        state = await state_as_of(as_of)
+        return {**await run_cpu(_provider_summaries, state), "as_of": state.info()}
+    return await coalesce("/api/providers", (get_data_version(),), run_cpu, _provider_summaries)
+
+
+def _provider_summaries(state: Optional["versions.State"] = None) -> dict:
+    providers = state.providers if state else get_providers()
     result = []
     for name, data in providers.items():
-        portfolios = get_mps_by_provider(name)
+        portfolios = state.by_provider(name) if state else get_mps_by_provider(name)
         result.append({
             **data,
             "portfolio_count": len(portfolios),
@@ -295,9 +466,9 @@ async def list_providers():
 
 
 @app.get("/api/providers/{provider_id}")
-async def get_provider_detail(provider_id: str):
+async def get_provider_detail(provider_id: str, fields: Optional[str] = FIELDS_QUERY):
     provider = None
-    for name, data in get_providers().items():
+    for name, data in (await run_io(get_providers)).items():
         if data["id"] == provider_id:
             provider = data
             break
@@ -305,11 +476,11 @@ async def get_provider_detail(provider_id: str):
     if not provider:
         raise HTTPException(404, "Provider not found")
 
-    portfolios = get_mps_by_provider(provider["name"])
+    portfolios = await run_cpu(get_mps_by_provider, provider["name"])
 
     return {
         "provider": provider,
-        "portfolios": portfolios,
+        "portfolios": project(portfolios, fields),
         "analytics": {
             "avg_ocf": safe_avg([p["ocf"] for p in portfolios]),
             "avg_return_1yr": safe_avg([p.get("return_1yr") for p in portfolios]),
@@ -318,25 +489,46 @@ async def get_provider_detail(provider_id: str):
             "platform_count": len(set(p for port in portfolios for p in port.get("platforms", []))),
         },
     }
+
+
 @app.get("/api/mps/{mps_id}")
-async def get_mps_detail(mps_id: str):
-    mps = get_mps_by_id(mps_id)
+async def get_mps_detail(mps_id: str, fields: Optional[str] = FIELDS_QUERY, as_of: Optional[str] = AS_OF_QUERY,
+                         rolling_factors: bool = False):
+    """`fields` trims both the MPS record and its peers; `rolling_factors` adds rolling
+    factor betas to the exposures."""
+    if as_of:
+        state = await state_as_of(as_of)
+        mps = state.mps.get(mps_id)
+        if not mps:
+            raise HTTPException(404, f"MPS not found as of {as_of}")
+        return {**await run_cpu(_mps_detail, mps, fields, state, rolling_factors), "as_of": state.info()}
+    mps = await run_io(get_mps_by_id, mps_id)
     if not mps:
         raise HTTPException(404, "MPS not found")
+    return await run_cpu(_mps_detail, mps, fields, None, rolling_factors)
 
-    provider = get_provider(mps["provider"])
-    history = get_performance_history(mps_id, months=36)
 
-    peers = [m for m in get_all_mps()
-             if m["risk_rating"] == mps["risk_rating"] and m["id"] != mps_id]
+def _mps_detail(mps: dict, fields: Optional[str] = None, state: Optional["versions.State"] = None,
+                rolling_factors: bool = False) -> dict:
+    mps_id = mps["id"]
+    if state:
+        provider = state.providers.get(mps["provider"])
+        history = get_history_for(mps, months=36)
+        peers = [m for m in state.universe() if m["risk_rating"] == mps["risk_rating"] and m["id"] != mps_id]
+    else:
+        provider = get_provider(mps["provider"])
+        history = get_performance_history(mps_id, months=36)
+        peers = get_peers(mps)
 
     return {
-        "mps": mps,
+        "mps": project([mps], fields)[0],
         "provider": provider,
         "performance_history": history,
+        "factor_exposures": factors.exposures_for(mps, universe=state.universe() if state else None,
+                                                  rolling=rolling_factors),
         "peer_comparison": {
             "count": len(peers),
-            "peers": peers,
+            "peers": project(peers, fields),
             "avg_ocf": safe_avg([p["ocf"] for p in peers]),
             "avg_return_1yr": safe_avg([p.get("return_1yr") for p in peers]),
             "avg_return_3yr": safe_avg([p.get("return_3yr") for p in peers]),
@@ -346,31 +538,151 @@ async def get_mps_detail(mps_id: str):
 
 @app.get("/api/mps/{mps_id}/performance")
 async def get_mps_performance(mps_id: str, months: int = Query(36, ge=6, le=60)):
-    mps = get_mps_by_id(mps_id)
+    mps = await run_io(get_mps_by_id, mps_id)
     if not mps:
         raise HTTPException(404, "MPS not found")
-    return {"mps_id": mps_id, "history": get_performance_history(mps_id, months)}
+    history = await coalesce("/api/mps/{mps_id}/performance", (mps_id, months, get_data_version()),
+                             run_cpu, get_performance_history, mps_id, months)
+    return {"mps_id": mps_id, "history": history}
 
 
 @app.get("/api/compare")
-async def compare_mps(ids: str = Query(..., description="Comma-separated MPS IDs")):
-    id_list = [i.strip() for i in ids.split(",")]
-    results = [get_mps_by_id(i) for i in id_list if get_mps_by_id(i)]
+async def compare_mps(
+    ids: str = Query(..., description="Comma-separated MPS IDs"),
+    months: int = Query(36, ge=6, le=60),
+):
+    id_list = [i.strip() for i in ids.split(",") if i.strip()]
+    if len(id_list) > compare.MAX_COMPARE:
+        raise HTTPException(400, f"At most {compare.MAX_COMPARE} MPS can be compared")
 
-    if not results:
+    result = await run_cpu(compare.compare_portfolios, id_list, months)
+    if not result["count"]:
         raise HTTPException(404, "No valid MPS found")
 
-    return {
-        "count": len(results),
-        "mps": results,
-    }
+    return result
+
+
+# ─── Stress Testing ────────────────────────────────────────────────────
+
+@app.get("/api/stress/scenarios")
+async def get_stress_scenarios():
+    return {"factors": stress.FACTORS, "scenarios": stress.list_scenarios()}
+
+
+async def _stress(items: list, top: int) -> dict:
+    try:
+        scenarios = await run_cpu(stress.resolve_scenarios, items)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    results = await run_cpu(stress.run_stress, scenarios, top)
+    return {"count": len(results), "results": results}
+
+
+@app.get("/api/stress")
+async def get_stress(
+    scenarios: Optional[str] = Query(None, description="Comma-separated scenario ids; every built-in one if omitted"),
+    top: int = Query(50, ge=0, le=1000, description="Worst portfolios to list per scenario; 0 for all"),
+):
+    """Estimated return of every portfolio under each scenario, worst first, with provider averages."""
+    items = [s.strip() for s in scenarios.split(",") if s.strip()] if scenarios else list(stress.SCENARIOS)
+    return await _stress(items, top)
+
+
+@app.post("/api/stress")
+async def post_stress(body: dict):
+    """As GET, with custom scenarios: {"scenarios": ["covid-2020", {"id": ..., "name": ...,
+    "asset_classes": {"equity": -20}, "regions": {"uk": -5}}], "top": 50}."""
+    items = body.get("scenarios") or list(stress.SCENARIOS)
+    top = body.get("top", 50)
+    if not isinstance(items, list):
+        raise HTTPException(400, "scenarios must be a list")
+    if not isinstance(top, int) or isinstance(top, bool) or not 0 <= top <= 1000:
+        raise HTTPException(400, "top must be an integer between 0 and 1000")
+    return await _stress(items, top)
+
+
+# ─── Bulk Oversight ────────────────────────────────────────────────────
+
+@app.get("/api/oversight/drift")
+async def get_rebalancing_drift(
+    ids: Optional[str] = Query(None, description="Comma-separated MPS IDs; all portfolios if omitted"),
+    band: float = Query(drift.DEFAULT_BAND, gt=0, le=50, description="Tolerance band, percentage points"),
+    years: int = Query(drift.DEFAULT_YEARS, ge=1, le=10),
+    paths: int = Query(drift.DEFAULT_PATHS, ge=1, le=500),
+    fields: Optional[str] = FIELDS_QUERY,
+):
+    """Simulated allocation drift under each portfolio's rebalancing policy: share of
+    weeks outside the tolerance band, drift, rebalances and turnover per year."""
+    if paths * years > drift.MAX_PATH_YEARS:
+        raise HTTPException(400, f"paths × years may be at most {drift.MAX_PATH_YEARS}")
+    try:
+        if ids:
+            id_list = [i.strip() for i in ids.split(",") if i.strip()]
+            report = await run_cpu(drift.drift_report, id_list, band, years, paths)
+            if not report["count"]:
+                raise HTTPException(404, "No valid MPS found")
+        else:
+            report = await coalesce("/api/oversight/drift", (get_data_version(), band, years, paths),
+                                    run_cpu, drift.drift_report, None, band, years, paths)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {**report, "portfolios": project(report["portfolios"], fields)}
+
+
+@app.post("/api/oversight/jobs", status_code=202)
+async def create_oversight_job(
+    request: Request,
+    max_ocf: Optional[float] = Query(None, gt=0),
+    risk_tolerance: Optional[int] = Query(None, ge=0, le=9),
+    underperformance: Optional[float] = Query(None, ge=0),
+    user: dict = Depends(require_auth),
+):
+    """Upload a client book as CSV or JSONL (client_id, mps_id, pot_size, risk_profile, platform)."""
+    params = {"max_ocf": max_ocf, "risk_tolerance": risk_tolerance, "underperformance": underperformance}
+    try:
+        job = await oversight.create_job(user["id"], request.stream(), request.headers.get("content-type", ""), params)
+    except oversight.UploadTooLarge as e:
+        raise HTTPException(413, str(e))
+    if not job:
+        raise HTTPException(400, "Empty upload")
+    return {"job": job}
+
+
+@app.get("/api/oversight/jobs/{job_id}")
+async def get_oversight_job(job_id: str, user: dict = Depends(require_auth)):
+    job = await run_io(oversight.get_job, job_id, user["id"])
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return {"job": job}
+
+
+@app.get("/api/oversight/jobs/{job_id}/results")
+async def get_oversight_results(
+    job_id: str,
+    format: str = Query("csv", pattern="^(csv|jsonl)$"),
+    flagged_only: bool = False,
+    user: dict = Depends(require_auth),
+):
+    job = await run_io(oversight.get_job, job_id, user["id"])
+    if not job:
+        raise HTTPException(404, "Job not found")
+    if job["status"] != "complete":
+        raise HTTPException(409, f"Job is {job['status']}")
+
+    from fastapi.responses import StreamingResponse
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        await run_io(oversight.iter_results, job_id, format, flagged_only),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=oversight_{job_id}.{format}"},
+    )
 
 
 # ─── Historical & Benchmarks ──────────────────────────────────────────
 
 @app.get("/api/historical/{key}")
-async def get_historical_data(key: str):
-    data = get_historical(key)
+async def get_historical_data(key: str, months: int = Query(36, ge=6, le=120)):
+    data = get_historical(key, months)
     if not data:
         raise HTTPException(404, "Historical data not found")
     return data
@@ -381,9 +693,65 @@ async def get_benchmark_data():
     return get_benchmarks()
 
 
+@app.get("/api/benchmarks/relative")
+async def get_relative_performance(
+    ids: Optional[str] = Query(None, description="Comma-separated MPS IDs; all portfolios if omitted"),
+    months: int = Query(36, ge=6, le=60),
+    fields: Optional[str] = FIELDS_QUERY,
+):
+    """Excess return, tracking error, information ratio and up/down capture of each
+    portfolio against the composite parsed from its benchmark text."""
+    if ids:
+        id_list = [i.strip() for i in ids.split(",") if i.strip()]
+        rows = await run_cpu(benchmarks.relative_performance, id_list, months)
+        if not rows:
+            raise HTTPException(404, "No valid MPS found")
+    else:
+        rows = await coalesce("/api/benchmarks/relative", (get_data_version(), months),
+                              run_cpu, benchmarks.relative_performance, None, months)
+    return {"count": len(rows), "months": months, "portfolios": project(rows, fields)}
+
+
+@app.get("/api/factors/exposures")
+async def get_factor_exposures(
+    ids: Optional[str] = Query(None, description="Comma-separated MPS IDs; all portfolios if omitted"),
+    months: int = Query(36, ge=12, le=60),
+    mismatch_only: bool = False,
+    fields: Optional[str] = FIELDS_QUERY,
+):
+    """Alpha, factor betas and R² of each portfolio's monthly returns, with the risk
+    rating its equity exposure implies and whether that disagrees with the stated one
+    (both null when the factors explain too little of the returns to say).
+    `risk_check.checked` counts the portfolios whose fit cleared that bar; on the
+    synthetic histories, drawn independently of the factor series, it is usually 0."""
+    if ids:
+        id_list = [i.strip() for i in ids.split(",") if i.strip()]
+        rows = await run_cpu(factors.factor_exposures, id_list, months)
+        if not rows:
+            raise HTTPException(404, "No valid MPS found")
+    else:
+        rows = await coalesce("/api/factors/exposures", (get_data_version(), months),
+                              run_cpu, factors.factor_exposures, None, months)
+    checked = sum(1 for r in rows if r["implied_risk_rating"] is not None)
+    if mismatch_only:
+        rows = [r for r in rows if r["risk_rating_mismatch"]]
+    return {"count": len(rows), "months": months, "portfolios": project(rows, fields),
+            "risk_check": {"min_r_squared": factors.MIN_R_SQUARED, "checked": checked}}
+
+
 @app.get("/api/costs")
-async def get_costs():
-    return {"costs": get_cost_table()}
+async def get_costs(
+    pot_size: float = Query(100000, gt=0),
+    adviser_fee_bps: float = Query(50, ge=0, le=300),
+    platform: Optional[str] = None,
+    mps_id: Optional[str] = None,
+):
+    table = await run_cpu(costs.get_cost_table, pot_size, adviser_fee_bps)
+    if platform or mps_id:
+        rows = [r for r in table["rows"]
+                if (not platform or r["platform"] == platform) and (not mps_id or r["mps_id"] == mps_id)]
+        table = {**table, "count": len(rows), "rows": rows}
+    return {"costs": table}
 
 
 # ─── Insights Module ──────────────────────────────────────────────────
@@ -392,9 +760,10 @@ async def get_costs():
 async def list_insights(
     category: Optional[str] = None,
     search: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY,
 ):
     if search:
-        results = search_insights(search)
+        results = await run_cpu(search_insights, search)
     elif category:
         results = get_insights_by_category(category)
     else:
@@ -402,7 +771,7 @@ async def list_insights(
 
     return {
         "count": len(results),
-        "insights": results,
+        "insights": project(results, fields),
         "categories": get_insight_categories(),
     }
 
@@ -419,6 +788,10 @@ async def get_insight_detail(insight_id: str):
 
 @app.get("/api/dashboard")
 async def get_dashboard():
+    return await coalesce("/api/dashboard", (get_data_version(),), run_cpu, _dashboard)
+
+
+def _dashboard() -> dict:
     all_mps = get_all_mps()
     providers = get_providers()
     insights = get_all_insights()
@@ -453,10 +826,47 @@ async def health():
     return {"status": "healthy", "version": "1.0.0", "platform": "Bridge"}
 
 
-# ─── Feedback ──────────────────────────────────────────────────────────
+@app.get("/api/admin/executors")
+async def get_executors(user: dict = Depends(require_admin)):
+    return {"executors": get_executor_stats()}
+
+
+@app.get("/api/admin/startup")
+async def get_startup_report(user: dict = Depends(require_admin)):
+    return startup_report()
+
 
-FEEDBACK_EMAIL = os.environ.get("FEEDBACK_EMAIL", "feedback@bridge.example.com")
-RESEND_API_KEY = os.environ.get("RESEND_API_KEY", "")
+@app.get("/api/admin/versions")
+async def get_data_versions(user: dict = Depends(require_admin)):
+    """Recorded point-in-time versions, for checking what as_of= can answer."""
+    return {"versions": await run_io(versions.list_versions)}
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(user: dict = Depends(require_admin)):
+    return {"count": len(RECENT_PROFILES), "profiles": list(RECENT_PROFILES)}
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("summary", pattern="^(summary|collapsed|prof)$"),
+    user: dict = Depends(require_admin),
+):
+    path = profile_path(profile_id, format)
+    if not path:
+        raise HTTPException(404, "Profile not found")
+    media_type = "application/octet-stream" if format == "prof" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
+
+
+@app.get("/api/metrics")
+async def metrics():
+    from fastapi.responses import PlainTextResponse
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+# ─── Feedback ──────────────────────────────────────────────────────────
 
 @app.post("/api/feedback")
 async def submit_feedback(body: dict):
@@ -466,26 +876,7 @@ async def submit_feedback(body: dict):
         raise HTTPException(400, "Subject and message are required")
 
     if RESEND_API_KEY:
-        import httpx
-        try:
-            async with httpx.AsyncClient() as client:
-                r = await client.post(
-                    "https://api.resend.com/emails",
-                    headers={"Authorization": f"Bearer {RESEND_API_KEY}"},
-                    json={
-                        "from": "Bridge Feedback <onboarding@resend.dev>",
-                        "to": [FEEDBACK_EMAIL],
-                        "subject": f"[Bridge Feedback] {subject}",
-                        "text": message,
-                    },
-                )
-                if r.status_code not in (200, 201):
-                    print(f"Resend error: {r.text}")
-                    raise HTTPException(500, "Failed to send feedback.")
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"Resend error: {e}")
+        if not await send_email("Bridge Feedback <onboarding@resend.dev>", f"[Bridge Feedback] {subject}", message):
             raise HTTPException(500, "Failed to send feedback.")
     else:
         print(f"\n--- FEEDBACK ---")
@@ -501,6 +892,17 @@ async def submit_feedback(body: dict):
 @app.post("/api/export/consumer-duty")
 async def export_consumer_duty(data: dict):
     """Generate a formatted .docx Consumer Duty Oversight Report."""
+    buffer = await run_cpu(_build_consumer_duty_docx, data)
+
+    from fastapi.responses import StreamingResponse
+    return StreamingResponse(
+        buffer,
+        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        headers={"Content-Disposition": "attachment; filename=Consumer_Duty_Oversight_Report.docx"},
+    )
+
+
+def _build_consumer_duty_docx(data: dict):
     from docx import Document
     from docx.shared import Inches, Pt, Cm, RGBColor
     from docx.enum.text import WD_ALIGN_PARAGRAPH
@@ -594,13 +996,7 @@ async def export_consumer_duty(data: dict):
     buffer = io.BytesIO()
     doc.save(buffer)
     buffer.seek(0)
-
-    from fastapi.responses import StreamingResponse
-    return StreamingResponse(
-        buffer,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": "attachment; filename=Consumer_Duty_Oversight_Report.docx"},
-    )
+    return buffer
 
 
 # ─── Demo Requests ───────────────────────────────────────────────────
@@ -617,23 +1013,7 @@ async def submit_demo_request(body: dict):
     text = f"Name: {name}\nEmail: {email}\nFirm: {firm or 'Not provided'}"
 
     if RESEND_API_KEY:
-        import httpx
-        try:
-            async with httpx.AsyncClient() as client:
-                r = await client.post(
-                    "https://api.resend.com/emails",
-                    headers={"Authorization": f"Bearer {RESEND_API_KEY}"},
-                    json={
-                        "from": "Bridge Website <onboarding@resend.dev>",
-                        "to": [FEEDBACK_EMAIL],
-                        "subject": subject,
-                        "text": text,
-                    },
-                )
-                if r.status_code not in (200, 201):
-                    print(f"Resend error: {r.text}")
-        except Exception as e:
-            print(f"Resend error: {e}")
+        await send_email("Bridge Website <onboarding@resend.dev>", subject, text)
     else:
         print(f"\n--- DEMO REQUEST ---")
         print(text)
@@ -642,8 +1022,38 @@ async def submit_demo_request(body: dict):
     return {"status": "ok"}
 
 
+# ─── Batch ─────────────────────────────────────────────────────────────
+
+async def _batch(request: Request, paths: list[str]):
+    from fastapi.responses import Response
+    limited = await charge_rate_limit(request.scope, await run_io(get_current_user, request), paths)
+    if limited:
+        return limited
+    return Response(await batch.resolve(app, request.scope, paths), media_type="application/json")
+
+
+@app.post("/api/batch")
+async def run_batch(request: Request, body: dict):
+    """Resolve several GET API paths in one round trip:
+    {"paths": ["/api/dashboard", "/api/mps/vanguard-ls-20?fields=id,ocf"]}."""
+    try:
+        paths = batch.validate(body.get("paths"))
+    except batch.BatchError as e:
+        raise HTTPException(400, str(e))
+    return await _batch(request, paths)
+
+
+@app.get("/api/bootstrap")
+async def bootstrap(request: Request):
+    """Everything the frontend needs on first load, as one batch."""
+    return await _batch(request, batch.BOOTSTRAP_PATHS)
+
+
 # ─── Serve Frontend ───────────────────────────────────────────────────
 
+# Inline the bootstrap batch into index.html, saving the SPA its first round trips.
+INLINE_BOOTSTRAP = os.environ.get("BRIDGE_INLINE_BOOTSTRAP", "1") != "0"
+
 from fastapi.responses import FileResponse
 
 @app.get("/favicon.ico")
@@ -668,14 +1078,24 @@ async def apple_touch_icon():
     raise HTTPException(404)
 
 @app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
+async def serve_frontend(request: Request):
     html_path = os.path.join(os.path.dirname(__file__), "index.html")
     if os.path.exists(html_path):
         with open(html_path, "r") as f:
-            return f.read()
+            html = f.read()
+        # Charged like /api/bootstrap; past the limit the page is served without
+        # it and the SPA's own fetch gets the 429.
+        if INLINE_BOOTSTRAP and not await charge_rate_limit(
+                request.scope, await run_io(get_current_user, request), batch.BOOTSTRAP_PATHS):
+            data = await batch.resolve(app, request.scope, batch.BOOTSTRAP_PATHS)
+            html = html.replace("</head>", f"<script>window.BOOT={batch.script_safe(data).decode()}</script>\n</head>", 1)
+        return html
     return "<h1>Bridge</h1><p>Frontend not found. See <a href='/docs'>/docs</a></p>"
 
 
+mark("routes")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+"""
+Bridge – Runtime Metrics
+Per-route latency histograms, in-flight requests and event-loop lag in Prometheus format
+"""
+
+import asyncio
+import glob
+import json
+import os
+import time
+from bisect import bisect_left
+
+from cache import get_cache_stats
+from emails import EMAIL_STATS
+
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+LAG_INTERVAL = 0.5
+
+# With several workers, each one dumps its counters here and a scrape merges them.
+METRICS_DIR = os.environ.get("BRIDGE_METRICS_DIR", "")
+SNAPSHOT_INTERVAL = 5.0
+# Snapshots not refreshed for this long belong to a worker that has gone away.
+SNAPSHOT_STALE_AFTER = 3 * SNAPSHOT_INTERVAL
+
+# All recording happens on the event-loop thread, so plain ints need no locking.
+_state = {
+    "requests": {},        # (route, method, status) -> count
+    "latency": {},         # (route, method) -> [bucket counts..., +Inf count, sum]
+    "size": {},            # (route, method) -> [bucket counts..., +Inf count, sum]
+    "in_flight": 0,
+    "lag_last": 0.0,
+    "lag_max": 0.0,
+}
+_monitor: dict = {"loop": None}
+
+COLLECTORS: list = []
+
+
+def register_collector(fn) -> None:
+    """Add a callable returning extra Prometheus exposition lines at scrape time."""
+    COLLECTORS.append(fn)
+
+
+def _observe(table: dict, key: tuple, buckets: list, value: float) -> None:
+    row = table.get(key)
+    if row is None:
+        row = table[key] = [0] * (len(buckets) + 1) + [0.0]
+    row[bisect_left(buckets, value)] += 1
+    row[-1] += value
+
+
+# ─── Middleware ──────────────────────────────────────────────────────────
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and size by route template, not raw path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        loop = asyncio.get_running_loop()
+        if _monitor["loop"] is not loop:
+            _monitor["loop"] = loop
+            _monitor["task"] = loop.create_task(_lag_monitor())
+
+        status, size = 500, 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        _state["in_flight"] += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _state["in_flight"] -= 1
+            route = scope.get("route")
+            key = (getattr(route, "path", None) or "unmatched", scope["method"])
+            counts = _state["requests"]
+            rkey = key + (status,)
+            counts[rkey] = counts.get(rkey, 0) + 1
+            _observe(_state["latency"], key, LATENCY_BUCKETS, elapsed)
+            _observe(_state["size"], key, SIZE_BUCKETS, size)
+
+
+async def _lag_monitor() -> None:
+    """Measure how late a fixed sleep wakes up; also flush worker snapshots."""
+    last_flush = 0.0
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lag = max(0.0, time.perf_counter() - start - LAG_INTERVAL)
+        _state["lag_last"] = lag
+        _state["lag_max"] = max(_state["lag_max"], lag)
+        if METRICS_DIR and start - last_flush >= SNAPSHOT_INTERVAL:
+            last_flush = start
+            _write_snapshot()
+
+
+# ─── Multi-Worker Aggregation ────────────────────────────────────────────
+
+def _snapshot() -> dict:
+    return {
+        "requests": [[*k, v] for k, v in _state["requests"].items()],
+        "latency": [[*k, v] for k, v in _state["latency"].items()],
+        "size": [[*k, v] for k, v in _state["size"].items()],
+        "in_flight": _state["in_flight"],
+        "lag_last": _state["lag_last"],
+        "lag_max": _state["lag_max"],
+        "caches": get_cache_stats(),
+        "emails": dict(EMAIL_STATS),
+        "collected": [line for collector in COLLECTORS for line in collector()],
+    }
+
+
+def _write_snapshot() -> None:
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"worker-{os.getpid()}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(_snapshot(), f)
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _live_snapshot(path: str) -> bool:
+    """False for a snapshot whose worker has exited (the file is removed) or that has
+    not been refreshed within SNAPSHOT_STALE_AFTER."""
+    try:
+        pid = int(os.path.basename(path)[len("worker-"):-len(".json")])
+        if not _pid_alive(pid):
+            os.remove(path)
+            return False
+        return time.time() - os.path.getmtime(path) <= SNAPSHOT_STALE_AFTER
+    except (OSError, ValueError):
+        return False
+
+
+def _merged() -> dict:
+    """This worker's live counters plus the last snapshot of every other live worker."""
+    snaps = [_snapshot()]
+    if METRICS_DIR:
+        own = f"worker-{os.getpid()}.json"
+        for path in glob.glob(os.path.join(METRICS_DIR, "worker-*.json")):
+            if os.path.basename(path) == own or not _live_snapshot(path):
+                continue
+            try:
+                with open(path) as f:
+                    snaps.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    merged = {"requests": {}, "latency": {}, "size": {}, "in_flight": 0,
+              "lag_last": 0.0, "lag_max": 0.0, "caches": {}, "emails": {}, "collected": {}}
+    for snap in snaps:
+        for *k, v in snap["requests"]:
+            merged["requests"][tuple(k)] = merged["requests"].get(tuple(k), 0) + v
+        for table in ("latency", "size"):
+            for route, method, row in snap[table]:
+                cur = merged[table].get((route, method))
+                merged[table][(route, method)] = row[:] if cur is None else [a + b for a, b in zip(cur, row)]
+        merged["in_flight"] += snap["in_flight"]
+        merged["lag_last"] = max(merged["lag_last"], snap["lag_last"])
+        merged["lag_max"] = max(merged["lag_max"], snap["lag_max"])
+        for c in snap["caches"]:
+            cur = merged["caches"].setdefault(c["name"], {"size": 0, "hits": 0, "misses": 0})
+            for f in cur:
+                cur[f] += c[f]
+        for k, v in snap["emails"].items():
+            merged["emails"][k] = merged["emails"].get(k, 0) + v
+        _merge_collected(merged["collected"], snap.get("collected", []))
+    return merged
+
+
+def _merge_collected(families: dict, lines: list[str]) -> None:
+    """Sum collector samples into {family: {"meta": [...], "samples": {series: value}}}.
+    Every collector series is a count or a per-worker gauge, so summing is the total."""
+    family = None
+    for line in lines:
+        if line.startswith("#"):
+            parts = line.split()
+            family = parts[2] if len(parts) > 2 else family
+            meta = families.setdefault(family, {"meta": [], "samples": {}})["meta"]
+            if line not in meta:
+                meta.append(line)
+            continue
+        series, _, value = line.rpartition(" ")
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        samples = families.setdefault(family or series.split("{", 1)[0], {"meta": [], "samples": {}})["samples"]
+        samples[series] = samples.get(series, 0) + value
+
+
+# ─── Exposition ──────────────────────────────────────────────────────────
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram(lines: list, name: str, help_text: str, table: dict, buckets: list) -> None:
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (route, method), row in sorted(table.items()):
+        cumulative = 0
+        for le, n in zip([*buckets, "+Inf"], row[:-1]):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(route=route, method=method, le=le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(route=route, method=method)} {row[-1]}")
+        lines.append(f"{name}_count{_labels(route=route, method=method)} {cumulative}")
+
+
+def render_metrics() -> str:
+    m = _merged()
+    lines = ["# HELP bridge_http_requests_total Requests by route template, method and status.",
+             "# TYPE bridge_http_requests_total counter"]
+    for (route, method, status), n in sorted(m["requests"].items()):
+        lines.append(f"bridge_http_requests_total{_labels(route=route, method=method, status=status)} {n}")
+    _histogram(lines, "bridge_http_request_duration_seconds", "Request latency by route template.",
+               m["latency"], LATENCY_BUCKETS)
+    _histogram(lines, "bridge_http_response_size_bytes", "Response body size by route template.",
+               m["size"], SIZE_BUCKETS)
+    lines += [
+        "# HELP bridge_http_requests_in_flight Requests currently being served.",
+        "# TYPE bridge_http_requests_in_flight gauge",
+        f"bridge_http_requests_in_flight {m['in_flight']}",
+        "# HELP bridge_event_loop_lag_seconds Most recent event-loop wake-up delay.",
+        "# TYPE bridge_event_loop_lag_seconds gauge",
+        f"bridge_event_loop_lag_seconds {m['lag_last']:.6f}",
+        "# HELP bridge_event_loop_lag_max_seconds Largest event-loop wake-up delay seen.",
+        "# TYPE bridge_event_loop_lag_max_seconds gauge",
+        f"bridge_event_loop_lag_max_seconds {m['lag_max']:.6f}",
+    ]
+    for metric, field, kind in (("bridge_cache_hits_total", "hits", "counter"),
+                                ("bridge_cache_misses_total", "misses", "counter"),
+                                ("bridge_cache_entries", "size", "gauge")):
+        lines += [f"# TYPE {metric} {kind}"]
+        for name, stats in sorted(m["caches"].items()):
+            lines.append(f"{metric}{_labels(cache=name)} {stats[field]}")
+    lines += ["# TYPE bridge_emails_total counter"]
+    for result, n in sorted(m["emails"].items()):
+        lines.append(f"bridge_emails_total{_labels(result=result)} {n}")
+    for family in m["collected"].values():
+        lines += family["meta"]
+        for series, value in family["samples"].items():
+            lines.append(f"{series} {int(value) if value.is_integer() else value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,366 @@
+from __future__ import annotations
+"""
+Bridge – MPS Database
+Optional SQLite backend for providers and the MPS universe
+
+With BRIDGE_MPS_DB set, mps_data serves records from this database instead
+of holding the universe in every worker's heap. Filters, provider lookups
+and peer lookups each run as one indexed query; identical query shapes hit
+sqlite's prepared-statement cache on every pooled connection.
+
+    providers            name, id, position, doc (JSON)
+    mps                  scalar fields, position, nested (JSON), layout, extra (JSON)
+    mps_platforms        mps_id, position, platform         -- join table
+    mps_time_horizons    mps_id, position, horizon
+    mps_funds            mps_id, position, name, weight, type
+    meta                 version, bumped on every import; source_stamp of the
+                         literals it was imported from (NULL for --json)
+
+Load or replace the data without a redeploy; workers notice the new version
+within a second:
+    python mps_store.py import [--db PATH] [--json FILE]
+    python mps_store.py status [--db PATH]
+If the database does not exist yet, the first worker imports the literals.
+"""
+
+import contextlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from compact import FLAG_FIELDS, FUND_FIELDS, NUMBER_FIELDS, STRING_FIELDS
+
+MPS_DB = os.environ.get("BRIDGE_MPS_DB", "")
+POOL_SIZE = int(os.environ.get("BRIDGE_MPS_DB_POOL", "8"))
+VERSION_CHECK_INTERVAL = 1.0
+
+# Key order of the literal records, used whenever a row has no stored layout.
+FIELD_ORDER = (
+    "id", "name", "provider", "risk_rating", "risk_label", "asset_allocation", "geographic_allocation",
+    "ocf", "return_1yr", "return_3yr", "return_5yr", "return_ytd", "return_since_inception",
+    "volatility", "max_drawdown", "sharpe_ratio", "income_yield", "rebalancing", "min_investment",
+    "platforms", "ethical", "decumulation_suitable", "time_horizons", "underlying_funds",
+    "inception_date", "benchmark",
+)
+JSON_FIELDS = ("asset_allocation", "geographic_allocation")
+SCALAR_COLUMNS = tuple(f for f in FIELD_ORDER if f in STRING_FIELDS + NUMBER_FIELDS + FLAG_FIELDS)
+
+# Numeric columns carry no declared type, so ints and floats keep their storage class.
+# The child tables are what filters query; `nested` repeats allocations, platforms,
+# horizons and funds as one JSON array so reading a record needs no joins.
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+CREATE TABLE IF NOT EXISTS providers (
+    name TEXT PRIMARY KEY, id TEXT UNIQUE NOT NULL, position INTEGER NOT NULL, doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mps (
+    id TEXT PRIMARY KEY, position INTEGER NOT NULL,
+    {", ".join(f for f in SCALAR_COLUMNS if f != "id")},
+    nested TEXT NOT NULL, layout TEXT, extra TEXT
+);
+CREATE INDEX IF NOT EXISTS mps_position ON mps (position);
+CREATE INDEX IF NOT EXISTS mps_provider ON mps (provider, position);
+CREATE INDEX IF NOT EXISTS mps_risk ON mps (risk_rating, position);
+CREATE TABLE IF NOT EXISTS mps_platforms (
+    mps_id TEXT NOT NULL, position INTEGER NOT NULL, platform TEXT NOT NULL, PRIMARY KEY (mps_id, position)
+);
+CREATE INDEX IF NOT EXISTS mps_platforms_platform ON mps_platforms (platform, mps_id);
+CREATE TABLE IF NOT EXISTS mps_time_horizons (
+    mps_id TEXT NOT NULL, position INTEGER NOT NULL, horizon TEXT NOT NULL, PRIMARY KEY (mps_id, position)
+);
+CREATE INDEX IF NOT EXISTS mps_time_horizons_horizon ON mps_time_horizons (horizon, mps_id);
+CREATE TABLE IF NOT EXISTS mps_funds (
+    mps_id TEXT NOT NULL, position INTEGER NOT NULL, name TEXT NOT NULL, weight, type TEXT NOT NULL,
+    PRIMARY KEY (mps_id, position)
+);
+CREATE INDEX IF NOT EXISTS mps_funds_name ON mps_funds (name);
+"""
+
+NESTED_FIELDS = JSON_FIELDS + ("platforms", "time_horizons", "underlying_funds")
+
+RECORD_SELECT = f"SELECT {', '.join('m.' + f for f in SCALAR_COLUMNS)}, m.nested, m.layout, m.extra FROM mps m"
+
+
+# ─── Connection Pool ─────────────────────────────────────────────────────
+
+class ConnectionPool:
+    """Up to `size` read-only connections shared by executor threads."""
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False,
+                               cached_statements=128)
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._opened < self.size
+                if grow:
+                    self._opened += 1
+            conn = self._open() if grow else self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+
+# ─── Store ───────────────────────────────────────────────────────────────
+
+_N_SCALARS = len(SCALAR_COLUMNS)
+_FLAG_INDEXES = [i for i, f in enumerate(SCALAR_COLUMNS) if f in FLAG_FIELDS]
+
+
+def _row_to_record(row: tuple) -> dict:
+    scalars = list(row[:_N_SCALARS])
+    for i in _FLAG_INDEXES:
+        if scalars[i] is not None:
+            scalars[i] = bool(scalars[i])
+    values = dict(zip(SCALAR_COLUMNS, scalars))
+    values.update(zip(NESTED_FIELDS, json.loads(row[_N_SCALARS])))
+    layout, extra = row[_N_SCALARS + 1], row[_N_SCALARS + 2]
+    if layout is None and extra is None:
+        return {k: values[k] for k in FIELD_ORDER}
+    if extra:
+        values.update(json.loads(extra))
+    return {k: values[k] for k in (json.loads(layout) if layout else FIELD_ORDER)}
+
+
+class MPSStore:
+    def __init__(self, path: str, pool_size: int = POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        self._version = (0.0, None)          # (checked at, version)
+        self._providers = (None, {})         # (version, providers)
+
+    def _records(self, where: str = "", params: tuple = ()) -> list[dict]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(f"{RECORD_SELECT} {where} ORDER BY m.position", params).fetchall()
+        return [_row_to_record(r) for r in rows]
+
+    def version(self) -> int:
+        """The imported data version, re-read at most once per VERSION_CHECK_INTERVAL."""
+        checked, version = self._version
+        now = time.monotonic()
+        if version is None or now - checked >= VERSION_CHECK_INTERVAL:
+            with self.pool.connection() as conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            version = row[0] if row else 0
+            self._version = (now, version)
+        return version
+
+    def providers(self) -> dict:
+        version = self.version()
+        if self._providers[0] != version:
+            with self.pool.connection() as conn:
+                rows = conn.execute("SELECT name, doc FROM providers ORDER BY position").fetchall()
+            self._providers = (version, {name: json.loads(doc) for name, doc in rows})
+        return self._providers[1]
+
+    def all_mps(self) -> list[dict]:
+        return self._records()
+
+    def get(self, mps_id: str) -> dict | None:
+        records = self._records("WHERE m.id = ?", (mps_id,))
+        return records[0] if records else None
+
+    def get_many(self, ids) -> list[dict]:
+        """Records for the given ids, in universe order."""
+        return self._records("WHERE m.id IN (SELECT value FROM json_each(?))", (json.dumps(list(ids)),))
+
+    def by_provider(self, provider_name: str) -> list[dict]:
+        return self._records("WHERE m.provider = ?", (provider_name,))
+
+    def peers(self, mps: dict) -> list[dict]:
+        return self._records("WHERE m.risk_rating = ? AND m.id != ?", (mps["risk_rating"], mps["id"]))
+
+    def filter(self, risk_min: int = 1, risk_max: int = 10, platforms=None, providers=None, styles=None,
+               ethical_only: bool = False, decumulation: bool = False, time_horizon: str | None = None,
+               min_investment_limit: float | None = None, ocf_max: float | None = None) -> list[dict]:
+        """Same semantics as mps_data.filter_mps. Only the clauses in use are emitted,
+        so each combination of filters is its own cached statement."""
+        clauses, params = ["m.risk_rating BETWEEN ? AND ?"], [risk_min, risk_max]
+        if platforms:
+            clauses.append("m.id IN (SELECT mps_id FROM mps_platforms "
+                           "WHERE platform IN (SELECT value FROM json_each(?)))")
+            params.append(json.dumps(list(platforms)))
+        if providers:
+            clauses.append("m.provider IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(providers)))
+        if ethical_only:
+            clauses.append("m.ethical = 1")
+        if decumulation:
+            clauses.append("m.decumulation_suitable = 1")
+        if time_horizon:
+            clauses.append("m.id IN (SELECT mps_id FROM mps_time_horizons WHERE horizon = ?)")
+            params.append(time_horizon)
+        if min_investment_limit is not None:
+            clauses.append("m.min_investment <= ?")
+            params.append(min_investment_limit)
+        if ocf_max is not None:
+            clauses.append("m.ocf <= ?")
+            params.append(ocf_max)
+        return self._records("WHERE " + " AND ".join(clauses), tuple(params))
+
+    def count(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM mps").fetchone()[0]
+
+
+# ─── Import ──────────────────────────────────────────────────────────────
+
+def _is_string_list(v) -> bool:
+    return isinstance(v, list) and all(isinstance(s, str) for s in v)
+
+
+def _mps_rows(m: dict, position: int) -> tuple[tuple, list, list, list]:
+    """Rows for one record. Anything the columns cannot hold exactly goes to `extra`."""
+    extra = {k: v for k, v in m.items() if k not in FIELD_ORDER}
+    for f in SCALAR_COLUMNS:
+        v = m.get(f)
+        if v is not None and not isinstance(v, (str, int, float)):
+            extra[f] = v
+    for f in JSON_FIELDS:
+        if m.get(f) is not None and not isinstance(m[f], dict):
+            extra[f] = m[f]
+    for f in ("platforms", "time_horizons"):
+        if f in m and not _is_string_list(m[f]):
+            extra[f] = m[f]
+    funds = m.get("underlying_funds")
+    if "underlying_funds" in m and not (
+            isinstance(funds, list) and all(isinstance(f, dict) and tuple(f) == FUND_FIELDS for f in funds)):
+        extra["underlying_funds"] = funds
+
+    def column(f):
+        return None if f in extra else m.get(f)
+
+    row = (
+        m["id"], position,
+        *(column(f) for f in SCALAR_COLUMNS if f != "id"),
+        json.dumps([None if f in extra else m.get(f) for f in NESTED_FIELDS]),
+        None if tuple(m) == FIELD_ORDER else json.dumps(list(m)),
+        json.dumps(extra) if extra else None,
+    )
+    mps_id = m["id"]
+    platforms = [] if "platforms" in extra else [(mps_id, i, p) for i, p in enumerate(m.get("platforms") or [])]
+    horizons = [] if "time_horizons" in extra else [(mps_id, i, h) for i, h in enumerate(m.get("time_horizons") or [])]
+    fund_rows = [] if "underlying_funds" in extra else [
+        (mps_id, i, f["name"], f["weight"], f["type"]) for i, f in enumerate(funds or [])]
+    return row, platforms, horizons, fund_rows
+
+
+def _current(conn: sqlite3.Connection, source_stamp: int | None) -> int:
+    """The stored version if it is already loaded from this source, else 0. Data
+    imported from elsewhere (source_stamp NULL) is never replaced by the literals."""
+    meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('version', 'source_stamp')"))
+    version = meta.get("version") or 0
+    if source_stamp is not None and meta.get("source_stamp") not in (None, source_stamp):
+        return 0
+    return version
+
+
+def import_universe(path: str, providers: dict, universe, only_if_missing: bool = False,
+                    source_stamp: int | None = None) -> int:
+    """Replace all provider and MPS rows in one transaction and bump the version.
+    Returns the new version (or the existing one with only_if_missing, unless the
+    rows came from an older `source_stamp`)."""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        if only_if_missing:
+            current = _current(conn, source_stamp)
+            if current:
+                conn.execute("ROLLBACK")
+                return current
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        version = row[0] if row else 0
+        for table in ("providers", "mps", "mps_platforms", "mps_time_horizons", "mps_funds"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.executemany("INSERT INTO providers (name, id, position, doc) VALUES (?, ?, ?, ?)",
+                         [(name, p["id"], i, json.dumps(p)) for i, (name, p) in enumerate(providers.items())])
+        columns = ("id", "position", *(f for f in SCALAR_COLUMNS if f != "id"), "nested", "layout", "extra")
+        insert_mps = f"INSERT INTO mps ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        for i, m in enumerate(universe):
+            row, platforms, horizons, funds = _mps_rows(dict(m), i)
+            conn.execute(insert_mps, row)
+            conn.executemany("INSERT INTO mps_platforms VALUES (?, ?, ?)", platforms)
+            conn.executemany("INSERT INTO mps_time_horizons VALUES (?, ?, ?)", horizons)
+            conn.executemany("INSERT INTO mps_funds VALUES (?, ?, ?, ?, ?)", funds)
+        version += 1
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source_stamp', ?)", (source_stamp,))
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return version
+
+
+def open_store(path: str = MPS_DB) -> MPSStore | None:
+    """The configured store, importing the literal universe when the database is
+    empty or was loaded from an older mps_universe.py. The check is a read, so
+    workers booting against a current database never queue on the write lock."""
+    if not path:
+        return None
+    from snapshot import _source_stamp
+    stamp = _source_stamp()
+    try:
+        with contextlib.closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            current = _current(conn, stamp)
+    except sqlite3.Error:      # no database or no schema yet
+        current = 0
+    if not current:
+        from mps_universe import MPS_UNIVERSE, PROVIDERS
+        import_universe(path, PROVIDERS, MPS_UNIVERSE, only_if_missing=True, source_stamp=stamp)
+    return MPSStore(path)
+
+
+def main_cli(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bridge MPS database")
+    parser.add_argument("command", choices=["import", "status"])
+    parser.add_argument("--db", default=MPS_DB, help="database path (default $BRIDGE_MPS_DB)")
+    parser.add_argument("--json", help='file with {"providers": {...}, "mps_universe": [...]} (default: literals)')
+    args = parser.parse_args(argv)
+    if not args.db:
+        parser.error("--db or BRIDGE_MPS_DB is required")
+
+    if args.command == "import":
+        if args.json:
+            with open(args.json) as f:
+                data = json.load(f)
+            providers, universe = data["providers"], data["mps_universe"]
+            stamp = None
+        else:
+            from mps_universe import MPS_UNIVERSE as universe, PROVIDERS as providers
+            from snapshot import _source_stamp
+            stamp = _source_stamp()
+        version = import_universe(args.db, providers, universe, source_stamp=stamp)
+        print(f"Imported {len(universe)} MPS from {len(providers)} providers into {args.db} (version {version})")
+    else:
+        if not os.path.exists(args.db):
+            print(f"No database at {args.db}")
+            return 1
+        store = MPSStore(args.db, pool_size=1)
+        print(f"Version {store.version()}: {store.count()} MPS, {len(store.providers())} providers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
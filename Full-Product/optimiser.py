@@ -0,0 +1,289 @@
+from __future__ import annotations
+"""
+Bridge – Efficient Frontier & Panel Optimiser
+Long-only mean-variance blends over a filtered MPS candidate set
+
+Large candidate sets are pre-screened to MAX_CANDIDATES before solving, and
+each frontier is built within SOLVER_BUDGET_SECONDS: solves stop at
+SOLVER_TOLERANCE, are warm-started from the neighbouring frontier point,
+and once the budget is spent the remaining points get MIN_SOLVER_ITERATIONS
+each and the result is marked as not converged.
+
+Expected returns and covariances are in-sample estimates from `months` of
+simulated history, so the optimiser overfits them: it piles into whatever
+happened to do well, and frontiers routinely show returns no real blend
+would deliver (e.g. 33% a year at under 10% volatility). Treat frontiers
+as a comparison of candidate sets, not as forecasts.
+"""
+
+import math
+import time
+from itertools import repeat
+from operator import add, mul
+
+from cache import LRUCache
+from mps_data import filter_mps, get_all_mps, get_data_version, get_return_series
+
+FRONTIER_CACHE = LRUCache("frontier", maxsize=64)
+
+MIN_HOLDING_WEIGHT = 0.005   # weights below 0.5% are reported as zero
+SOLVER_ITERATIONS = 400
+MIN_SOLVER_ITERATIONS = 25
+SOLVER_TOLERANCE = 1e-6      # largest weight change between iterations; weights are reported to 1e-4
+SOLVER_BUDGET_SECONDS = 1.5  # per frontier, plus the same again for target-volatility refinement
+MAX_CANDIDATES = 250
+REFINE_STEPS = 14
+
+
+# ─── Problem Setup ───────────────────────────────────────────────────────
+
+def _prepare(candidates: list[dict], months: int) -> dict:
+    """Annualised mean returns and centred return rows for the candidate set.
+
+    The covariance matrix is never formed: Σw is evaluated as Xᵀ(Xw)/(T-1),
+    which is O(n·T) per product and keeps thousands of candidates tractable.
+    """
+    series = get_return_series(candidates, months)
+    T = months
+    mu = [12 * sum(r) / T for r in series]
+    X = []
+    for r in series:
+        m = sum(r) / T
+        X.append([(x - m) for x in r])
+    return {"mu": mu, "X": X, "T": T, "ocf": [c["ocf"] for c in candidates]}
+
+
+def _cov_times(prob: dict, w: list[float]) -> list[float]:
+    """Annualised Σw via the centred return rows."""
+    X, T = prob["X"], prob["T"]
+    xw = [0.0] * T
+    for wi, row in zip(w, X):
+        if wi:
+            xw = list(map(add, xw, map(mul, row, repeat(wi))))
+    scale = 12 / (T - 1)
+    return [scale * sum(map(mul, row, xw)) for row in X]
+
+
+def _max_eigenvalue(prob: dict, iterations: int = 30) -> float:
+    n = len(prob["mu"])
+    v = [1 / math.sqrt(n)] * n
+    lam = 0.0
+    for _ in range(iterations):
+        u = _cov_times(prob, v)
+        norm = math.sqrt(sum(x * x for x in u))
+        if norm == 0:
+            return 0.0
+        lam = norm
+        v = [x / norm for x in u]
+    return lam
+
+
+def _project(v: list[float], cap: float) -> list[float]:
+    """Euclidean projection onto {w : 0 <= w <= cap, sum(w) = 1}.
+
+    Walks the sorted breakpoints of the piecewise-linear sum(clip(v - τ, 0, cap))
+    to find the shift τ exactly, in O(n log n).
+    """
+    events = sorted(
+        [(x, 0, x) for x in v] + [(x - cap, 1, x) for x in v],
+        key=lambda e: e[0], reverse=True,
+    )
+    free_sum, free_count, capped = 0.0, 0, 0
+    tau = None
+    for point, kind, x in events:
+        if free_sum - free_count * point + cap * capped >= 1:
+            tau = (free_sum + cap * capped - 1) / free_count
+            break
+        if kind == 0:
+            free_sum += x
+            free_count += 1
+        else:
+            free_sum -= x
+            free_count -= 1
+            capped += 1
+    if tau is None:
+        return [cap] * len(v)
+    return [min(max(x - tau, 0.0), cap) for x in v]
+
+
+def _solve(prob: dict, risk_aversion: float, cap: float, start: list[float] | None = None,
+           deadline: float | None = None) -> tuple[list[float], bool]:
+    """Minimise λ·wᵀΣw − μᵀw over the capped simplex with accelerated projected gradient.
+    Returns the weights and whether they converged; past `deadline` only
+    MIN_SOLVER_ITERATIONS are run."""
+    n = len(prob["mu"])
+    mu = prob["mu"]
+    L = 2 * risk_aversion * prob["lmax"] or 1.0
+    step = 1 / L
+    w = start[:] if start else _project([1 / n] * n, cap)
+    y, t_k = w[:], 1.0
+    for i in range(SOLVER_ITERATIONS):
+        sy = _cov_times(prob, y)
+        grad = [2 * risk_aversion * s - m for s, m in zip(sy, mu)]
+        w_next = _project([yi - step * g for yi, g in zip(y, grad)], cap)
+        if max(abs(a - b) for a, b in zip(w_next, w)) < SOLVER_TOLERANCE:
+            return w_next, True
+        if sum((a - b) * (b - c) for a, b, c in zip(y, w_next, w)) > 0:
+            # Momentum is pointing uphill: restart it (adaptive restart).
+            y, t_k, w = w_next, 1.0, w_next
+            continue
+        t_next = (1 + math.sqrt(1 + 4 * t_k * t_k)) / 2
+        y = [a + ((t_k - 1) / t_next) * (a - b) for a, b in zip(w_next, w)]
+        w, t_k = w_next, t_next
+        if deadline is not None and i + 1 >= MIN_SOLVER_ITERATIONS and time.monotonic() > deadline:
+            break
+    return w, False
+
+
+def _screen(candidates: list[dict], months: int) -> list[dict]:
+    """At most MAX_CANDIDATES, taken in turn from the best by return, by volatility
+    and by return per unit of volatility over the history the optimiser uses."""
+    if len(candidates) <= MAX_CANDIDATES:
+        return candidates
+    stats = []
+    for c, r in zip(candidates, get_return_series(candidates, months)):
+        mean = sum(r) / months
+        vol = math.sqrt(sum((x - mean) ** 2 for x in r) / (months - 1)) or 1e-9
+        stats.append((mean, vol))
+    rankings = [
+        sorted(range(len(candidates)), key=lambda i: -stats[i][0]),
+        sorted(range(len(candidates)), key=lambda i: stats[i][1]),
+        sorted(range(len(candidates)), key=lambda i: -stats[i][0] / stats[i][1]),
+    ]
+    chosen: dict[int, None] = {}
+    for picks in zip(*rankings):
+        for i in picks:
+            chosen.setdefault(i)
+        if len(chosen) >= MAX_CANDIDATES:
+            break
+    return [candidates[i] for i in sorted(chosen)[:MAX_CANDIDATES]]
+
+
+def _point(prob: dict, candidates: list[dict], w: list[float], risk_aversion: float) -> dict:
+    w = [x if x >= MIN_HOLDING_WEIGHT else 0.0 for x in w]
+    total = sum(w) or 1.0
+    w = [x / total for x in w]
+    var = sum(a * b for a, b in zip(w, _cov_times(prob, w)))
+    return {
+        "risk_aversion": round(risk_aversion, 4),
+        "expected_return": round(100 * sum(a * b for a, b in zip(w, prob["mu"])), 2),
+        "volatility": round(100 * math.sqrt(max(var, 0.0)), 2),
+        "ocf": round(sum(a * b for a, b in zip(w, prob["ocf"])), 3),
+        "holdings": sorted(
+            [
+                {"id": c["id"], "name": c["name"], "provider": c["provider"], "weight": round(100 * x, 2)}
+                for c, x in zip(candidates, w) if x
+            ],
+            key=lambda h: h["weight"], reverse=True,
+        ),
+        "_weights": w,
+    }
+
+
+def _public(point: dict) -> dict:
+    return {k: v for k, v in point.items() if not k.startswith("_")}
+
+
+# ─── Frontier ────────────────────────────────────────────────────────────
+
+def _build_frontier(filters: dict, points: int, max_weight: float, months: int) -> dict:
+    matched = filter_mps(**filters)
+    if not matched:
+        return {"matched": 0, "candidates": [], "frontier": [], "converged": True}
+    candidates = _screen(matched, months)
+    prob = _prepare(candidates, months)
+    prob["lmax"] = _max_eigenvalue(prob)
+    cap = max(max_weight, 1 / len(candidates))
+
+    # Risk aversion sweep from return-seeking to minimum-variance, warm-started.
+    grid = [0.25 * (4000 ** (i / max(points - 1, 1))) for i in range(points)]
+    deadline = time.monotonic() + SOLVER_BUDGET_SECONDS
+    frontier, w, converged = [], None, True
+    for lam in grid:
+        w, ok = _solve(prob, lam, cap, w, deadline)
+        converged = converged and ok
+        frontier.append(_point(prob, candidates, w, lam))
+    return {"matched": len(matched), "candidates": candidates, "prob": prob, "cap": cap,
+            "frontier": _efficient(frontier), "converged": converged}
+
+
+def _efficient(points: list[dict]) -> list[dict]:
+    """Points no other point dominates, by volatility: each must earn more than every
+    less volatile one. Drops repeats of a corner portfolio (neighbouring risk
+    aversions often land on the same one) and points an early stop left short."""
+    out, best = [], -math.inf
+    for p in sorted(points, key=lambda p: (p["volatility"], -p["expected_return"])):
+        if p["expected_return"] > best:
+            out.append(p)
+            best = p["expected_return"]
+    return out
+
+
+def _signature(filters: dict) -> tuple:
+    return tuple(
+        (k, tuple(sorted(v)) if isinstance(v, list) else v)
+        for k, v in sorted(filters.items())
+    )
+
+
+def get_frontier(filters: dict, points: int = 12, max_weight: float = 1.0, months: int = 36) -> dict:
+    """Efficient frontier for the filter_mps candidate set, cached per filter signature."""
+    key = (get_data_version(), _signature(filters), points, max_weight, months)
+    cached = FRONTIER_CACHE.get(key)
+    if cached is None:
+        cached = _build_frontier(filters, points, max_weight, months)
+        FRONTIER_CACHE.set(key, cached)
+    return cached
+
+
+def risk_rating_volatility(risk_rating: int) -> float | None:
+    """Average stated volatility of universe portfolios at a risk rating."""
+    vols = [m["volatility"] for m in get_all_mps() if m["risk_rating"] == risk_rating]
+    return round(sum(vols) / len(vols), 2) if vols else None
+
+
+def optimise_panel(
+    filters: dict,
+    target_volatility: float,
+    points: int = 12,
+    max_weight: float = 1.0,
+    months: int = 36,
+) -> dict:
+    """Highest-return frontier blend whose volatility does not exceed the target (annual %)."""
+    built = get_frontier(filters, points, max_weight, months)
+    frontier = built["frontier"]
+    if not frontier:
+        return {"candidate_count": 0, "target_volatility": target_volatility, "portfolio": None, "frontier": []}
+    converged = built["converged"]
+
+    below = [p for p in frontier if p["volatility"] <= target_volatility]
+    if not below:
+        best = frontier[0]
+    elif len(below) == len(frontier):
+        best = max(frontier, key=lambda p: p["expected_return"])
+    else:
+        # Bisect risk aversion between the bracketing frontier points.
+        prob, cap, candidates = built["prob"], built["cap"], built["candidates"]
+        above = min((p for p in frontier if p["volatility"] > target_volatility), key=lambda p: p["volatility"])
+        best = max(below, key=lambda p: p["volatility"])
+        lo, hi = above["risk_aversion"], best["risk_aversion"]
+        w = best["_weights"]
+        deadline = time.monotonic() + SOLVER_BUDGET_SECONDS
+        for _ in range(REFINE_STEPS):
+            mid = math.sqrt(lo * hi)
+            w, ok = _solve(prob, mid, cap, w, deadline)
+            converged = converged and ok
+            trial = _point(prob, candidates, w, mid)
+            if trial["volatility"] <= target_volatility:
+                best, hi = trial, mid
+            else:
+                lo = mid
+
+    return {
+        "candidate_count": built["matched"],
+        "optimised_count": len(built["candidates"]),
+        "converged": converged,
+        "target_volatility": target_volatility,
+        "portfolio": _public(best),
+        "frontier": [_public(p) for p in frontier],
+    }
@@ -0,0 +1,429 @@
+from __future__ import annotations
+"""
+Bridge – Bulk Client-Book Oversight
+Chunked checks of client holdings against the current MPS universe
+
+Jobs run on the worker that accepted the upload, but their state lives in a
+SQLite file and their uploads and results in files under BRIDGE_OVERSIGHT_DIR,
+so a poll or download can land on any worker on the host.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from executors import CPU, IO
+from mps_data import get_all_mps, get_data_version, get_platforms
+
+CHUNK_ROWS = 1000
+MAX_JOBS = 50
+MAX_UPLOAD_BYTES = int(float(os.environ.get("BRIDGE_OVERSIGHT_MAX_MB", "200")) * 2**20)
+JOBS_DIR = os.environ.get("BRIDGE_OVERSIGHT_DIR") or os.path.join(tempfile.gettempdir(), "bridge-oversight")
+# A running job saves after every chunk; one silent for this long lost its worker.
+STALE_SECONDS = float(os.environ.get("BRIDGE_OVERSIGHT_STALE_SECONDS", "300"))
+
+DEFAULT_MAX_OCF = 0.75            # % p.a.
+DEFAULT_RISK_TOLERANCE = 1        # risk-rating points either side of the client profile
+DEFAULT_UNDERPERFORMANCE = 2.0    # percentage points below the risk-band peer average
+DEFAULT_PARAMS = {
+    "max_ocf": DEFAULT_MAX_OCF,
+    "risk_tolerance": DEFAULT_RISK_TOLERANCE,
+    "underperformance": DEFAULT_UNDERPERFORMANCE,
+}
+
+RESULT_FIELDS = [
+    "client_id", "mps_id", "mps_name", "pot_size", "risk_profile", "mps_risk_rating",
+    "ocf", "platform", "flag_count", "flags", "detail",
+]
+
+log = logging.getLogger("bridge.oversight")
+
+RUNNING: dict[str, dict] = {}        # jobs this worker is checking, with their tasks
+_local = threading.local()
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+_index: dict = {"version": None}
+
+
+# ─── Universe Index ──────────────────────────────────────────────────────
+
+def _universe_index() -> dict:
+    """Id lookup, risk-band peer totals and label map, rebuilt once per data version."""
+    version = get_data_version()
+    if _index["version"] == version:
+        return _index
+    by_id, bands, labels = {}, {}, {}
+    for m in get_all_mps():
+        by_id[m["id"]] = m
+        band = bands.setdefault(m["risk_rating"], {"n1": 0, "s1": 0.0, "n3": 0, "s3": 0.0})
+        if m.get("return_1yr") is not None:
+            band["n1"] += 1
+            band["s1"] += m["return_1yr"]
+        if m.get("return_3yr") is not None:
+            band["n3"] += 1
+            band["s3"] += m["return_3yr"]
+        labels.setdefault(m["risk_label"].lower(), []).append(m["risk_rating"])
+    _index.update({
+        "version": version,
+        "by_id": by_id,
+        "bands": bands,
+        "labels": {k: round(sum(v) / len(v)) for k, v in labels.items()},
+        "platforms": set(get_platforms()),
+    })
+    return _index
+
+
+def _peer_avg(band: dict, mps: dict, field: str) -> float | None:
+    """Risk-band average excluding the portfolio itself, as in the MPS detail view."""
+    n, s = band["n" + field[-3]], band["s" + field[-3]]
+    own = mps.get(field)
+    if own is not None:
+        n, s = n - 1, s - own
+    return s / n if n else None
+
+
+def _risk_profile(value, labels: dict) -> int | None:
+    if value in (None, ""):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return labels.get(str(value).strip().lower())
+
+
+# ─── Checks ──────────────────────────────────────────────────────────────
+
+def _check_row(row: dict, idx: dict, params: dict) -> dict:
+    by_id, bands, listed = idx["by_id"], idx["bands"], idx["platforms"]
+    mps_id = str(row.get("mps_id", "")).strip()
+    mps = by_id.get(mps_id)
+    profile = _risk_profile(row.get("risk_profile"), idx["labels"])
+    platform = str(row.get("platform") or "").strip()
+    flags, detail = [], []
+
+    if mps is None:
+        flags.append("unknown_mps")
+        detail.append(f"MPS '{mps_id}' not in universe")
+    else:
+        drift = None if profile is None else mps["risk_rating"] - profile
+        if drift is not None and abs(drift) > params["risk_tolerance"]:
+            flags.append("risk_drift")
+            detail.append(f"risk rating {mps['risk_rating']} vs client profile {profile}")
+        if mps["ocf"] > params["max_ocf"]:
+            flags.append("ocf_above_threshold")
+            detail.append(f"OCF {mps['ocf']:.2f}% > {params['max_ocf']:.2f}%")
+        if platform and (platform not in listed or platform not in mps["platforms"]):
+            flags.append("platform_not_listed")
+            detail.append(f"{platform} no longer lists this MPS")
+        band = bands[mps["risk_rating"]]
+        for field in ("return_1yr", "return_3yr"):
+            avg, own = _peer_avg(band, mps, field), mps.get(field)
+            if avg is not None and own is not None and own < avg - params["underperformance"]:
+                flags.append("underperformance")
+                detail.append(f"{field} {own:.1f}% vs peer avg {avg:.1f}%")
+                break
+
+    return {
+        "client_id": row.get("client_id", ""),
+        "mps_id": mps_id,
+        "mps_name": mps["name"] if mps else "",
+        "pot_size": row.get("pot_size", ""),
+        "risk_profile": row.get("risk_profile", ""),
+        "mps_risk_rating": mps["risk_rating"] if mps else "",
+        "ocf": mps["ocf"] if mps else "",
+        "platform": platform,
+        "flag_count": len(flags),
+        "flags": ";".join(flags),
+        "detail": "; ".join(detail),
+    }
+
+
+def check_holdings(rows: list[dict], params: dict) -> list[dict]:
+    """Evaluate oversight checks for a chunk of holdings. Rows that cannot be read
+    are left out; callers count them as errors."""
+    idx = _universe_index()
+    out = []
+    for row in rows:
+        try:
+            out.append(_check_row(row, idx, params))
+        except (TypeError, ValueError, AttributeError, KeyError, OverflowError):
+            continue
+    return out
+
+
+# ─── Upload Parsing ──────────────────────────────────────────────────────
+
+def _counted_lines(f, job: dict):
+    for line in f:
+        job["bytes_processed"] += len(line.encode())
+        yield line
+
+
+def _iter_records(path: str, fmt: str, job: dict):
+    """Yield holdings from the spooled upload, tracking bytes consumed for progress."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        lines = _counted_lines(f, job)
+        if fmt == "jsonl":
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    job["errors"] += 1
+                    continue
+                if not isinstance(record, dict):
+                    job["errors"] += 1
+                    continue
+                yield {str(k).strip().lower(): v for k, v in record.items()}
+        else:
+            for record in csv.DictReader(lines):
+                yield {k.strip().lower(): v for k, v in record.items() if k}
+
+
+def _iter_chunks(path: str, fmt: str, job: dict):
+    """Holdings in lists of CHUNK_ROWS, for driving the parsing from the CPU pool."""
+    chunk = []
+    for record in _iter_records(path, fmt, job):
+        chunk.append(record)
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _detect_format(content_type: str, head: bytes) -> str:
+    if "json" in content_type or head.lstrip().startswith(b"{"):
+        return "jsonl"
+    return "csv"
+
+
+# ─── Jobs ────────────────────────────────────────────────────────────────
+
+def _summary(job: dict) -> dict:
+    total = job["bytes_total"] or 1
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "format": job["format"],
+        "created": job["created"],
+        "finished": job["finished"],
+        "data_version": job["data_version"],
+        "rows_processed": job["rows_processed"],
+        "rows_flagged": job["rows_flagged"],
+        "flag_counts": job["flag_counts"],
+        "errors": job["errors"],
+        "progress": round(min(job["bytes_processed"] / total, 1.0) * 100, 1),
+        "error": job["error"],
+    }
+
+
+def _db() -> sqlite3.Connection:
+    """This thread's connection to the job table shared by the host's workers."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(JOBS_DIR, "jobs.db"), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                     "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, status TEXT NOT NULL, created TEXT NOT NULL, "
+                     "downloads INTEGER NOT NULL DEFAULT 0, job TEXT NOT NULL)")
+        _local.conn = conn
+    return conn
+
+
+def _save(job: dict) -> None:
+    """Write a job's state through to the table; its download count is kept apart."""
+    job["updated"] = time.time()
+    doc = json.dumps({k: v for k, v in job.items() if k != "task"})
+    _db().execute(
+        "INSERT INTO jobs (id, user_id, status, created, job) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET status = excluded.status, job = excluded.job",
+        (job["id"], job["user_id"], job["status"], job["created"], doc))
+
+
+def _load(job_id: str) -> dict | None:
+    row = _db().execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _expire_if_stale(json.loads(row[0])) if row else None
+
+
+def _expire_if_stale(job: dict) -> dict:
+    """Fail a queued or running job whose worker stopped saving it (died or was
+    redeployed), so its owner sees the failure and can upload again."""
+    if job["status"] in ("queued", "running") and job["id"] not in RUNNING \
+            and time.time() - job.get("updated", 0) > STALE_SECONDS:
+        job.update(status="failed", error="The worker running this job stopped before it finished",
+                   finished=datetime.now().isoformat(timespec="seconds"))
+        _save(job)
+        log.warning("Oversight job %s marked failed: no progress for %.0fs", job["id"], STALE_SECONDS)
+    return job
+
+
+def _evict_jobs() -> None:
+    conn = _db()
+    for (doc,) in conn.execute("SELECT job FROM jobs WHERE status IN ('queued', 'running')").fetchall():
+        _expire_if_stale(json.loads(doc))
+    stale = conn.execute(
+        "SELECT id, job FROM jobs WHERE status IN ('complete', 'failed') AND downloads = 0 "
+        "ORDER BY created LIMIT max(0, (SELECT COUNT(*) FROM jobs) - ?)", (MAX_JOBS,)).fetchall()
+    for job_id, doc in stale:
+        # Row first: a download that started since the select keeps its job.
+        if not conn.execute("DELETE FROM jobs WHERE id = ? AND downloads = 0", (job_id,)).rowcount:
+            continue
+        job = json.loads(doc)
+        for path in (job["upload_path"], job["result_path"]):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+async def create_job(user_id: str, chunks, content_type: str, params: dict) -> dict | None:
+    """Spool an uploaded client book to disk and start checking it in the background.
+    Raises UploadTooLarge past MAX_UPLOAD_BYTES."""
+    params = {**DEFAULT_PARAMS, **{k: v for k, v in params.items() if v is not None}}
+    await IO.run_background(_evict_jobs)
+    job_id = uuid.uuid4().hex[:12]
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    fd, upload_path = tempfile.mkstemp(prefix=f"{job_id}-", suffix=".upload", dir=JOBS_DIR)
+    head, size = b"", 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                if not head:
+                    head = chunk[:64]
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    break
+                # Admitted uploads are not refused half way: no queue limit.
+                await IO.run_background(f.write, chunk)
+    except BaseException:
+        os.remove(upload_path)
+        raise
+    if size > MAX_UPLOAD_BYTES:
+        os.remove(upload_path)
+        raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES // 2**20} MB")
+    if not size:
+        os.remove(upload_path)
+        return None
+
+    job = {
+        "id": job_id,
+        "user_id": user_id,
+        "status": "queued",
+        "format": _detect_format(content_type or "", head),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "finished": None,
+        "data_version": get_data_version(),
+        "params": params,
+        "bytes_total": size,
+        "bytes_processed": 0,
+        "rows_processed": 0,
+        "rows_flagged": 0,
+        "flag_counts": {},
+        "errors": 0,
+        "error": None,
+        "upload_path": upload_path,
+        "result_path": None,
+    }
+    await IO.run_background(_save, job)
+    RUNNING[job_id] = job
+    job["task"] = asyncio.create_task(_run_job(job))
+    return _summary(job)
+
+
+async def _run_job(job: dict) -> None:
+    job["status"] = "running"
+    fd, result_path = tempfile.mkstemp(prefix=f"{job['id']}-", suffix=".csv", dir=JOBS_DIR)
+    job["result_path"] = result_path
+    try:
+        with os.fdopen(fd, "w", newline="") as out:
+            writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            # Parsing and checking both run on the CPU pool, a chunk per hop.
+            async for chunk in CPU.iterate(_iter_chunks(job["upload_path"], job["format"], job)):
+                await CPU.run_background(_write_chunk, job, writer, chunk)
+        job["bytes_processed"] = job["bytes_total"]
+        job["status"] = "complete"
+    except Exception as e:
+        log.exception("Oversight job %s failed", job["id"])
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished"] = datetime.now().isoformat(timespec="seconds")
+        if os.path.exists(job["upload_path"]):
+            os.remove(job["upload_path"])
+        RUNNING.pop(job["id"], None)
+        await IO.run_background(_save, job)
+
+
+def _write_chunk(job: dict, writer: csv.DictWriter, chunk: list[dict]) -> None:
+    results = check_holdings(chunk, job["params"])
+    writer.writerows(results)
+    job["rows_processed"] += len(results)
+    job["errors"] += len(chunk) - len(results)
+    for r in results:
+        if r["flag_count"]:
+            job["rows_flagged"] += 1
+            for flag in r["flags"].split(";"):
+                job["flag_counts"][flag] = job["flag_counts"].get(flag, 0) + 1
+    _save(job)      # progress, for polls that reach other workers
+
+
+def get_job(job_id: str, user_id: str) -> dict | None:
+    """A job's summary from the shared table (blocking)."""
+    job = _load(job_id)
+    if not job or job["user_id"] != user_id:
+        return None
+    return _summary(job)
+
+
+def iter_results(job_id: str, fmt: str = "csv", flagged_only: bool = False):
+    """The results file of a completed job as CSV or JSONL text chunks (blocking).
+    Call it from the route that checked the job: the file is opened and the job
+    marked as downloading here, so it is not evicted before the stream starts."""
+    _db().execute("UPDATE jobs SET downloads = downloads + 1 WHERE id = ?", (job_id,))
+    try:
+        f = open(_load(job_id)["result_path"], "r", newline="")
+    except BaseException:
+        _db().execute("UPDATE jobs SET downloads = downloads - 1 WHERE id = ?", (job_id,))
+        raise
+    return _stream_results(job_id, f, fmt, flagged_only)
+
+
+def _stream_results(job_id: str, f, fmt: str, flagged_only: bool):
+    try:
+        reader = csv.DictReader(f)
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.DictWriter(buf, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            for i, row in enumerate(reader, 1):
+                if flagged_only and row["flag_count"] == "0":
+                    continue
+                writer.writerow(row)
+                if i % CHUNK_ROWS == 0:
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+            yield buf.getvalue()
+        else:
+            for row in reader:
+                if flagged_only and row["flag_count"] == "0":
+                    continue
+                yield json.dumps(row) + "\n"
+    finally:
+        f.close()
+        _db().execute("UPDATE jobs SET downloads = downloads - 1 WHERE id = ?", (job_id,))
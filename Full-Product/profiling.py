@@ -0,0 +1,297 @@
+from __future__ import annotations
+"""
+Bridge – Request Profiling
+Admin-only per-request profiling, background 1-in-N sampling and named timing spans
+"""
+
+import contextvars
+import functools
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+PROFILE_DIR = os.environ.get("BRIDGE_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "bridge-profiles")
+SAMPLE_EVERY = int(os.environ.get("BRIDGE_PROFILE_SAMPLE_EVERY", "0") or 0)   # 0 = off
+SAMPLE_INTERVAL = 0.002
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get("BRIDGE_ADMIN_EMAILS", "").split(",") if e.strip()}
+MODES = ("cprofile", "sample")
+
+RECENT: deque = deque(maxlen=100)
+
+_recording: contextvars.ContextVar = contextvars.ContextVar("bridge_profile", default=None)
+# The open spans of this task or thread, as a ";"-joined path. Tasks and pool calls
+# each run in a copy of the request's context, so concurrent work nests separately.
+_span_path: contextvars.ContextVar = contextvars.ContextVar("bridge_span_path", default="")
+_cprofile_lock = threading.Lock()
+_request_counter = [0]
+
+
+# ─── Spans ───────────────────────────────────────────────────────────────
+
+class span:
+    """Named timing span; a context manager or decorator that costs one ContextVar
+    lookup when no profile is recording."""
+
+    __slots__ = ("name", "_rec", "_start", "_token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._rec = None
+
+    def __enter__(self):
+        rec = _recording.get()
+        self._rec = rec
+        if rec is not None:
+            parent = _span_path.get()
+            self._token = _span_path.set(f"{parent};{self.name}" if parent else self.name)
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        rec = self._rec
+        if rec is not None:
+            duration = time.perf_counter() - self._start
+            path = _span_path.get()
+            _span_path.reset(self._token)
+            rec["spans"].append((path, self._start - rec["start"], duration))
+        return False
+
+    def __call__(self, fn):
+        name = self.name
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _recording.get() is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def run_profiled(fn, /, *args, **kwargs):
+    """Call fn, profiling it on this thread when it runs for a request being profiled.
+    The executors call every pool task through this, in a copy of the caller's
+    context, so work handed to run_cpu / run_io shows up in the request's profile.
+    Before 3.12 cProfile hooks one thread, so pool threads get their own profiler."""
+    rec = _recording.get()
+    if rec is None:
+        return fn(*args, **kwargs)
+    if rec["mode"] == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ profiles through sys.monitoring, which is interpreter-wide:
+            # the request's own profiler is the active tool and already sees this
+            # thread's calls, so record spans only.
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            rec["profilers"].append(profiler)
+    ident = threading.get_ident()
+    rec["threads"].add(ident)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        rec["threads"].discard(ident)
+
+
+def _span_totals(rec: dict) -> list[tuple[str, int, float]]:
+    totals: dict[str, list] = {}
+    for path, _, duration in rec["spans"]:
+        t = totals.setdefault(path, [0, 0.0])
+        t[0] += 1
+        t[1] += duration
+    return sorted(((p, n, d) for p, (n, d) in totals.items()), key=lambda x: -x[2])
+
+
+# ─── Sampling Profiler ───────────────────────────────────────────────────
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}"
+
+
+class Sampler:
+    """Samples one thread's stack on a timer, plus any pool threads currently working
+    for the same request (`threads`), and aggregates collapsed stacks."""
+
+    def __init__(self, thread_id: int, threads: set | None = None, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.threads = threads if threads is not None else set()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bridge-sampler", daemon=True)
+
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in (self.thread_id, *tuple(self.threads)):
+                frame = frames.get(thread_id)
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                if names:
+                    self.stacks[";".join(reversed(names))] += 1
+
+
+# ─── Reports ─────────────────────────────────────────────────────────────
+
+def _save(profile_id: str, route: str, mode: str, rec: dict, elapsed: float,
+          profilers: list | None = None, stacks: Counter | None = None) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, profile_id)
+    out = io.StringIO()
+    out.write(f"{mode} profile {profile_id}  {route}  {elapsed * 1000:.2f} ms\n\nSpans:\n")
+    for path, n, duration in _span_totals(rec):
+        out.write(f"  {duration * 1000:10.3f} ms  x{n:<5} {path}\n")
+    if profilers:
+        # The loop thread's profile with those of the pool calls made for the request.
+        import pstats
+        stats = pstats.Stats(*profilers, stream=out)
+        stats.dump_stats(base + ".prof")
+        out.write("\nTop functions (cumulative):\n")
+        stats.sort_stats("cumulative").print_stats(40)
+    with open(base + ".txt", "w") as f:
+        f.write(out.getvalue())
+
+    # Collapsed stacks (flamegraph.pl / speedscope): sampled stacks if we have
+    # them, otherwise span nesting weighted by microseconds.
+    with open(base + ".collapsed", "w") as f:
+        if stacks:
+            for stack, n in stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        else:
+            totals = {path: duration for path, _, duration in _span_totals(rec)}
+            for path, duration in totals.items():
+                children = sum(d for p, d in totals.items() if p.rsplit(";", 1)[0] == path and p != path)
+                f.write(f"{path} {max(1, int((duration - children) * 1e6))}\n")
+
+    RECENT.appendleft({
+        "id": profile_id, "route": route, "mode": mode,
+        "elapsed_ms": round(elapsed * 1000, 2), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+
+
+def profile_path(profile_id: str, fmt: str) -> str | None:
+    ext = {"summary": ".txt", "collapsed": ".collapsed", "prof": ".prof"}[fmt]
+    if not all(c.isalnum() for c in profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ext)
+    return path if os.path.exists(path) else None
+
+
+def is_admin(user: dict | None) -> bool:
+    if not user:
+        return False
+    return user.get("role") == "admin" or user.get("email", "").lower() in ADMIN_EMAILS
+
+
+# ─── Middleware ──────────────────────────────────────────────────────────
+
+class ProfilingMiddleware:
+    """Profiles a request when an admin asks via `X-Bridge-Profile: cprofile|sample`
+    or `?profile=...`, and every Nth request in sampling mode when configured."""
+
+    def __init__(self, app, get_user):
+        self.app = app
+        self.get_user = get_user
+
+    async def _requested_mode(self, scope) -> str | None:
+        if b"profile" not in scope.get("query_string", b"") and not any(
+            k == b"x-bridge-profile" for k, _ in scope.get("headers", [])
+        ):
+            return None
+        from starlette.requests import Request
+        request = Request(scope)
+        mode = request.headers.get("x-bridge-profile") or request.query_params.get("profile")
+        if not mode:
+            return None
+        mode = "cprofile" if mode in ("1", "true") else mode
+        if mode not in MODES:
+            return None
+        from executors import run_io
+        if not is_admin(await run_io(self.get_user, request)):
+            return None
+        return mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        mode = await self._requested_mode(scope)
+        background = False
+        if mode is None and SAMPLE_EVERY:
+            _request_counter[0] += 1
+            if _request_counter[0] % SAMPLE_EVERY == 0:
+                mode, background = "sample", True
+        if mode is None:
+            return await self.app(scope, receive, send)
+
+        rec = {"mode": mode, "spans": [], "profilers": [], "threads": set(), "start": time.perf_counter()}
+        profiler = sampler = None
+        if mode == "cprofile":
+            if not _cprofile_lock.acquire(blocking=False):
+                return await self.app(scope, receive, send)
+            import cProfile
+            profiler = cProfile.Profile()
+        else:
+            sampler = Sampler(threading.get_ident(), rec["threads"])
+
+        profile_id = uuid.uuid4().hex[:16]
+        token = _recording.set(rec)
+        path_token = _span_path.set("")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and not background:
+                elapsed = time.perf_counter() - rec["start"]
+                timing = [f"total;dur={elapsed * 1000:.2f}"] + [
+                    f'span{i};desc="{path.rsplit(";", 1)[-1]}";dur={d * 1000:.2f}'
+                    for i, (path, _, d) in enumerate(_span_totals(rec)[:20])
+                ]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-bridge-profile", profile_id.encode()))
+                headers.append((b"server-timing", ", ".join(timing).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        if profiler:
+            profiler.enable()
+        else:
+            sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - rec["start"]
+            _span_path.reset(path_token)
+            _recording.reset(token)
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            if profiler:
+                profiler.disable()
+                _cprofile_lock.release()
+                _save(profile_id, route, mode, rec, elapsed, profilers=[profiler, *rec["profilers"]])
+            else:
+                # Stopping the sampler and writing the report happen off the request path.
+                threading.Thread(
+                    target=lambda: _save(profile_id, route, mode, rec, elapsed, stacks=sampler.stop()),
+                    daemon=True,
+                ).start()
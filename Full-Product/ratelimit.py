@@ -0,0 +1,293 @@
+from __future__ import annotations
+"""
+Bridge – Rate Limiting
+Token buckets per session user, firm and client IP, with per-route costs
+
+Signed-in requests draw from the user's bucket and the firm's bucket, so one
+adviser cannot exhaust a firm's allowance and one firm cannot crowd out
+others; anonymous requests draw from their IP's bucket. Routes that send
+email or build documents cost more than reads.
+
+Buckets live in process memory by default. With BRIDGE_RATE_LIMIT_DB set to
+a file path, all workers on a host share them through SQLite. An idle bucket
+refills completely and is then indistinguishable from a new one, so it is
+evicted.
+
+    BRIDGE_RATE_LIMIT=0                          disable
+    BRIDGE_RATE_LIMITS=user=120:2,firm=1200:20   capacity:tokens per second
+    BRIDGE_TRUST_FORWARDED=1                     key IPs on X-Forwarded-For
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from executors import run_io
+from metrics import register_collector
+
+ENABLED = os.environ.get("BRIDGE_RATE_LIMIT", "1") != "0"
+RATE_LIMIT_DB = os.environ.get("BRIDGE_RATE_LIMIT_DB", "")
+TRUST_FORWARDED = os.environ.get("BRIDGE_TRUST_FORWARDED") == "1"
+MAX_BUCKETS = 100_000
+SWEEP_INTERVAL = 30.0
+
+LIMITS = {               # scope -> (capacity, tokens refilled per second)
+    "user": (120, 2.0),
+    "firm": (1200, 20.0),
+    "ip": (60, 1.0),
+}
+for _part in filter(None, os.environ.get("BRIDGE_RATE_LIMITS", "").split(",")):
+    _scope, _, _spec = _part.partition("=")
+    _capacity, _, _rate = _spec.partition(":")
+    LIMITS[_scope.strip()] = (float(_capacity), float(_rate))
+
+DEFAULT_COST = 1
+ROUTE_COSTS = {
+    ("POST", "/api/feedback"): 20,
+    ("POST", "/api/demo-request"): 20,
+    ("POST", "/api/messages"): 10,
+    ("POST", "/api/auth/login"): 5,
+    ("POST", "/api/export/consumer-duty"): 30,
+    ("GET", "/api/selection/mps/export"): 20,
+    ("GET", "/api/selection/frontier"): 10,
+    ("POST", "/api/oversight/jobs"): 20,
+    ("GET", "/api/oversight/drift"): 10,
+    ("GET", "/api/benchmarks/relative"): 10,
+    ("POST", "/api/stress"): 10,
+    ("GET", "/api/factors/exposures"): 10,
+}
+EXEMPT_PATHS = {"/api/health", "/api/metrics", "/api/events"}
+
+STATS = {"allowed": 0, "limited": 0, "errors": 0, "limited_by": {}}
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _idle_ttl(capacity: float, rate: float) -> float:
+    return capacity / rate if rate > 0 else float("inf")
+
+
+# ─── Backends ────────────────────────────────────────────────────────────
+
+class MemoryBackend:
+    """Buckets in an OrderedDict by last use; only touched from the event loop."""
+
+    blocking = False
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[str, list] = OrderedDict()   # key -> [tokens, updated, expires]
+
+    def take(self, limits: list[tuple[str, float, float]], cost: float) -> tuple[float, str | None]:
+        """Charge `cost` to every bucket, or to none. Returns (seconds to wait, key that
+        refused); (0, None) when the request may proceed."""
+        now = time.monotonic()
+        buckets = self._buckets
+        levels = []
+        for key, capacity, rate in limits:
+            b = buckets.get(key)
+            level = capacity if b is None else _refill(b[0], b[1], now, capacity, rate)
+            if level < cost:
+                return (cost - level) / rate if rate > 0 else float("inf"), key
+            levels.append(level)
+        for (key, capacity, rate), level in zip(limits, levels):
+            buckets[key] = [level - cost, now, now + _idle_ttl(capacity, rate)]
+            buckets.move_to_end(key)
+        self._evict(now)
+        return 0.0, None
+
+    def _evict(self, now: float) -> None:
+        # Least recently used first, so the scan stops at the first live bucket.
+        buckets = self._buckets
+        while buckets:
+            key, b = next(iter(buckets.items()))
+            if b[2] > now and len(buckets) <= self.max_buckets:
+                break
+            del buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBackend:
+    """Buckets in a local SQLite file shared by every worker on the host."""
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._swept = 0.0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=0.5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets ("
+                         "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, expires REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS buckets_expires ON buckets (expires)")
+            self._local.conn = conn
+        return conn
+
+    def take(self, limits: list[tuple[str, float, float]], cost: float) -> tuple[float, str | None]:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            keys = [key for key, _, _ in limits]
+            rows = {key: (tokens, updated) for key, tokens, updated in conn.execute(
+                f"SELECT key, tokens, updated FROM buckets WHERE key IN ({','.join('?' * len(keys))})", keys)}
+            levels = []
+            for key, capacity, rate in limits:
+                row = rows.get(key)
+                level = capacity if row is None else _refill(row[0], row[1], now, capacity, rate)
+                if level < cost:
+                    conn.execute("ROLLBACK")
+                    return (cost - level) / rate if rate > 0 else float("inf"), key
+                levels.append(level)
+            conn.executemany(
+                "INSERT INTO buckets (key, tokens, updated, expires) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, "
+                "expires = excluded.expires",
+                [(key, level - cost, now, now + _idle_ttl(capacity, rate))
+                 for (key, capacity, rate), level in zip(limits, levels)])
+            if now - self._swept >= SWEEP_INTERVAL:
+                self._swept = now
+                conn.execute("DELETE FROM buckets WHERE expires < ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        return 0.0, None
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+BACKEND = SQLiteBackend(RATE_LIMIT_DB) if RATE_LIMIT_DB else MemoryBackend()
+
+
+# ─── Middleware ──────────────────────────────────────────────────────────
+
+def _client_ip(scope) -> str:
+    if TRUST_FORWARDED:
+        for k, v in scope.get("headers", []):
+            if k == b"x-forwarded-for":
+                return v.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _has_session(scope) -> bool:
+    for k, v in scope.get("headers", []):
+        if k == b"x-session-token" or (k == b"cookie" and b"bridge_session=" in v):
+            return True
+    return False
+
+
+def limits_for(user: dict | None, ip: str) -> list[tuple[str, float, float]]:
+    if user is None:
+        return [("ip:" + ip, *LIMITS["ip"])]
+    limits = [("user:" + str(user["id"]), *LIMITS["user"])]
+    if user.get("firm"):
+        limits.append(("firm:" + user["firm"].strip().lower(), *LIMITS["firm"]))
+    return limits
+
+
+class RateLimitMiddleware:
+    """Answer 429 with Retry-After once a caller's buckets run dry. The session user
+    it resolves is left in scope["state"] for get_user to reuse."""
+
+    def __init__(self, app, get_user, backend=None):
+        self.app = app
+        self.get_user = get_user
+        self.backend = backend or BACKEND
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        if not path.startswith("/api/") or path in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        user = None
+        if _has_session(scope):
+            from starlette.requests import Request
+            user = await run_io(self.get_user, Request(scope))
+            scope.setdefault("state", {})["user"] = user
+        limits = limits_for(user, _client_ip(scope))
+        cost = ROUTE_COSTS.get((scope["method"], path), DEFAULT_COST)
+        wait, key = await _take(self.backend, limits, cost)
+        if not wait:
+            return await self.app(scope, receive, send)
+        await limited_response(wait, key)(scope, receive, send)
+
+
+async def _take(backend, limits, cost: float) -> tuple[float, str | None]:
+    try:
+        if backend.blocking:
+            wait, key = await run_io(backend.take, limits, cost)
+        else:
+            wait, key = backend.take(limits, cost)
+    except Exception as e:
+        # Fail open: a limiter fault must not take the API down with it.
+        STATS["errors"] += 1
+        print(f"Rate limiter error, allowing request: {e}")
+        return 0.0, None
+    if not wait:
+        STATS["allowed"] += 1
+        return 0.0, None
+    scope_name = key.split(":", 1)[0]
+    STATS["limited"] += 1
+    STATS["limited_by"][scope_name] = STATS["limited_by"].get(scope_name, 0) + 1
+    return wait, key
+
+
+def limited_response(wait: float, key: str):
+    from fastapi.responses import JSONResponse
+    scope_name = key.split(":", 1)[0]
+    retry_after = max(1, math.ceil(wait)) if wait != float("inf") else 3600
+    return JSONResponse({"detail": f"Rate limit exceeded for this {scope_name}, retry in {retry_after}s"},
+                        status_code=429, headers={"Retry-After": str(retry_after)})
+
+
+async def charge(scope, user: dict | None, paths: list[str]):
+    """Charge an admitted request for the GET routes it fans out to (a batch), on top
+    of its own cost; repeated paths run once, so are charged once. Returns a 429
+    response if the caller cannot afford them yet, or a 400 if they cost more than
+    the caller's smallest bucket holds, since no amount of waiting would help."""
+    if not ENABLED or not paths:
+        return None
+    cost = sum(ROUTE_COSTS.get(("GET", p.split("?", 1)[0]), DEFAULT_COST) for p in set(paths))
+    limits = limits_for(user, _client_ip(scope))
+    capacity = min(c for _, c, _ in limits)
+    if cost > capacity:
+        from fastapi.responses import JSONResponse
+        return JSONResponse({"detail": f"Batch costs {cost:g} requests, more than the limit of "
+                                       f"{capacity:g}; split it"}, status_code=400)
+    wait, key = await _take(BACKEND, limits, cost)
+    return limited_response(wait, key) if wait else None
+
+
+def _collect() -> list[str]:
+    lines = [
+        "# TYPE bridge_ratelimit_requests_total counter",
+        f'bridge_ratelimit_requests_total{{result="allowed"}} {STATS["allowed"]}',
+        f'bridge_ratelimit_requests_total{{result="error"}} {STATS["errors"]}',
+    ]
+    for scope_name, count in sorted(STATS["limited_by"].items()):
+        lines.append(f'bridge_ratelimit_requests_total{{result="limited",scope="{scope_name}"}} {count}')
+    if not BACKEND.blocking:
+        lines += ["# TYPE bridge_ratelimit_buckets gauge", f"bridge_ratelimit_buckets {len(BACKEND)}"]
+    return lines
+
+
+register_collector(_collect)
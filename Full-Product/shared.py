@@ -0,0 +1,277 @@
+from __future__ import annotations
+"""
+Bridge – Shared Data Snapshot
+One copy of the universe and history matrix for every worker on a host
+
+With BRIDGE_SHARED_DIR set, a parent process publishes numbered generation
+files there and workers mmap them read-only:
+
+    gen-<N>.bin   header | pickled tables (providers, insights, the universe's
+                  strings and layouts) | float64 history matrix, one row of
+                  monthly returns per MPS | the universe's numeric columns
+    control       8-byte generation counter, bumped after each publish
+
+The universe is always published in compact form (compact.py) and attached
+as MPSRecord views over memoryviews into the mapping, so its numbers,
+allocations, flags and fund tables exist once per host. Only the string and
+list tables, which are interned and small, are unpickled per worker. History
+rows are read straight out of the mapping as well, so no worker regenerates
+histories and all of them serve identical figures. A watcher
+thread polls the counter and hot-swaps to a new generation; in-flight
+requests keep the references they already hold.
+
+Publish before starting workers (e.g. from a gunicorn `on_starting` hook)
+and again after a data change:
+    python shared.py publish [--dir DIR]
+    python shared.py status [--dir DIR]
+If no generation exists yet, the first worker to start publishes one.
+"""
+
+import math
+import mmap
+import os
+import pickle
+import random
+import struct
+import sys
+import threading
+import zlib
+
+SHARED_DIR = os.environ.get("BRIDGE_SHARED_DIR", "")
+HISTORY_MONTHS = 60
+SWAP_INTERVAL = 1.0
+KEEP_GENERATIONS = 3
+
+_MAGIC = b"BRSH"
+_HEADER = struct.Struct("<4sIIIQ")   # magic, format, rows, months, tables length
+_FORMAT = 2
+_COUNTER = struct.Struct("<Q")
+
+
+def history_draws(mps: dict, months: int) -> list[float]:
+    """Monthly returns (decimal) for an MPS. Seeded from a CRC of the id rather than
+    hash(), so every process – and every run – draws the same path."""
+    rng = random.Random(zlib.crc32(mps["id"].encode()))
+    base_monthly = (1 + mps["return_3yr"] / 100) ** (1/36) - 1
+    vol_monthly = mps["volatility"] / 100 / math.sqrt(12)
+    return [rng.gauss(base_monthly, vol_monthly) for _ in range(months)]
+
+
+# ─── Snapshot ────────────────────────────────────────────────────────────
+
+class SharedSnapshot:
+    """An attached generation: a compact universe and history rows over the shared
+    mapping, plus the unpickled providers, insights and string tables."""
+
+    def __init__(self, generation: int, path: str):
+        from compact import attach_columns
+
+        self.generation = generation
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, rows, months, meta_len = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or fmt != _FORMAT:
+            raise ValueError(f"{path} is not a format {_FORMAT} Bridge snapshot")
+        start = _HEADER.size
+        self.payload = pickle.loads(self._map[start:start + meta_len])
+        offset = start + meta_len + (-(start + meta_len) % 8)
+        self.months = months
+        view = memoryview(self._map)
+        self._matrix = view[offset:offset + rows * months * 8].cast("d")
+        offset += rows * months * 8
+        columns = [view[offset + at:offset + at + size].cast(typecode)
+                   for at, size, typecode in self.payload.pop("columns")]
+        self.payload["mps_universe"] = attach_columns(self.payload["mps_universe"], columns)
+        self.rows = {mps_id: i for i, mps_id in enumerate(self.payload["history_ids"])}
+
+    def history_row(self, mps_id: str):
+        """Monthly returns for an MPS as a memoryview into shared memory, or None."""
+        i = self.rows.get(mps_id)
+        if i is None:
+            return None
+        return self._matrix[i * self.months:(i + 1) * self.months]
+
+
+_state: dict = {"snapshot": None, "watcher": None}
+_callbacks: list = []
+
+
+def current_snapshot() -> SharedSnapshot | None:
+    """The attached generation, attaching (and publishing if needed) on first use."""
+    if _state["snapshot"] is None and SHARED_DIR:
+        attach()
+    return _state["snapshot"]
+
+
+def on_swap(fn) -> None:
+    """Call fn(snapshot) whenever the worker moves to a new generation."""
+    _callbacks.append(fn)
+
+
+def _control_path(directory: str) -> str:
+    return os.path.join(directory, "control")
+
+
+def _generation_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, f"gen-{generation}.bin")
+
+
+def read_generation(directory: str = SHARED_DIR) -> int:
+    try:
+        with open(_control_path(directory), "rb") as f:
+            data = f.read(_COUNTER.size)
+    except OSError:
+        return 0
+    return _COUNTER.unpack(data)[0] if len(data) == _COUNTER.size else 0
+
+
+def attach(directory: str = SHARED_DIR) -> SharedSnapshot | None:
+    generation = read_generation(directory)
+    if not generation:
+        publish(directory, only_if_missing=True)
+        generation = read_generation(directory)
+    snap = SharedSnapshot(generation, _generation_path(directory, generation))
+    _state["snapshot"] = snap
+    _start_watcher(directory)
+    return snap
+
+
+def _swap(directory: str) -> None:
+    generation = read_generation(directory)
+    current = _state["snapshot"]
+    if not generation or (current and current.generation == generation):
+        return
+    try:
+        snap = SharedSnapshot(generation, _generation_path(directory, generation))
+    except (OSError, ValueError) as e:
+        print(f"Shared snapshot generation {generation} not attached: {e}")
+        return
+    _state["snapshot"] = snap
+    for fn in _callbacks:
+        fn(snap)
+    print(f"Worker {os.getpid()} attached shared snapshot generation {generation}")
+
+
+def _start_watcher(directory: str) -> None:
+    if _state["watcher"] is not None:
+        return
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(SWAP_INTERVAL):
+            try:
+                _swap(directory)
+            except Exception as e:
+                print(f"Shared snapshot watcher: {e}")
+
+    thread = threading.Thread(target=run, name="bridge-shared-watcher", daemon=True)
+    _state["watcher"] = (thread, stop)
+    thread.start()
+
+
+def _restart_watcher_after_fork() -> None:
+    # Threads do not survive fork (gunicorn --preload); each worker needs its own.
+    if _state["watcher"] is not None:
+        _state["watcher"] = None
+        _start_watcher(SHARED_DIR)
+
+
+os.register_at_fork(after_in_child=_restart_watcher_after_fork)
+
+
+# ─── Publishing ──────────────────────────────────────────────────────────
+
+def build_payload() -> tuple[dict, list[list[float]]]:
+    """Records and history draws from the literal source modules."""
+    from compact import compact
+    from insights_data import INSIGHTS
+    from mps_universe import MPS_UNIVERSE, PROVIDERS
+
+    payload = {
+        "providers": PROVIDERS,
+        "mps_universe": compact(MPS_UNIVERSE),
+        "insights": INSIGHTS,
+        "history_ids": [m["id"] for m in MPS_UNIVERSE],
+    }
+    return payload, [history_draws(m, HISTORY_MONTHS) for m in MPS_UNIVERSE]
+
+
+def publish(directory: str = SHARED_DIR, payload: dict | None = None,
+            histories: list[list[float]] | None = None, only_if_missing: bool = False) -> int:
+    """Write a new generation and bump the counter. Returns the generation number."""
+    import array
+    import fcntl
+    from compact import compact, export_columns
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        generation = read_generation(directory)
+        if only_if_missing and generation:
+            return generation
+        if payload is None:
+            payload, histories = build_payload()
+
+        # Numeric columns go after the history matrix, each 8-byte aligned; the
+        # pickled tables record where.
+        state, columns = export_columns(compact(payload["mps_universe"]))
+        layout, at = [], 0
+        for col in columns:
+            size = len(col) * (col.itemsize if isinstance(col, array.array) else 1)
+            layout.append((at, size, col.typecode if isinstance(col, array.array) else "B"))
+            at += size + (-size % 8)
+        meta = pickle.dumps({**payload, "mps_universe": state, "columns": layout},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        matrix = array.array("d")
+        for row in histories:
+            matrix.extend(row[:HISTORY_MONTHS])
+        generation += 1
+        path = _generation_path(directory, generation)
+        with open(path + ".tmp", "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _FORMAT, len(histories), HISTORY_MONTHS, len(meta)))
+            f.write(meta)
+            f.write(b"\0" * (-(_HEADER.size + len(meta)) % 8))
+            matrix.tofile(f)
+            for col in columns:
+                f.write(col)
+                f.write(b"\0" * (-f.tell() % 8))
+        os.replace(path + ".tmp", path)
+
+        with open(_control_path(directory) + ".tmp", "wb") as f:
+            f.write(_COUNTER.pack(generation))
+        os.replace(_control_path(directory) + ".tmp", _control_path(directory))
+
+        # Workers that still map an older file keep it alive until they swap.
+        stale = _generation_path(directory, generation - KEEP_GENERATIONS)
+        if os.path.exists(stale):
+            os.remove(stale)
+    return generation
+
+
+def main_cli(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bridge shared data snapshot")
+    parser.add_argument("command", choices=["publish", "status"])
+    parser.add_argument("--dir", default=SHARED_DIR, help="shared directory (default $BRIDGE_SHARED_DIR)")
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error("--dir or BRIDGE_SHARED_DIR is required")
+
+    if args.command == "publish":
+        generation = publish(args.dir)
+        print(f"Published generation {generation} to {args.dir}")
+    else:
+        generation = read_generation(args.dir)
+        if not generation:
+            print(f"No generation published in {args.dir}")
+            return 1
+        snap = SharedSnapshot(generation, _generation_path(args.dir, generation))
+        print(f"Generation {generation}: {len(snap.payload['mps_universe'])} MPS, "
+              f"{len(snap.payload['providers'])} providers, {len(snap.payload['insights'])} insights, "
+              f"{len(snap.rows)} x {snap.months} history matrix")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,136 @@
+from __future__ import annotations
+"""
+Bridge – Request Coalescing
+Single-flight for expensive reads: concurrent identical calls share one computation
+
+Keys are (name, normalised arguments, data version). Nothing is cached once the
+leading call finishes – this only collapses the stampede that follows a data
+refresh, so results must be treated as read-only by every caller. A getter
+called on the event loop thread never waits on another thread's call, which
+would stall the loop; it computes the result itself.
+"""
+
+import asyncio
+import functools
+import inspect
+import threading
+
+from metrics import register_collector
+
+STATS: dict[str, dict] = {}
+
+_lock = threading.Lock()
+_inflight: dict = {}          # key -> _Call (thread callers)
+_async_inflight: dict = {}    # key -> asyncio.Task (route handlers)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _count(name: str, field: str) -> None:
+    with _lock:
+        stats = STATS.get(name)
+        if stats is None:
+            stats = STATS[name] = {"leader": 0, "coalesced": 0, "direct": 0}
+        stats[field] += 1
+
+
+def normalise(value):
+    """Hashable form of a parameter. Lists and sets are sorted – order is irrelevant to
+    every getter we wrap – while tuples keep theirs."""
+    if isinstance(value, (list, set, frozenset)):
+        items = [normalise(v) for v in value]
+        try:
+            return tuple(sorted(items))
+        except TypeError:
+            return tuple(items)
+    if isinstance(value, tuple):
+        return tuple(normalise(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalise(v)) for k, v in value.items()))
+    return value
+
+
+# ─── Thread Callers ──────────────────────────────────────────────────────
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def single_flight(name: str, version):
+    """Decorator for data getters, usually run on executor threads. `version` is a
+    callable returning the current data version."""
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (name, normalise(bound.arguments), version())
+            with _lock:
+                call = _inflight.get(key)
+                leader = call is None
+                if leader:
+                    call = _inflight[key] = _Call()
+            if not leader and _on_event_loop():
+                _count(name, "direct")
+                return fn(*args, **kwargs)
+            if not leader:
+                _count(name, "coalesced")
+                call.event.wait()
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            _count(name, "leader")
+            try:
+                call.result = fn(*args, **kwargs)
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with _lock:
+                    _inflight.pop(key, None)
+                call.event.set()
+        return wrapper
+    return decorator
+
+
+# ─── Route Handlers ──────────────────────────────────────────────────────
+
+async def coalesce(name: str, key: tuple, fn, *args, **kwargs):
+    """Await `fn(*args, **kwargs)` once per key among concurrent callers. The work runs
+    as its own task, so a leader whose client disconnects does not cancel the others."""
+    full_key = (name, normalise(key))
+    task = _async_inflight.get(full_key)
+    if task is None:
+        _count(name, "leader")
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        _async_inflight[full_key] = task
+        task.add_done_callback(lambda t: _async_inflight.pop(full_key, None))
+    else:
+        _count(name, "coalesced")
+    return await asyncio.shield(task)
+
+
+def _collect() -> list[str]:
+    lines = ["# TYPE bridge_singleflight_calls_total counter"]
+    for name, stats in sorted(STATS.items()):
+        for result in ("leader", "coalesced", "direct"):
+            lines.append(f'bridge_singleflight_calls_total{{name="{name}",result="{result}"}} {stats[result]}')
+    return lines
+
+
+register_collector(_collect)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+"""
+Bridge – Data Snapshot
+Precompiled pickle of the MPS universe for fast cold starts
+
+Build with `python snapshot.py [path]` and point BRIDGE_SNAPSHOT at the file.
+"""
+
+import os
+import sys
+import zlib
+
+SNAPSHOT_FORMAT = 1
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bridge_data.snapshot")
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mps_universe.py")
+
+
+def _source_stamp() -> int | None:
+    # The content, not size and mtime: checkouts and copies don't keep mtimes.
+    try:
+        with open(SOURCE, "rb") as f:
+            return zlib.crc32(f.read())
+    except OSError:
+        return None
+
+
+def load_snapshot(path: str | None = None) -> dict | None:
+    """Return the snapshot payload, or None if unset, missing or older than the source."""
+    path = path or os.environ.get("BRIDGE_SNAPSHOT", "")
+    if not path or not os.path.exists(path):
+        return None
+    import pickle
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        print(f"Ignoring snapshot {path}: {e}")
+        return None
+    if payload.get("format") != SNAPSHOT_FORMAT:
+        print(f"Ignoring snapshot {path}: format {payload.get('format')} != {SNAPSHOT_FORMAT}")
+        return None
+    stamp = _source_stamp()
+    if stamp is not None and payload.get("source_stamp") != stamp:
+        print(f"Ignoring snapshot {path}: mps_universe.py has changed since it was built")
+        return None
+    return payload
+
+
+def build_snapshot(path: str = DEFAULT_PATH) -> str:
+    import pickle
+    from compact import COMPACT_RECORDS, compact
+    from mps_universe import PROVIDERS, MPS_UNIVERSE
+
+    payload = {
+        "format": SNAPSHOT_FORMAT,
+        "source_stamp": _source_stamp(),
+        "providers": PROVIDERS,
+        "mps_universe": compact(MPS_UNIVERSE) if COMPACT_RECORDS else MPS_UNIVERSE,
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+if __name__ == "__main__":
+    out = build_snapshot(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH)
+    print(f"Snapshot written to {out}")
@@ -0,0 +1,186 @@
+from __future__ import annotations
+"""
+Bridge – Cold Start
+Lazily loaded subsystems, startup phase timings and an import-cost report
+
+Usage (from Full-Product/):
+    python startup.py [--snapshot FILE] [--path /api/dashboard] [--top 25] [--out FILE]
+"""
+
+import importlib
+import sys
+import time
+
+_T0 = time.perf_counter()
+PHASES: list[tuple[str, float]] = []
+LAZY_LOADS: dict[str, float] = {}
+
+
+def mark(phase: str) -> None:
+    """Record the time since this module was first imported under a phase name."""
+    PHASES.append((phase, time.perf_counter() - _T0))
+
+
+# ─── Lazy Subsystems ─────────────────────────────────────────────────────
+
+class LazyModule:
+    """Module proxy that imports on first attribute access and records the cost.
+    Route handlers reference `optimiser.optimise_panel` instead of importing it at
+    module load, so cold starts only pay for what the first request touches."""
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+
+    def _load(self):
+        name = self.__dict__["_name"]
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        LAZY_LOADS[name] = time.perf_counter() - start
+        # Later lookups hit the instance dict directly and skip __getattr__.
+        self.__dict__.update(module.__dict__)
+        self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        module = self.__dict__.get("_module") or self._load()
+        setattr(module, attr, value)
+        self.__dict__[attr] = value
+
+
+def lazy_module(name: str) -> LazyModule:
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def startup_report() -> dict:
+    return {
+        "snapshot": bool(getattr(sys.modules.get("mps_data"), "SNAPSHOT_LOADED", False)),
+        "phases_ms": {name: round(t * 1000, 2) for name, t in PHASES},
+        "lazy_loads_ms": {name: round(t * 1000, 2) for name, t in LAZY_LOADS.items()},
+        "uptime_s": round(time.perf_counter() - _T0, 1),
+    }
+
+
+# ─── Import-Time Report ──────────────────────────────────────────────────
+
+def _child(path: str) -> None:
+    """Runs under `python -X importtime`: import the app, serve one request, print timings."""
+    import asyncio
+    import json
+    import startup   # the copy main.py records into, not this __main__
+
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+
+    async def first_request():
+        import httpx
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            t = time.perf_counter()
+            resp = await client.get(path)
+            return resp.status_code, time.perf_counter() - t
+
+    status, first = asyncio.run(first_request())
+    print(json.dumps({
+        "import_main_ms": round((imported - start) * 1000, 2),
+        "first_request_ms": round(first * 1000, 2),
+        "first_request_status": status,
+        **startup.startup_report(),
+    }))
+
+
+def _parse_importtime(stderr: str) -> list[dict]:
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({"module": name.strip(), "depth": depth,
+                     "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return rows
+
+
+def _by_package(rows: list[dict]) -> list[tuple[str, float]]:
+    """Self time summed by top-level package, so `fastapi.*` shows up as one line."""
+    totals: dict[str, int] = {}
+    for r in rows:
+        top = r["module"].split(".")[0]
+        totals[top] = totals.get(top, 0) + r["self_us"]
+    return sorted(((k, v / 1000) for k, v in totals.items()), key=lambda x: -x[1])
+
+
+def measure(path: str = "/api/dashboard", snapshot: str | None = None) -> dict:
+    import json
+    import os
+    import subprocess
+
+    env = dict(os.environ)
+    env.pop("BRIDGE_SNAPSHOT", None)
+    if snapshot:
+        env["BRIDGE_SNAPSHOT"] = os.path.abspath(snapshot)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", __file__, "--child", "--path", path],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(proc.stderr[-2000:])
+    rows = _parse_importtime(proc.stderr)
+    local = {os.path.splitext(f)[0] for f in os.listdir(os.path.dirname(os.path.abspath(__file__)))
+             if f.endswith(".py")}
+    return {
+        **json.loads(proc.stdout.strip().splitlines()[-1]),
+        "process_wall_ms": round(wall * 1000, 2),
+        "packages_ms": [[name, round(ms, 2)] for name, ms in _by_package(rows)],
+        "first_party_ms": [[r["module"], round(r["self_us"] / 1000, 2), round(r["cumulative_us"] / 1000, 2)]
+                           for r in rows if r["module"].split(".")[0] in local],
+    }
+
+
+def main_cli(argv=None) -> int:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Bridge cold-start report")
+    parser.add_argument("--path", default="/api/dashboard", help="first request to time")
+    parser.add_argument("--snapshot", help="data snapshot to load (see snapshot.py)")
+    parser.add_argument("--top", type=int, default=25, help="packages to list")
+    parser.add_argument("--out", help="write the full report as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.path)
+        return 0
+
+    report = measure(args.path, args.snapshot)
+    print(f"process {report['process_wall_ms']:.1f} ms   import main {report['import_main_ms']:.1f} ms   "
+          f"first request {report['first_request_ms']:.1f} ms ({report['first_request_status']})   "
+          f"snapshot {'yes' if report['snapshot'] else 'no'}")
+    print("\nPhases:")
+    for name, ms in report["phases_ms"].items():
+        print(f"  {ms:10.2f} ms  {name}")
+    print("\nImport self-time by package:")
+    for name, ms in report["packages_ms"][:args.top]:
+        print(f"  {ms:10.2f} ms  {name}")
+    print("\nFirst-party modules (self / cumulative):")
+    for name, self_ms, cum_ms in report["first_party_ms"]:
+        print(f"  {self_ms:10.2f} / {cum_ms:8.2f} ms  {name}")
+    if report["lazy_loads_ms"]:
+        print("\nLazy loads during first request:")
+        for name, ms in report["lazy_loads_ms"].items():
+            print(f"  {ms:10.2f} ms  {name}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
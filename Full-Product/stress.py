@@ -0,0 +1,217 @@
+from __future__ import annotations
+"""
+Bridge – Scenario Stress Testing
+Estimated scenario returns for every portfolio from a shock matrix and a universe exposure matrix
+
+A portfolio's exposures are its asset-class weights followed by its
+regional weights (geographic allocation covers the whole portfolio, so a
+regional shock – a sterling move, a UK-specific sell-off – applies on top of
+the asset-class shocks). A scenario is one shock per exposure, in percent.
+Estimated returns are then exposures @ shocksᵀ.
+
+The exposure matrix is built once per data version with identical rows
+merged – the universe holds far fewer distinct allocations than
+portfolios – so a scenario set costs (distinct rows × scenarios) dot
+products, and rankings and provider figures come from row membership.
+"""
+
+import hashlib
+import heapq
+import json
+import operator
+import threading
+from itertools import repeat
+
+from cache import LRUCache
+from mps_data import ASSET_CLASSES, REGIONS, get_all_mps, get_data_version
+
+FACTORS = [f"asset:{a}" for a in ASSET_CLASSES] + [f"region:{r}" for r in REGIONS]
+MAX_SCENARIOS = 50
+MAX_SHOCK = 100.0        # % either way
+
+# Indicative peak-to-trough moves in GBP terms.
+SCENARIOS = {
+    "gilt-crisis-2022": {
+        "name": "2022 gilt crisis (LDI sell-off)",
+        "asset_classes": {"equity": -7.0, "bonds": -14.0, "alternatives": -9.0, "cash": 0.0},
+        "regions": {"uk": -3.0},
+    },
+    "covid-2020": {
+        "name": "2020 COVID drawdown",
+        "asset_classes": {"equity": -26.0, "bonds": -3.5, "alternatives": -14.0, "cash": 0.0},
+        "regions": {"uk": -6.0, "europe": -3.0, "emerging_markets": -4.0},
+    },
+    "gbp-shock": {
+        "name": "Sterling rallies 10%",
+        "asset_classes": {},
+        "regions": {"north_america": -9.0, "europe": -7.0, "asia_pacific": -9.0, "emerging_markets": -9.0,
+                    "other": -7.0},
+    },
+    "gfc-2008": {
+        "name": "2008 global financial crisis",
+        "asset_classes": {"equity": -38.0, "bonds": 4.0, "alternatives": -25.0, "cash": 0.5},
+        "regions": {"emerging_markets": -10.0, "uk": -3.0},
+    },
+    "rates-up-200bp": {
+        "name": "Rates up 200bp",
+        "asset_classes": {"equity": -9.0, "bonds": -11.0, "alternatives": -6.0, "cash": 0.5},
+        "regions": {},
+    },
+}
+
+VECTORS = LRUCache("stress_scenario_vectors", maxsize=1024)
+RESULTS = LRUCache("stress_results", maxsize=64)
+
+_exposures: dict = {"version": None}
+_build_lock = threading.Lock()
+
+
+# ─── Scenarios ───────────────────────────────────────────────────────────
+
+def scenario_vector(scenario: dict) -> tuple[float, ...]:
+    """A scenario's shocks in FACTORS order (cached by content). Raises ValueError."""
+    key = json.dumps([scenario.get("asset_classes") or {}, scenario.get("regions") or {}], sort_keys=True)
+    vector = VECTORS.get(key)
+    if vector is None:
+        shocks = {}
+        for group, names, prefix, label in (("asset_classes", ASSET_CLASSES, "asset", "asset class"),
+                                            ("regions", REGIONS, "region", "region")):
+            values = scenario.get(group) or {}
+            if not isinstance(values, dict):
+                raise ValueError(f"'{group}' must map names to shocks in %")
+            for name, shock in values.items():
+                if name not in names:
+                    raise ValueError(f"Unknown {label} '{name}'")
+                if not isinstance(shock, (int, float)) or isinstance(shock, bool) or abs(shock) > MAX_SHOCK:
+                    raise ValueError(f"Shock for '{name}' must be a number within ±{MAX_SHOCK:g}%")
+                shocks[f"{prefix}:{name}"] = float(shock)
+        vector = tuple(shocks.get(f, 0.0) for f in FACTORS)
+        VECTORS.set(key, vector)
+    return vector
+
+
+def resolve_scenarios(items: list) -> list[dict]:
+    """Built-in scenario ids and/or custom scenario dicts, validated. Raises ValueError."""
+    if len(items) > MAX_SCENARIOS:
+        raise ValueError(f"At most {MAX_SCENARIOS} scenarios per request")
+    resolved = []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            if item not in SCENARIOS:
+                raise ValueError(f"Unknown scenario '{item}'")
+            scenario = {"id": item, **SCENARIOS[item]}
+        elif isinstance(item, dict):
+            scenario = {"id": str(item.get("id") or f"custom-{i + 1}"), "name": str(item.get("name") or ""),
+                        "asset_classes": item.get("asset_classes") or {}, "regions": item.get("regions") or {}}
+        else:
+            raise ValueError("Scenarios are ids or {id, name, asset_classes, regions} objects")
+        scenario["vector"] = scenario_vector(scenario)
+        resolved.append(scenario)
+    return resolved
+
+
+def list_scenarios() -> list[dict]:
+    return [{"id": sid, **s} for sid, s in SCENARIOS.items()]
+
+
+# ─── Exposures ───────────────────────────────────────────────────────────
+
+class ExposureMatrix:
+    """Distinct exposure rows of the universe and which portfolios hold each."""
+
+    def __init__(self, records):
+        self.records = records
+        row_ids: dict[tuple, int] = {}
+        self.rows: list[tuple] = []
+        self.members: list[list[int]] = []
+        providers: dict[str, dict[int, int]] = {}
+        for i, m in enumerate(records):
+            assets = m.get("asset_allocation") or {}
+            regions = m.get("geographic_allocation") or {}
+            vector = tuple((assets.get(a) or 0) / 100 for a in ASSET_CLASSES) + \
+                tuple((regions.get(r) or 0) / 100 for r in REGIONS)
+            row = row_ids.get(vector)
+            if row is None:
+                row = row_ids[vector] = len(self.rows)
+                self.rows.append(vector)
+                self.members.append([])
+            self.members[row].append(i)
+            counts = providers.setdefault(m["provider"], {})
+            counts[row] = counts.get(row, 0) + 1
+        self.columns = [list(col) for col in zip(*self.rows)] or [[] for _ in FACTORS]
+        self.sizes = [len(members) for members in self.members]
+        # provider -> (rows it holds, portfolios on each)
+        self.providers = {name: (list(counts), list(counts.values())) for name, counts in providers.items()}
+
+    def returns(self, vector: tuple) -> list[float]:
+        """Estimated return per distinct row: the matrix times one shock vector,
+        a column at a time over the factors the scenario moves."""
+        out = [0.0] * len(self.rows)
+        for column, shock in zip(self.columns, vector):
+            if shock:
+                out = list(map(operator.add, out, map(operator.mul, column, repeat(shock))))
+        return out
+
+
+def get_exposures() -> ExposureMatrix:
+    version = get_data_version()
+    if _exposures["version"] != version:
+        with _build_lock:
+            if _exposures["version"] != version:
+                _exposures.update(matrix=ExposureMatrix(get_all_mps()), version=version)
+    return _exposures["matrix"]
+
+
+# ─── Evaluation ──────────────────────────────────────────────────────────
+
+def _scenario_result(exposures: ExposureMatrix, scenario: dict, top: int) -> dict:
+    returns = exposures.returns(scenario["vector"])
+
+    # Worst first: walk rows by return and expand members until `top` is reached.
+    # Every row has at least one member, so the `top` worst rows are enough.
+    ranked, records = [], exposures.records
+    order = heapq.nsmallest(top, range(len(returns)), key=returns.__getitem__) if top else \
+        sorted(range(len(returns)), key=returns.__getitem__)
+    for row in order:
+        for i in exposures.members[row]:
+            if top and len(ranked) >= top:
+                break
+            m = records[i]
+            ranked.append({"id": m["id"], "name": m["name"], "provider": m["provider"],
+                           "risk_rating": m["risk_rating"], "estimated_return": round(returns[row], 2)})
+        if top and len(ranked) >= top:
+            break
+
+    providers = []
+    for name, (rows, counts) in exposures.providers.items():
+        n = sum(counts)
+        held = list(map(returns.__getitem__, rows))
+        providers.append({
+            "provider": name,
+            "portfolio_count": n,
+            "average_return": round(sum(map(operator.mul, held, counts)) / n, 2),
+            "worst_return": round(min(held), 2),
+        })
+    providers.sort(key=lambda p: (p["average_return"], p["provider"]))
+    return {
+        "scenario": {k: v for k, v in scenario.items() if k != "vector"},
+        "universe_average_return": round(sum(map(operator.mul, returns, exposures.sizes)) / max(1, len(records)), 2),
+        "portfolios": ranked,
+        "providers": providers,
+    }
+
+
+def run_stress(scenarios: list[dict], top: int = 50) -> list[dict]:
+    """Ranked estimated returns per portfolio and provider for each resolved scenario."""
+    exposures = get_exposures()
+    version = _exposures["version"]
+    results = []
+    for scenario in scenarios:
+        digest = hashlib.sha1(json.dumps([scenario["id"], scenario["name"], scenario["vector"]]).encode()).hexdigest()
+        key = (version, digest, top)
+        result = RESULTS.get(key)
+        if result is None:
+            result = _scenario_result(exposures, scenario, top)
+            RESULTS.set(key, result)
+        results.append(result)
+    return results
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+import batch
+import executors
+import ratelimit
+
+
+def _app(release: threading.Event) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/one")
+    async def one(n: int = 1):
+        return {"n": n}
+
+    @app.get("/api/text")
+    async def text():
+        return PlainTextResponse("plain </script>")
+
+    @app.get("/api/slow")
+    async def slow():
+        return {"slow": await executors.run_cpu(release.wait, 5)}
+
+    return app
+
+
+def _resolve(app, paths):
+    scope = {"type": "http", "headers": [], "client": ("1.2.3.4", 1)}
+    return json.loads(asyncio.run(batch.resolve(app, scope, paths)))["results"]
+
+
+def test_resolve_keeps_order_and_fetches_repeats_once():
+    results = _resolve(_app(threading.Event()), ["/api/one?n=2", "/api/text", "/api/one?n=2", "/api/missing"])
+    assert [r["path"] for r in results] == ["/api/one?n=2", "/api/text", "/api/one?n=2", "/api/missing"]
+    assert results[0] == results[2] == {"path": "/api/one?n=2", "status": 200, "body": {"n": 2}}
+    assert results[1]["body"] == "plain </script>"
+    assert results[3]["status"] == 404
+
+
+def test_validate_rejects_non_api_and_nested_paths():
+    assert batch.validate(["/api/one"]) == ["/api/one"]
+    for paths in (["https://evil/api/one"], ["/docs"], ["/api/batch"], ["/api/one"] * (batch.MAX_PATHS + 1), "x"):
+        with pytest.raises(batch.BatchError):
+            batch.validate(paths)
+
+
+def test_timed_out_parts_do_not_hold_pool_slots(monkeypatch):
+    pool = executors.Pool("cpu", workers=1, max_queue=4)
+    monkeypatch.setattr(executors, "CPU", pool)
+    monkeypatch.setattr(batch, "PART_TIMEOUT", 0.1)
+    release = threading.Event()
+    app = _app(release)
+
+    # One part holds the only worker; the others time out while still queued.
+    results = _resolve(app, [f"/api/slow?i={i}" for i in range(4)])
+    assert [r["status"] for r in results] == [504] * 4
+    release.set()
+    for _ in range(50):
+        if not pool.pending:
+            break
+        threading.Event().wait(0.02)
+    assert pool.pending == 0
+    assert _resolve(app, ["/api/slow"])[0]["status"] == 200
+
+
+def test_charge_refuses_batches_larger_than_the_bucket(monkeypatch):
+    monkeypatch.setattr(ratelimit, "ENABLED", True)
+    monkeypatch.setattr(ratelimit, "BACKEND", ratelimit.MemoryBackend())
+    scope = {"type": "http", "headers": [], "client": ("1.2.3.4", 1)}
+    capacity = ratelimit.LIMITS["ip"][0]
+    expensive = [f"/api/factors/exposures?months={m}" for m in range(12, 13 + int(capacity // 10))]
+
+    refused = asyncio.run(ratelimit.charge(scope, None, expensive))
+    assert refused.status_code == 400
+    # Nothing was taken from the bucket, and an affordable batch still goes through.
+    assert asyncio.run(ratelimit.charge(scope, None, expensive[:2])) is None
+    assert asyncio.run(ratelimit.charge(scope, None, ["/api/health"] * 3)) is None
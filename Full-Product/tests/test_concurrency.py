@@ -0,0 +1,73 @@
+"""Health stays responsive while exports run, and a full pool answers 503."""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault("BRIDGE_RATE_LIMIT", "0")
+main = pytest.importorskip("main")
+httpx = pytest.importorskip("httpx")
+
+import executors
+from bench.synthetic import make_universe, use_universe
+
+EXPORT = "/api/selection/mps/export?format=csv&include_history=true&months=60"
+
+
+def _client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test", timeout=None)
+
+
+def test_slow_export_does_not_stall_health():
+    async def scenario():
+        async with _client() as client:
+            export = asyncio.ensure_future(client.get(EXPORT))
+            started = time.perf_counter()
+            latencies = []
+            while not export.done():
+                t = time.perf_counter()
+                resp = await client.get("/api/health")
+                assert resp.status_code == 200
+                latencies.append(time.perf_counter() - t)
+                await asyncio.sleep(0.01)
+            resp = await export
+            return resp, time.perf_counter() - started, latencies
+
+    with use_universe(make_universe(1000)):
+        resp, export_seconds, latencies = asyncio.run(scenario())
+    assert resp.status_code == 200 and resp.text.count("\n") > 1000
+    # The export runs long enough to have blocked probes had it held the loop.
+    assert export_seconds > 0.3 and len(latencies) >= 5
+    assert max(latencies) < max(0.2, export_seconds / 4), (export_seconds, max(latencies))
+
+
+def test_full_cpu_pool_answers_503(monkeypatch):
+    pool = executors.Pool("cpu", workers=1, max_queue=1)
+    monkeypatch.setattr(executors, "CPU", pool)
+    monkeypatch.setattr(executors, "POOLS", (pool, executors.IO))
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    async def scenario():
+        async with _client() as client:
+            held = asyncio.ensure_future(pool.run(hold))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            queued = asyncio.ensure_future(pool.run(lambda: None))
+            await asyncio.sleep(0)
+            busy = await client.get("/api/selection/mps?risk_min=1&risk_max=10")
+            metrics = (await client.get("/api/metrics")).text
+            release.set()
+            await asyncio.gather(held, queued)
+            return busy, metrics
+
+    busy, metrics = asyncio.run(scenario())
+    assert busy.status_code == 503 and busy.headers["retry-after"] == "1"
+    assert 'bridge_executor_running{pool="cpu"} 1' in metrics
+    assert 'bridge_executor_queue_depth{pool="cpu"} 1' in metrics
+    assert 'bridge_executor_rejected_total{pool="cpu"} 1' in metrics
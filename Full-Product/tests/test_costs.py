@@ -0,0 +1,38 @@
+import pytest
+
+import costs
+
+TIERS = {"breakpoints": [0, 250000, 500000], "rates": [0.30, 0.20, 0.10]}
+
+
+def test_platform_charge_is_tiered():
+    assert costs.platform_charge(TIERS, 100000) == pytest.approx(300)
+    assert costs.platform_charge(TIERS, 300000) == pytest.approx(750 + 100)
+    assert costs.platform_charge(TIERS, 600000) == pytest.approx(750 + 500 + 100)
+    assert costs.platform_charge(TIERS, -1) == 0
+
+
+def test_pot_bucket_never_drops_below_one_bucket():
+    assert costs.pot_bucket(100) == costs.POT_BUCKET_GBP
+    assert costs.pot_bucket(123456) == 123000
+    assert costs.pot_bucket(123500) == 124000
+
+
+def test_cost_table_is_ranked_and_respects_minimum_investment():
+    pot = 25000
+    table = costs.get_cost_table(pot, adviser_fee_bps=40)
+    rows = table["rows"]
+    assert rows and table["count"] == len(rows)
+    assert [r["rank"] for r in rows] == list(range(1, len(rows) + 1))
+    assert [r["total_bps"] for r in rows] == sorted(r["total_bps"] for r in rows)
+    for r in rows[:50]:
+        assert r["adviser_bps"] == 40
+        assert r["total_gbp"] == pytest.approx(pot * r["total_bps"] / 10000, abs=0.05)
+    assert len(rows) <= len(costs.get_cost_table(1_000_000, adviser_fee_bps=40)["rows"])
+
+
+def test_pounds_follow_the_pot_within_a_bucket():
+    a = costs.get_cost_table(100200)["rows"][0]
+    b = costs.get_cost_table(100400)["rows"][0]
+    assert a["total_bps"] == b["total_bps"]
+    assert b["total_gbp"] > a["total_gbp"]
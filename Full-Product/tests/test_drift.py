@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+import drift
+
+BALANCED = (0.6, 0.3, 0.05, 0.05)
+
+
+def test_quantise_stays_on_the_grid_and_sums_to_one():
+    rng = random.Random(3)
+    for grid in drift.TARGET_GRIDS:
+        for _ in range(50):
+            raw = [rng.random() for _ in range(4)]
+            target = drift.quantise(tuple(w / sum(raw) for w in raw), grid)
+            assert sum(target) == pytest.approx(1)
+            assert all(abs(w * 100 / grid - round(w * 100 / grid)) < 1e-9 for w in target)
+
+
+def test_policies_rebalance_on_their_schedule():
+    groups = [(p, BALANCED) for p in ("Monthly", "Quarterly", "Automatic", "None")]
+    monthly, quarterly, automatic, never = drift.simulate(groups, band=5, years=2, paths=10)
+    assert monthly["rebalances_per_year"] == 12
+    assert quarterly["rebalances_per_year"] == 4
+    assert never["rebalances_per_year"] == 0 and never["turnover_pct_per_year"] == 0
+    assert never["mean_drift"] > monthly["mean_drift"]
+    assert automatic["pct_time_outside_band"] < never["pct_time_outside_band"]
+
+
+def test_all_cash_never_drifts():
+    (row,) = drift.simulate([("Automatic", (0.0, 0.0, 0.0, 1.0))], years=1, paths=10)
+    assert row["max_drift"] == 0 and row["rebalances_per_year"] == 0
+
+
+def _portfolios(n, seed=5):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        # A handful of model allocations, each nudged by a point or two.
+        equity = rng.choice([40, 60, 80]) + rng.randint(0, 2)
+        bonds = rng.choice([5, 15]) + rng.randint(0, 2)
+        out.append({"id": f"m{i}", "name": f"M{i}", "provider": "P", "rebalancing": "Monthly",
+                    "asset_allocation": {"equity": equity, "bonds": bonds, "alternatives": 0,
+                                         "cash": 100 - equity - bonds}})
+    return out
+
+
+def test_work_is_held_to_the_budget(monkeypatch):
+    monkeypatch.setattr(drift, "MAX_WORK", 20 * 10)
+    rows, summary = drift._run(_portfolios(60), band=5, years=1, paths=10)
+    assert len(rows) == 60
+    assert summary["target_grid_pp"] > drift.TARGET_GRIDS[0]
+    assert summary["groups"] * summary["paths_simulated"] <= 20 * 10
+    assert summary["by_policy"]["Monthly"]["count"] == 60
+
+    _, summary = drift._run(_portfolios(60), band=5, years=1, paths=40)
+    assert summary["target_grid_pp"] == drift.TARGET_GRIDS[-1]
+    assert drift.MIN_PATHS <= summary["paths_simulated"] < 40
+
+    monkeypatch.setattr(drift, "MAX_WORK", 5)
+    with pytest.raises(ValueError):
+        drift._run(_portfolios(60), band=5, years=1, paths=10)
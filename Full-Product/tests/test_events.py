@@ -0,0 +1,60 @@
+import asyncio
+
+import events
+import mps_data
+
+
+def test_client_holds_a_slot_only_while_streaming(monkeypatch):
+    hub = events.Hub()
+    monkeypatch.setattr(events, "HUB", hub)
+    monkeypatch.setattr(events, "MAX_CLIENTS", 1)
+
+    async def scenario():
+        abandoned = hub.connect("u1", set())
+        assert abandoned is not None and not hub.clients
+        # A response that was never iterated leaves room for the next client.
+        client = hub.connect("u2", {"p1"})
+        stream = hub.stream(client)
+        assert (await stream.__anext__()).startswith(b"retry:")
+        assert list(hub.clients) == [client.id]
+        assert hub.connect("u3", set()) is None
+
+        await stream.__anext__()           # hello
+        hub.publish("provider_update", {"provider_id": "p2"}, provider_id="p2")
+        hub.publish("provider_update", {"provider_id": "p1"}, provider_id="p1")
+        assert b"event: provider_update" in await stream.__anext__()
+        assert client.queue.empty()
+        await stream.aclose()
+        assert not hub.clients
+
+    asyncio.run(scenario())
+
+
+def test_data_watcher_restarts_after_a_failure(monkeypatch):
+    hub = events.Hub()
+    monkeypatch.setattr(events, "HUB", hub)
+    monkeypatch.setattr(events, "VERSION_POLL", 0.01)
+    real = events._provider_fingerprints
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return real()
+    monkeypatch.setattr(events, "_provider_fingerprints", flaky)
+
+    async def scenario():
+        client = hub.connect(None, set())
+        stream = hub.stream(client)
+        await stream.__anext__()
+        await stream.__anext__()
+        while len(calls) < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        monkeypatch.setattr(mps_data, "DATA_VERSION", mps_data.DATA_VERSION + 1)
+        event = await asyncio.wait_for(stream.__anext__(), 2)
+        await stream.aclose()
+        return event
+
+    assert b"event: data_version" in asyncio.run(scenario())
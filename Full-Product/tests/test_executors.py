@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import pytest
+
+import executors
+from executors import ExecutorBusy, Pool
+
+
+def _blocker():
+    """A task that holds a pool thread until released."""
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        return "done"
+    return work, started, release
+
+
+def test_cancelled_while_queued_releases_its_slot():
+    pool = Pool("test", workers=1, max_queue=1)
+    work, started, release = _blocker()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(work))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        # Queued behind the blocker, then abandoned – as a timed-out batch part is.
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.run(lambda: "never"), 0.05)
+        assert pool.pending == 1
+        release.set()
+        assert await running == "done"
+
+        # Both slots are free again, so the pool keeps accepting work.
+        for _ in range(pool.workers + pool.max_queue + 1):
+            assert await pool.run(lambda: 1) == 1
+
+    asyncio.run(scenario())
+    assert pool.pending == 0 and pool.running == 0 and pool.queued == 0
+
+
+def test_full_pool_rejects_and_reports_queue_depth(monkeypatch):
+    pool = Pool("test", workers=1, max_queue=2)
+    monkeypatch.setattr(executors, "POOLS", (pool,))
+    work, started, release = _blocker()
+
+    async def scenario():
+        tasks = [asyncio.ensure_future(pool.run(work))]
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        tasks += [asyncio.ensure_future(pool.run(lambda: 1)) for _ in range(pool.max_queue)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(ExecutorBusy):
+            await pool.run(lambda: 1)
+        assert pool.rejected == 1
+        assert 'bridge_executor_queue_depth{pool="test"} 2' in executors._collect()
+        assert 'bridge_executor_rejected_total{pool="test"} 1' in executors._collect()
+
+        # Background work is exempt from the queue limit.
+        tasks.append(asyncio.ensure_future(pool.run_background(lambda: 1)))
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(scenario()) == ["done", 1, 1, 1]
+    assert 'bridge_executor_queue_depth{pool="test"} 0' in executors._collect()
@@ -0,0 +1,38 @@
+import pytest
+
+import facets
+from mps_data import MPS_UNIVERSE, filter_records
+
+
+def test_threshold_masks_across_step_boundaries(monkeypatch):
+    monkeypatch.setattr(facets, "_THRESHOLD_STEP", 4)
+    values = [5, None, 1, 3, 3, 9, 2, 7, 4, 8, 6]
+    threshold = facets._Threshold(values, 2)
+    for x in (0, 1, 3, 4.5, 8, 100):
+        expected = [i for i, v in enumerate(values) if v is not None and v <= x]
+        assert facets._positions(threshold.at_most(x)) == expected
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"risk_min": 3, "risk_max": 6, "platforms": ["Aegon", "Transact"]},
+    {"ethical_only": True, "ocf_max": 0.45, "min_investment_limit": 10000},
+    {"decumulation": True, "time_horizon": "long", "providers": ["No Such Provider"]},
+])
+def test_search_matches_a_scan(filters):
+    result = facets.FacetIndex(MPS_UNIVERSE).search(**filters)
+    expected = filter_records(MPS_UNIVERSE, **filters)
+    assert result["count"] == len(expected)
+    assert [m["id"] for m in result["mps"]] == [m["id"] for m in expected]
+
+
+def test_each_facet_ignores_its_own_constraint():
+    filters = {"risk_min": 4, "risk_max": 7, "platforms": ["Aegon"]}
+    result = facets.FacetIndex(MPS_UNIVERSE).search(**filters)
+    for row in result["facets"]["platforms"]:
+        assert row["count"] == len(filter_records(MPS_UNIVERSE, **{**filters, "platforms": [row["value"]]}))
+    for row in result["facets"]["risk_ratings"]:
+        expected = filter_records(MPS_UNIVERSE, risk_min=row["value"], risk_max=row["value"],
+                                  platforms=filters["platforms"])
+        assert row["count"] == len(expected)
+    assert result["facets"]["ethical"] == sum(m["ethical"] for m in result["mps"])
@@ -0,0 +1,61 @@
+import pytest
+
+import factors
+from mps_data import MPS_UNIVERSE
+
+BETAS = [0.002, 0.3, 0.5, -0.2, 0.1, 0.05]     # intercept, then FACTORS order
+
+
+def _exact_returns(model):
+    return [sum(b * x for b, x in zip(BETAS, row)) for row in model.rows]
+
+
+def test_fit_recovers_known_betas():
+    model = factors.get_model()
+    fit = model.fit(_exact_returns(model))
+    assert fit["r_squared"] == pytest.approx(1)
+    assert list(fit["betas"].values()) == pytest.approx(BETAS[1:], abs=1e-3)
+    assert fit["alpha"] == pytest.approx(BETAS[0] * 1200, abs=0.01)
+
+
+def test_rolling_updates_match_each_window():
+    model = factors.FactorModel(months=30, window=12)
+    rolling = model.rolling(_exact_returns(model))
+    assert len(rolling) == 30 - 12 + 1
+    assert rolling[-1]["date"] == model.dates[-1]
+    for window in rolling:
+        assert [window[n] for n in factors.FACTORS] == pytest.approx(BETAS[1:], abs=1e-3)
+
+
+def test_window_must_fit_the_factors():
+    with pytest.raises(ValueError):
+        factors.FactorModel(months=36, window=len(factors.FACTORS) + 1)
+    with pytest.raises(ValueError):
+        factors._invert([[1.0, 2.0], [2.0, 4.0]])
+
+
+def test_risk_check_needs_a_meaningful_fit():
+    yardstick = {3: 0.25, 5: 0.55, 7: 0.9}
+    mps = {"risk_rating": 3}
+    fit = {"betas": {"uk_equity": 0.3, "global_equity": 0.6, "gilts": 0, "credit": 0, "gbp": 0},
+           "r_squared": 0.8}
+    assert factors.risk_check(mps, fit, yardstick) == {
+        "equity_exposure": 0.9, "implied_risk_rating": 7, "risk_rating_mismatch": True}
+    weak = factors.risk_check(mps, {**fit, "r_squared": factors.MIN_R_SQUARED - 0.01}, yardstick)
+    assert weak["implied_risk_rating"] is None and weak["risk_rating_mismatch"] is None
+
+
+def test_equity_yardstick_is_the_median_per_rating():
+    records = [{"risk_rating": 4, "asset_allocation": {"equity": e}} for e in (30, 50, 40, 45)]
+    records.append({"risk_rating": 6, "asset_allocation": {}})
+    assert factors.equity_yardstick(records) == {4: pytest.approx(0.425)}
+
+
+def test_live_exposures_are_cached_per_portfolio():
+    mps = MPS_UNIVERSE[0]
+    first = factors.exposures_for(mps)
+    assert factors.exposures_for(mps) is first and "rolling" not in first
+    rolling = factors.exposures_for(mps, rolling=True)
+    assert len(rolling["rolling"]) == factors.DEFAULT_MONTHS - factors.DEFAULT_WINDOW + 1
+    recorded = factors.exposures_for(mps, universe=MPS_UNIVERSE)
+    assert recorded is not first and recorded["betas"] == first["betas"]
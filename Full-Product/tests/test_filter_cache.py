@@ -0,0 +1,60 @@
+import random
+
+import filter_cache
+from filter_cache import FilterCache, covers, ocf_bucket, signature
+from mps_data import MPS_UNIVERSE, filter_records, get_platforms, get_providers
+
+IDS = {m["id"]: m for m in MPS_UNIVERSE}
+
+
+def _cached(cache, **filters):
+    return cache.filter(1, filters, lambda **f: filter_records(MPS_UNIVERSE, **f),
+                        lambda ids: [IDS[i] for i in ids], filter_records)
+
+
+def _ids(records):
+    return [m["id"] for m in records]
+
+
+def test_ocf_bucket_rounds_up_to_the_grid():
+    assert ocf_bucket(0.5) == 0.5
+    assert ocf_bucket(0.51) == 0.55
+    assert ocf_bucket(0.549999) == 0.55
+    assert ocf_bucket(None) is None
+
+
+def test_covers():
+    broad = signature(risk_min=3, risk_max=8, platforms=["Aegon", "Transact"])
+    assert covers(broad, signature(risk_min=4, risk_max=6, platforms=["Aegon"], ethical_only=True))
+    assert not covers(broad, signature(risk_min=4, risk_max=6))
+    assert not covers(broad, signature(risk_min=2, risk_max=6, platforms=["Aegon"]))
+    assert not covers(signature(ethical_only=True), signature())
+
+
+def test_reordered_lists_share_an_entry(monkeypatch):
+    monkeypatch.setattr(filter_cache, "STATS", {"exact": 0, "narrowed": 0, "computed": 0})
+    cache = FilterCache("test_filter_cache")
+    first = _cached(cache, platforms=["Aegon", "Transact"], ocf_max=0.52)
+    second = _cached(cache, platforms=["Transact", "Aegon", "Aegon"], ocf_max=0.52)
+    assert _ids(first) == _ids(second)
+    assert filter_cache.STATS == {"exact": 1, "narrowed": 0, "computed": 1}
+    assert max(m["ocf"] for m in first) <= 0.52
+
+
+def test_cached_results_match_a_scan(monkeypatch):
+    monkeypatch.setattr(filter_cache, "STATS", {"exact": 0, "narrowed": 0, "computed": 0})
+    rng = random.Random(7)
+    platforms, providers = get_platforms(), list(get_providers())
+    cache = FilterCache("test_filter_cache")
+    for _ in range(200):
+        lo = rng.randint(1, 10)
+        filters = {
+            "risk_min": lo, "risk_max": rng.randint(lo, 10),
+            "platforms": rng.sample(platforms, rng.randint(0, 3)) or None,
+            "providers": rng.sample(providers, rng.randint(0, 4)) or None,
+            "ethical_only": rng.random() < 0.3,
+            "min_investment_limit": rng.choice([None, 1000, 50000]),
+            "ocf_max": rng.choice([None, 0.3, 0.47, 0.6]),
+        }
+        assert _ids(_cached(cache, **filters)) == _ids(filter_records(MPS_UNIVERSE, **filters))
+    assert filter_cache.STATS["narrowed"] > 0
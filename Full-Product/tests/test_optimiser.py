@@ -0,0 +1,38 @@
+import optimiser
+
+
+def _p(vol, ret):
+    return {"volatility": vol, "expected_return": ret}
+
+
+def test_efficient_drops_dominated_and_repeated_points():
+    points = [_p(5, 4), _p(6, 3.5), _p(4, 2), _p(7, 6), _p(7, 5), _p(8, 6), _p(5, 4)]
+    assert [(p["volatility"], p["expected_return"]) for p in optimiser._efficient(points)] == [
+        (4, 2), (5, 4), (7, 6)]
+
+
+def test_frontier_is_monotone_and_respects_the_cap():
+    built = optimiser.get_frontier({}, points=12, max_weight=0.4)
+    frontier = built["frontier"]
+    assert frontier and built["matched"] == len(built["candidates"])
+    for lower, higher in zip(frontier, frontier[1:]):
+        assert higher["volatility"] >= lower["volatility"]
+        assert higher["expected_return"] > lower["expected_return"]
+    for p in frontier:
+        weights = [h["weight"] for h in p["holdings"]]
+        assert abs(sum(weights) - 100) < 0.1
+        assert max(weights) <= 40 + 0.01
+
+
+def test_panel_stays_within_target_volatility():
+    frontier = optimiser.get_frontier({})["frontier"]
+    target = (frontier[0]["volatility"] + frontier[-1]["volatility"]) / 2
+    result = optimiser.optimise_panel({}, target)
+    assert result["portfolio"]["volatility"] <= target
+    below = [p for p in result["frontier"] if p["volatility"] <= target]
+    assert result["portfolio"]["expected_return"] >= max(p["expected_return"] for p in below)
+
+
+def test_no_candidates_gives_an_empty_frontier():
+    result = optimiser.optimise_panel({"providers": ["No Such Provider"]}, 10)
+    assert result["portfolio"] is None and result["frontier"] == []
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("BRIDGE_OVERSIGHT_DIR", tempfile.mkdtemp(prefix="bridge-oversight-test-"))
+
+import oversight
+from mps_data import MPS_UNIVERSE
+
+BOOK = (
+    "client_id,mps_id,pot_size,risk_profile,platform\n"
+    "c1,missing-mps,1000,5,\n"
+    f"c2,{MPS_UNIVERSE[0]['id']},2000,{MPS_UNIVERSE[0]['risk_rating']},\n"
+    f"c3,{MPS_UNIVERSE[0]['id']},3000,9,\n"
+).encode()
+
+
+async def _chunks(data: bytes, size: int = 16):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _run(user_id: str, data: bytes = BOOK, **params) -> dict:
+    async def scenario():
+        job = await oversight.create_job(user_id, _chunks(data), "text/csv", params)
+        await oversight.RUNNING[job["id"]]["task"]
+        return job
+    return asyncio.run(scenario())
+
+
+def test_job_checks_holdings_and_streams_results():
+    job = _run("owner")
+    summary = oversight.get_job(job["id"], "owner")
+    assert summary["status"] == "complete" and summary["progress"] == 100.0
+    assert summary["rows_processed"] == 3
+    assert summary["flag_counts"]["unknown_mps"] == 1
+    assert summary["flag_counts"]["risk_drift"] == 1
+    assert oversight.get_job(job["id"], "someone-else") is None
+
+    rows = [json.loads(line) for line in oversight.iter_results(job["id"], "jsonl", flagged_only=True)]
+    assert {r["client_id"] for r in rows} == {"c1", "c3"}
+    csv_text = "".join(oversight.iter_results(job["id"], "csv"))
+    assert csv_text.splitlines()[0].startswith("client_id,mps_id")
+    assert len(csv_text.splitlines()) == 4
+
+
+def test_job_state_is_read_from_the_shared_table():
+    job = _run("owner")
+    # Another worker has no in-process state for the job, only the table.
+    oversight.RUNNING.clear()
+    assert oversight.get_job(job["id"], "owner")["status"] == "complete"
+
+
+def test_job_whose_worker_stopped_is_marked_failed():
+    job = {"id": "stalejob0001", "user_id": "owner", "status": "running", "format": "csv",
+           "created": "2026-01-01T00:00:00", "finished": None, "data_version": 1, "params": {},
+           "bytes_total": 10, "bytes_processed": 5, "rows_processed": 0, "rows_flagged": 0,
+           "flag_counts": {}, "errors": 0, "error": None, "upload_path": "", "result_path": None}
+    oversight._save(job)
+    assert oversight.get_job(job["id"], "owner")["status"] == "running"
+
+    oversight._db().execute("UPDATE jobs SET job = json_set(job, '$.updated', ?) WHERE id = ?",
+                            (time.time() - oversight.STALE_SECONDS - 1, job["id"]))
+    summary = oversight.get_job(job["id"], "owner")
+    assert summary["status"] == "failed" and "stopped" in summary["error"]
@@ -0,0 +1,85 @@
+import asyncio
+import types
+
+import pytest
+
+import ratelimit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit, "time", types.SimpleNamespace(monotonic=lambda: now[0], time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return ratelimit.MemoryBackend()
+    return ratelimit.SQLiteBackend(str(tmp_path / "buckets.db"))
+
+
+def test_buckets_drain_and_refill(backend, clock):
+    limits = [("ip:1", 5, 1.0)]
+    for _ in range(5):
+        assert backend.take(limits, 1) == (0.0, None)
+    assert backend.take(limits, 1) == (pytest.approx(1.0), "ip:1")
+    clock[0] += 2.5
+    assert backend.take(limits, 2) == (0.0, None)
+    assert backend.take(limits, 1) == (pytest.approx(0.5), "ip:1")
+
+
+def test_charges_every_bucket_or_none(backend, clock):
+    user, firm = ("user:1", 10, 1.0), ("firm:acme", 4, 1.0)
+    assert backend.take([user, firm], 3) == (0.0, None)
+    assert backend.take([user, firm], 3)[1] == "firm:acme"
+    # The refused request took nothing from the user's bucket.
+    assert backend.take([user], 7) == (0.0, None)
+
+
+def test_idle_and_excess_buckets_are_evicted(clock):
+    backend = ratelimit.MemoryBackend(max_buckets=3)
+    for i in range(5):
+        backend.take([(f"ip:{i}", 10, 1.0)], 1)
+    assert len(backend) == 3
+    clock[0] += 11
+    backend.take([("ip:new", 10, 1.0)], 1)
+    assert len(backend) == 1
+
+
+def test_limits_follow_the_session():
+    assert [k for k, _, _ in ratelimit.limits_for(None, "10.0.0.1")] == ["ip:10.0.0.1"]
+    user = {"id": 7, "firm": " Acme Wealth "}
+    assert [k for k, _, _ in ratelimit.limits_for(user, "10.0.0.1")] == ["user:7", "firm:acme wealth"]
+
+
+def _call(app, path, method="GET"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "client": ("10.0.0.9", 1),
+             "query_string": b""}
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    return start["status"], dict(start["headers"])
+
+
+def test_middleware_answers_429_with_retry_after(monkeypatch, clock):
+    async def ok(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    monkeypatch.setattr(ratelimit, "ENABLED", True)
+    monkeypatch.setattr(ratelimit, "LIMITS", {**ratelimit.LIMITS, "ip": (25, 1.0)})
+    app = ratelimit.RateLimitMiddleware(ok, get_user=None, backend=ratelimit.MemoryBackend())
+    assert _call(app, "/api/selection/mps/export")[0] == 200      # costs 20 of 25
+    status, headers = _call(app, "/api/selection/mps/export")
+    assert status == 429 and headers[b"retry-after"] == b"15"
+    assert _call(app, "/api/providers")[0] == 200
+    assert _call(app, "/api/health")[0] == 200                     # exempt
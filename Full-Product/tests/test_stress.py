@@ -0,0 +1,45 @@
+import pytest
+
+import stress
+from mps_data import ASSET_CLASSES, MPS_UNIVERSE, REGIONS
+
+
+def _direct(m, scenario):
+    assets, regions = m.get("asset_allocation") or {}, m.get("geographic_allocation") or {}
+    return (sum((assets.get(a) or 0) * scenario.get("asset_classes", {}).get(a, 0) for a in ASSET_CLASSES)
+            + sum((regions.get(r) or 0) * scenario.get("regions", {}).get(r, 0) for r in REGIONS)) / 100
+
+
+def test_custom_scenarios_are_validated():
+    (custom,) = stress.resolve_scenarios([{"asset_classes": {"equity": -20}, "regions": {"uk": 5}}])
+    assert custom["id"] == "custom-1"
+    assert custom["vector"][stress.FACTORS.index("asset:equity")] == -20
+    for bad in ([{"asset_classes": {"gold": -5}}], [{"regions": {"uk": 150}}], [{"regions": {"uk": True}}],
+                ["no-such-scenario"], [3], ["covid-2020"] * (stress.MAX_SCENARIOS + 1)):
+        with pytest.raises(ValueError):
+            stress.resolve_scenarios(bad)
+
+
+def test_merged_rows_give_each_portfolio_its_own_return():
+    matrix = stress.ExposureMatrix(MPS_UNIVERSE + [dict(m, id=m["id"] + "-copy") for m in MPS_UNIVERSE])
+    assert len(matrix.rows) <= len(MPS_UNIVERSE)
+    scenario = stress.SCENARIOS["covid-2020"]
+    returns = matrix.returns(stress.scenario_vector(scenario))
+    for row, members in enumerate(matrix.members):
+        for i in members:
+            assert returns[row] == pytest.approx(_direct(matrix.records[i], scenario))
+
+
+def test_results_rank_worst_first_and_average_by_provider():
+    (result,) = stress.run_stress(stress.resolve_scenarios(["gfc-2008"]), top=5)
+    scenario = stress.SCENARIOS["gfc-2008"]
+    expected = sorted(round(_direct(m, scenario), 2) for m in MPS_UNIVERSE)
+    assert [p["estimated_return"] for p in result["portfolios"]] == expected[:5]
+    assert "vector" not in result["scenario"]
+    for p in result["providers"]:
+        held = [_direct(m, scenario) for m in MPS_UNIVERSE if m["provider"] == p["provider"]]
+        assert p["portfolio_count"] == len(held)
+        assert p["average_return"] == pytest.approx(sum(held) / len(held), abs=0.01)
+        assert p["worst_return"] == pytest.approx(min(held), abs=0.01)
+    (everyone,) = stress.run_stress(stress.resolve_scenarios(["gfc-2008"]), top=0)
+    assert len(everyone["portfolios"]) == len(MPS_UNIVERSE)
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import versions
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def fresh_store(monkeypatch):
+    monkeypatch.setattr(versions, "_conn", None)
+    versions.STATES.clear()
+    yield
+    versions._conn.close()
+    versions.STATES.clear()
+
+
+def _mps(i, **fields):
+    return {"id": f"m{i}", "provider": "P", "ocf": 0.2, **fields}
+
+
+def test_unchanged_data_is_not_recorded():
+    universe = [_mps(1), _mps(2)]
+    assert versions.record({"P": {"name": "P"}}, universe, at=T0) == 1
+    assert versions.record({"P": {"name": "P"}}, [dict(m) for m in universe], at=T0) is None
+
+
+def test_deltas_replay_to_the_recorded_state():
+    providers = {"P": {"name": "P"}}
+    universe = [_mps(1), _mps(2), _mps(3)]
+    versions.record(providers, universe, at=T0)
+    universe = [_mps(1, ocf=0.3), _mps(3), _mps(4)]
+    versions.record(providers, universe, at=T0 + timedelta(days=1))
+    universe = [{"id": "m1", "provider": "P"}, _mps(3), _mps(4)]
+    versions.record({**providers, "Q": {"name": "Q"}}, universe, at=T0 + timedelta(days=2))
+
+    versions.STATES.clear()         # rebuild from the checkpoint, not the cache
+    assert [m["ocf"] for m in versions.state(2).universe()] == [0.3, 0.2, 0.2]
+    assert versions.state(2).order == ["m1", "m3", "m4"]
+    assert versions.state(3).mps["m1"] == {"id": "m1", "provider": "P"}
+    assert list(versions.state(3).providers) == ["P", "Q"]
+    assert [v["checkpoint"] for v in versions.list_versions()] == [True, False, False]
+
+
+def test_checkpoint_every_n_versions(monkeypatch):
+    monkeypatch.setattr(versions, "CHECKPOINT_EVERY", 2)
+    for n in range(5):
+        versions.record({}, [_mps(1, ocf=n)], at=T0 + timedelta(days=n))
+    assert [v["checkpoint"] for v in versions.list_versions()] == [True, False, True, False, True]
+    versions.STATES.clear()
+    assert versions.state(4).mps["m1"]["ocf"] == 3
+
+
+def test_as_of_picks_the_version_in_force():
+    for n in range(3):
+        versions.record({}, [_mps(1, ocf=n)], at=T0 + timedelta(days=n))
+    assert versions.state_as_of(T0 - timedelta(seconds=1)) is None
+    assert versions.state_as_of(versions.parse_as_of("2026-01-02")).version == 2
+    assert versions.state_as_of(versions.parse_as_of("2026-01-02T12:00:00Z")).mps["m1"]["ocf"] == 1
+    with pytest.raises(ValueError):
+        versions.parse_as_of("yesterday")
+    with pytest.raises(KeyError):
+        versions.state(9)
@@ -0,0 +1,303 @@
+from __future__ import annotations
+"""
+Bridge – Point-in-Time Data
+Every loaded state of providers and portfolios, for "as it was on" queries
+
+Each time the data changes a version is recorded: a full checkpoint every
+CHECKPOINT_EVERY versions, otherwise a delta against the previous version
+holding only the providers and portfolio fields that changed. Rows are
+zlib-compressed JSON in the SQLite file named by BRIDGE_VERSIONS_DB, so the
+history survives restarts and deploys and is shared by workers. One worker
+at a time records – whichever holds the lock file beside the database – so
+the others never diff the universe. Recording is opt-in: without
+BRIDGE_VERSIONS_DB (or with :memory:) nothing is recorded and point-in-time
+queries are refused, since a history that starts at process start is no
+evidence.
+
+A state is rebuilt from the nearest checkpoint, or a closer recently rebuilt
+version, by replaying deltas. Unchanged records are shared between versions,
+so states must be treated as read-only.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import date, datetime, time as dtime, timezone
+
+import mps_data
+from cache import LRUCache
+
+VERSIONS_DB = os.environ.get("BRIDGE_VERSIONS_DB", "") or ":memory:"
+PERSISTENT = VERSIONS_DB != ":memory:"
+CHECKPOINT_EVERY = 20
+
+STATES = LRUCache("point_in_time_states", maxsize=8)
+
+_lock = threading.RLock()
+_conn: sqlite3.Connection | None = None
+_recorder: dict = {"pid": None, "file": None}
+
+
+class State:
+    """Providers and portfolios as of one recorded version."""
+
+    __slots__ = ("version", "recorded_at", "providers", "mps", "order")
+
+    def __init__(self, version: int, recorded_at: str, providers: dict, mps: dict, order: list):
+        self.version = version
+        self.recorded_at = recorded_at
+        self.providers = providers      # name -> provider
+        self.mps = mps                  # id -> record
+        self.order = order              # ids in universe order
+
+    def universe(self) -> list[dict]:
+        return [self.mps[i] for i in self.order]
+
+    def by_provider(self, provider_name: str) -> list[dict]:
+        return [m for m in self.universe() if m["provider"] == provider_name]
+
+    def info(self) -> dict:
+        return {"version": self.version, "recorded_at": self.recorded_at}
+
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(VERSIONS_DB, timeout=30, isolation_level=None, check_same_thread=False)
+        if PERSISTENT:
+            _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("CREATE TABLE IF NOT EXISTS versions ("
+                      "version INTEGER PRIMARY KEY, recorded_at TEXT NOT NULL, checkpoint INTEGER NOT NULL, "
+                      "payload BLOB NOT NULL)")
+        _conn.execute("CREATE INDEX IF NOT EXISTS versions_recorded_at ON versions (recorded_at)")
+    return _conn
+
+
+def _pack(obj) -> bytes:
+    return zlib.compress(json.dumps(obj, separators=(",", ":"), default=str).encode(), 6)
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob))
+
+
+def _unchanged(delta: dict) -> bool:
+    return not any(delta[k] for k in ("providers", "providers_removed", "mps", "mps_added", "mps_removed")) \
+        and "order" not in delta and "provider_order" not in delta
+
+
+# ─── Deltas ──────────────────────────────────────────────────────────────
+
+def _record_delta(old: dict, new: dict) -> dict | None:
+    """Changed fields of one record: {"set": {...}, "drop": [...]}, None if unchanged."""
+    if old is new or old == new:
+        return None
+    changed = {k: v for k, v in new.items() if k not in old or old[k] != v}
+    dropped = [k for k in old if k not in new]
+    delta = {"set": changed}
+    if dropped:
+        delta["drop"] = dropped
+    if list(new) != [k for k in old if k in new] + [k for k in new if k not in old]:
+        delta["keys"] = list(new)     # key order changed too
+    return delta
+
+
+def _delta(prev: State, providers: dict, universe: list) -> dict:
+    delta: dict = {"providers": {}, "providers_removed": [], "mps": {}, "mps_added": {}, "mps_removed": []}
+    for name, p in providers.items():
+        if prev.providers.get(name) != p:
+            delta["providers"][name] = p
+    delta["providers_removed"] = [name for name in prev.providers if name not in providers]
+    if list(providers) != list(prev.providers):
+        delta["provider_order"] = list(providers)
+
+    ids = []
+    for m in universe:
+        mps_id = m["id"]
+        ids.append(mps_id)
+        old = prev.mps.get(mps_id)
+        if old is None:
+            delta["mps_added"][mps_id] = dict(m)
+        else:
+            d = _record_delta(old, m)
+            if d is not None:
+                delta["mps"][mps_id] = d
+    seen = set(ids)
+    delta["mps_removed"] = [i for i in prev.order if i not in seen]
+    if ids != prev.order:
+        delta["order"] = ids
+    return delta
+
+
+def _apply(prev: State, version: int, recorded_at: str, delta: dict) -> State:
+    """A new State sharing every unchanged record with `prev`."""
+    providers = dict(prev.providers)
+    providers.update(delta["providers"])
+    for name in delta["providers_removed"]:
+        providers.pop(name, None)
+    if "provider_order" in delta:
+        providers = {name: providers[name] for name in delta["provider_order"]}
+
+    mps = dict(prev.mps)
+    for mps_id in delta["mps_removed"]:
+        mps.pop(mps_id, None)
+    mps.update(delta["mps_added"])
+    for mps_id, d in delta["mps"].items():
+        record = {**mps[mps_id], **d["set"]}
+        for k in d.get("drop", ()):
+            record.pop(k, None)
+        if "keys" in d:
+            record = {k: record[k] for k in d["keys"]}
+        mps[mps_id] = record
+    return State(version, recorded_at, providers, mps, delta.get("order", prev.order))
+
+
+def _checkpoint_state(version: int, recorded_at: str, payload: dict) -> State:
+    universe = payload["mps"]
+    return State(version, recorded_at, payload["providers"], {m["id"]: m for m in universe},
+                 [m["id"] for m in universe])
+
+
+# ─── Reading ─────────────────────────────────────────────────────────────
+
+def state(version: int) -> State:
+    """Rebuild a recorded version."""
+    with _lock:
+        cached = STATES.get(version)
+        if cached is not None:
+            return cached
+        conn = _db()
+        checkpoint = conn.execute("SELECT MAX(version) FROM versions WHERE checkpoint = 1 AND version <= ?",
+                                  (version,)).fetchone()[0]
+        if checkpoint is None:
+            raise KeyError(version)
+        # Start from the newest cached version between the checkpoint and the target, if any.
+        start = None
+        for v in range(version - 1, checkpoint - 1, -1):
+            start = STATES.get(v)
+            if start is not None:
+                break
+        rows = conn.execute("SELECT version, recorded_at, checkpoint, payload FROM versions "
+                            "WHERE version BETWEEN ? AND ? ORDER BY version",
+                            (start.version + 1 if start else checkpoint, version)).fetchall()
+        current = start
+        for v, recorded_at, is_checkpoint, blob in rows:
+            payload = _unpack(blob)
+            if is_checkpoint:
+                current = _checkpoint_state(v, recorded_at, payload)
+            else:
+                current = _apply(current, v, recorded_at, payload)
+        if current is None or current.version != version:
+            raise KeyError(version)
+        STATES.set(version, current)
+        return current
+
+
+def parse_as_of(value: str) -> datetime:
+    """An ISO date (end of that day, UTC) or datetime."""
+    try:
+        if len(value) == 10:
+            return datetime.combine(date.fromisoformat(value), dtime.max, tzinfo=timezone.utc)
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"as_of must be an ISO date or datetime, got {value!r}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def state_as_of(when: datetime) -> State | None:
+    """The state in force at `when`, or None if nothing was recorded by then."""
+    stamp = when.astimezone(timezone.utc).isoformat(timespec="microseconds")
+    with _lock:
+        row = _db().execute("SELECT MAX(version) FROM versions WHERE recorded_at <= ?", (stamp,)).fetchone()
+    return None if row[0] is None else state(row[0])
+
+
+def list_versions() -> list[dict]:
+    with _lock:
+        rows = _db().execute("SELECT version, recorded_at, checkpoint, length(payload) FROM versions "
+                             "ORDER BY version").fetchall()
+    return [{"version": v, "recorded_at": at, "checkpoint": bool(cp), "bytes": size} for v, at, cp, size in rows]
+
+
+# ─── Recording ───────────────────────────────────────────────────────────
+
+def record(providers: dict, universe, at: datetime | None = None) -> int | None:
+    """Record the given data if it differs from the latest version; returns the new
+    version number, or None when nothing changed (e.g. another worker recorded it)."""
+    universe = [m if type(m) is dict else dict(m) for m in universe]
+    providers = dict(providers)
+    recorded_at = (at or datetime.now(timezone.utc)).astimezone(timezone.utc).isoformat(timespec="microseconds")
+    with _lock:
+        conn = _db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            latest = conn.execute("SELECT MAX(version) FROM versions").fetchone()[0]
+            delta = None
+            if latest is not None:
+                prev = state(latest)
+                delta = _delta(prev, providers, universe)
+                if _unchanged(delta):
+                    conn.execute("ROLLBACK")
+                    return None
+            version = (latest or 0) + 1
+            is_checkpoint = latest is None or (version - 1) % CHECKPOINT_EVERY == 0
+            payload = {"providers": providers, "mps": universe} if is_checkpoint else delta
+            conn.execute("INSERT INTO versions (version, recorded_at, checkpoint, payload) VALUES (?, ?, ?, ?)",
+                         (version, recorded_at, int(is_checkpoint), _pack(payload)))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        # The next recording diffs against this one, and as_of=today reads it.
+        STATES.set(version, _checkpoint_state(version, recorded_at, payload) if is_checkpoint
+                   else _apply(prev, version, recorded_at, delta))
+    return version
+
+
+def is_recorder() -> bool:
+    """Whether this process records versions: it holds the lock file beside the
+    database. Retried on every data change, so another worker takes over when the
+    recorder exits. The lock is per process, also when workers fork from a parent."""
+    if not PERSISTENT:
+        return False
+    with _lock:
+        if _recorder["pid"] == os.getpid():
+            return True
+        import fcntl
+        try:
+            f = open(VERSIONS_DB + ".lock", "a")
+        except OSError as e:
+            print(f"Point-in-time versions not recorded: {e}")
+            return False
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        _recorder.update(pid=os.getpid(), file=f)
+        return True
+
+
+def record_current() -> int | None:
+    if not is_recorder():
+        return None
+    try:
+        return record(mps_data.get_providers(), mps_data.get_all_mps())
+    except Exception as e:
+        print(f"Point-in-time version not recorded: {e}")
+        return None
+
+
+def record_in_background(data_version: int | None = None) -> None:
+    # Data changes are noticed on the event loop or the shared watcher thread;
+    # diffing a large universe belongs on neither.
+    if not PERSISTENT:
+        return
+    threading.Thread(target=record_current, name="bridge-versions", daemon=True).start()
+
+
+mps_data.on_data_change(record_in_background)
+record_in_background()      # the state this process started with